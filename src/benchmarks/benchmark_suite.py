@@ -0,0 +1,327 @@
+import datetime
+import json
+import os
+import time
+
+import numpy as np
+
+from src.functions_nonparametric.cross_validation import cross_validation
+from src.functions_nonparametric.cross_validation import y_hat_local_linear
+from src.functions_nonparametric.rule_of_thumb import rule_of_thumb
+from src.functions_nonparametric.treatment_effect_estimation import (
+    estimate_treatment_effect_nonparametric,
+)
+from src.functions_parametric.treatment_effect_estimation import (
+    estimate_treatment_effect_parametric,
+)
+from src.simulation_study.data_generating_process import data_generating_process
+
+
+BENCHMARK_SIZES = [500, 5000, 50000, 500000]
+BENCHMARK_MODELS = ["linear", "poly", "nonpolynomial"]
+
+
+def setup_benchmark_data(n, model, seed=123):
+    """
+    Draw the data a benchmark is run on from the data generating process of the
+    simulation study. Besides the data, the rule-of-thumb bandwidth and the data
+    right of the cutoff are prepared, such that a benchmark times the function of
+    interest only.
+
+    Args:
+        n (int): Number of observations.
+        model (str): Model of the potential outcomes, see data_generating_process.
+        seed (int): Seed of the random number generator. Default is 123.
+
+    Returns:
+        dict: Dictionary holding the simulation parameters in "params", the data
+            in "data", the rule-of-thumb bandwidth in "h_rot" and the running
+            variable and outcome right of the cutoff in "x" and "y".
+    """
+
+    # Use the default parameters of the simulation study.
+    params = {
+        "M": 1,
+        "n": n,
+        "discrete": False,
+        "model": model,
+        "cutoff": 0,
+        "tau": 0.75,
+        "noise_var": 1,
+    }
+    data = data_generating_process(params=params, rng=np.random.default_rng(seed))
+    right = data.loc[data["r"] >= params["cutoff"]]
+
+    setup = {}
+    setup["params"] = params
+    setup["data"] = data
+    setup["h_rot"] = rule_of_thumb(data, params["cutoff"])
+    setup["x"] = np.ascontiguousarray(right["r"], dtype=np.float64)
+    setup["y"] = np.ascontiguousarray(right["y"], dtype=np.float64)
+
+    return setup
+
+
+def _bench_data_generating_process(setup):
+    return data_generating_process(params=setup["params"], rng=np.random.default_rng(0))
+
+
+def _bench_rule_of_thumb(setup):
+    return rule_of_thumb(setup["data"], setup["params"]["cutoff"])
+
+
+def _bench_cross_validation(setup, engine="sorted"):
+    # Use the grid of the cross-validation arm of the simulation study.
+    return cross_validation(
+        data=setup["data"],
+        cutoff=setup["params"]["cutoff"],
+        h_grid=np.linspace(start=0.5 * setup["h_rot"], stop=2 * setup["h_rot"], num=32),
+        min_num_obs=10,
+        engine=engine,
+    )
+
+
+def _bench_cross_validation_refit(setup):
+    return _bench_cross_validation(setup, engine="refit")
+
+
+def _bench_y_hat_local_linear(setup):
+    return y_hat_local_linear(
+        setup["x"], setup["y"], float(setup["params"]["cutoff"]), setup["h_rot"]
+    )
+
+
+def _bench_estimate_treatment_effect_nonparametric(setup):
+    return estimate_treatment_effect_nonparametric(
+        data=setup["data"], cutoff=setup["params"]["cutoff"], bandwidth=setup["h_rot"]
+    )
+
+
+def _bench_estimate_treatment_effect_parametric(setup):
+    return estimate_treatment_effect_parametric(
+        data=setup["data"], cutoff=setup["params"]["cutoff"], degree=4
+    )
+
+
+# Benchmarked functions and the largest number of observations they are run on.
+# The refit engine of cross-validation is quadratic in the number of observations
+# and therefore limited to small samples.
+BENCHMARK_CASES = {
+    "data_generating_process": (_bench_data_generating_process, None),
+    "rule_of_thumb": (_bench_rule_of_thumb, None),
+    "cross_validation": (_bench_cross_validation, None),
+    "cross_validation_refit": (_bench_cross_validation_refit, 5000),
+    "y_hat_local_linear": (_bench_y_hat_local_linear, None),
+    "estimate_treatment_effect_nonparametric": (
+        _bench_estimate_treatment_effect_nonparametric,
+        None,
+    ),
+    "estimate_treatment_effect_parametric": (
+        _bench_estimate_treatment_effect_parametric,
+        None,
+    ),
+}
+
+
+def time_function(function, args, repeat=5):
+    """
+    Time repeated calls of a function. The function is called once before the
+    timing starts, such that just-in-time compilation and caches filled on the
+    first call are not part of the timings.
+
+    Args:
+        function (callable): Function to time.
+        args (tuple): Positional arguments the function is called with.
+        repeat (int): Number of timed calls. Default is 5.
+
+    Returns:
+        dict: Dictionary with the shortest ("min") and median ("median") time of
+            a call in seconds and the number of timed calls ("repeat").
+    """
+
+    if isinstance(repeat, int) is False or repeat < 1:
+        raise ValueError("'repeat' must be a positive integer.")
+    else:
+        pass
+
+    function(*args)
+    timings = np.zeros(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings[i] = time.perf_counter() - start
+
+    return {"min": timings.min(), "median": np.median(timings), "repeat": repeat}
+
+
+def run_benchmarks(sizes=None, models=None, cases=None, repeat=5, seed=123):
+    """
+    Time the estimators, bandwidth selection procedures and the data generating
+    process on data of each size drawn from each model of the simulation study.
+
+    Args:
+        sizes (list): Numbers of observations. Default is None, in which case
+                    BENCHMARK_SIZES is used.
+        models (list): Models of the potential outcomes. Default is None, in which
+                    case BENCHMARK_MODELS is used.
+        cases (list): Names of the benchmarks in BENCHMARK_CASES to run. Default
+                    is None, in which case all benchmarks are run.
+        repeat (int): Number of timed calls of each benchmark. Default is 5.
+        seed (int): Seed of the random number generator the data is drawn with.
+                    Default is 123.
+
+    Returns:
+        list: Dictionary for each benchmark, size and model holding the name of
+            the benchmark in "case", "n", "model" and the timings, see
+            time_function.
+    """
+
+    if sizes is None:
+        sizes = BENCHMARK_SIZES
+    if models is None:
+        models = BENCHMARK_MODELS
+    if cases is None:
+        cases = list(BENCHMARK_CASES.keys())
+    elif set(cases).issubset(BENCHMARK_CASES.keys()) is False:
+        raise ValueError("Not all cases are contained in BENCHMARK_CASES.")
+    else:
+        pass
+
+    results = []
+    for n in sizes:
+        for model in models:
+            setup = setup_benchmark_data(n=n, model=model, seed=seed)
+            for case in cases:
+                function, max_n = BENCHMARK_CASES[case]
+                if max_n is not None and n > max_n:
+                    continue
+                else:
+                    pass
+                timings = time_function(function, args=(setup,), repeat=repeat)
+                results.append({"case": case, "n": n, "model": model, **timings})
+
+    return results
+
+
+def benchmark_id(result):
+    """
+    Identify the benchmark a timing belongs to across runs.
+
+    Args:
+        result (dict): Timing of a benchmark, see run_benchmarks.
+
+    Returns:
+        str: Identifier made up of the benchmark, the size and the model.
+    """
+
+    return f"{result['case']}[n={result['n']},model={result['model']}]"
+
+
+def load_history(path):
+    """
+    Load the history of benchmark runs.
+
+    Args:
+        path (str): Path of the JSON file holding the history.
+
+    Returns:
+        list: Dictionary for each previous run, oldest first, holding the time of
+            the run in "timestamp", the fingerprint of the source code in
+            "version" and the timings in "results". Empty if there is no history.
+    """
+
+    try:
+        with open(path, "r") as f:
+            return json.load(f)["runs"]
+    except FileNotFoundError:
+        return []
+
+
+def append_history(path, results, version=None):
+    """
+    Append a benchmark run to the history. The history is written to a temporary
+    file first and then renamed, such that an interrupted run leaves the previous
+    history intact.
+
+    Args:
+        path (str): Path of the JSON file holding the history.
+        results (list): Timings of the run, see run_benchmarks.
+        version (str): Fingerprint of the benchmarked source code, see
+                    code_version. Default is None.
+
+    Returns:
+        list: The history including the appended run.
+    """
+
+    runs = load_history(path)
+    runs.append(
+        {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "version": version,
+            "results": results,
+        }
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    with open(path_tmp, "w") as f:
+        json.dump({"runs": runs}, f, indent=1, default=float)
+    os.replace(path_tmp, path)
+
+    return runs
+
+
+def find_regressions(results, runs, threshold=1.5, window=5):
+    """
+    Compare the timings of a benchmark run to the history. The baseline of a
+    benchmark is the median of its shortest timings in the most recent previous
+    runs, and the benchmark is flagged if its shortest timing exceeds the baseline
+    by more than the threshold factor. Shortest timings are compared as they are
+    least affected by other load on the machine.
+
+    Args:
+        results (list): Timings of the run, see run_benchmarks.
+        runs (list): Previous runs, see load_history.
+        threshold (float): Factor by which a timing has to exceed its baseline to
+                        be flagged. Default is 1.5.
+        window (int): Number of most recent runs the baseline is computed from.
+                    Default is 5.
+
+    Returns:
+        list: Dictionary for each flagged benchmark holding "case", "n", "model",
+            the shortest timing in "min", the baseline in "baseline" and their
+            ratio in "ratio". Empty if no benchmark is flagged.
+    """
+
+    if threshold <= 1:
+        raise ValueError("'threshold' must be larger than one.")
+    else:
+        pass
+
+    previous = {}
+    for run in runs[-window:]:
+        for result in run["results"]:
+            previous.setdefault(benchmark_id(result), []).append(result["min"])
+
+    regressions = []
+    for result in results:
+        if benchmark_id(result) not in previous:
+            continue
+        else:
+            pass
+        baseline = np.median(previous[benchmark_id(result)])
+        if result["min"] > threshold * baseline:
+            regressions.append(
+                {
+                    "case": result["case"],
+                    "n": result["n"],
+                    "model": result["model"],
+                    "min": result["min"],
+                    "baseline": baseline,
+                    "ratio": result["min"] / baseline,
+                }
+            )
+        else:
+            pass
+
+    return regressions
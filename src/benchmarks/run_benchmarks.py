@@ -0,0 +1,67 @@
+import argparse
+import sys
+
+from bld.project_paths import project_paths_join as ppj
+from src.benchmarks.benchmark_suite import append_history
+from src.benchmarks.benchmark_suite import BENCHMARK_CASES
+from src.benchmarks.benchmark_suite import BENCHMARK_MODELS
+from src.benchmarks.benchmark_suite import BENCHMARK_SIZES
+from src.benchmarks.benchmark_suite import benchmark_id
+from src.benchmarks.benchmark_suite import find_regressions
+from src.benchmarks.benchmark_suite import load_history
+from src.benchmarks.benchmark_suite import run_benchmarks
+from src.simulation_study.result_cache import code_version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=BENCHMARK_SIZES)
+    parser.add_argument("--models", nargs="+", default=BENCHMARK_MODELS)
+    parser.add_argument("--cases", nargs="+", default=list(BENCHMARK_CASES.keys()))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=1.5)
+    parser.add_argument(
+        "--history", default=ppj("OUT_DATA", "benchmarks", "benchmark_history.json")
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="Do not append the run to the history."
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        sizes=args.sizes, models=args.models, cases=args.cases, repeat=args.repeat
+    )
+    for result in results:
+        print(f"{benchmark_id(result):<70} {result['min']:12.6f} s")
+
+    # Compare to the history before the run is added to it.
+    regressions = find_regressions(
+        results, runs=load_history(args.history), threshold=args.threshold
+    )
+
+    if args.no_save is False:
+        version = code_version(
+            [
+                ppj("SIMULATION_STUDY", "data_generating_process.py"),
+                ppj("FUNCTIONS_PARAMETRIC", "treatment_effect_estimation.py"),
+                ppj("FUNCTIONS_NONPARAMETRIC", "treatment_effect_estimation.py"),
+                ppj("FUNCTIONS_NONPARAMETRIC", "rule_of_thumb.py"),
+                ppj("FUNCTIONS_NONPARAMETRIC", "cross_validation.py"),
+                ppj("FUNCTIONS_NONPARAMETRIC", "binning.py"),
+                ppj("FUNCTIONS_NONPARAMETRIC", "data_index.py"),
+            ]
+        )
+        append_history(args.history, results, version=version)
+    else:
+        pass
+
+    for regression in regressions:
+        print(
+            f"Regression: {benchmark_id(regression)} took {regression['min']:.6f} s, "
+            f"{regression['ratio']:.2f} times the baseline of "
+            f"{regression['baseline']:.6f} s."
+        )
+    if len(regressions) > 0:
+        sys.exit(1)
+    else:
+        pass
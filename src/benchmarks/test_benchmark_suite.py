@@ -0,0 +1,72 @@
+import pytest
+from benchmark_suite import append_history
+from benchmark_suite import BENCHMARK_CASES
+from benchmark_suite import benchmark_id
+from benchmark_suite import find_regressions
+from benchmark_suite import load_history
+from benchmark_suite import run_benchmarks
+from benchmark_suite import time_function
+
+
+@pytest.fixture
+def setup_history():
+    out = {}
+    out["results"] = [
+        {"case": "rule_of_thumb", "n": 500, "model": "linear", "min": 1.0},
+        {"case": "cross_validation", "n": 500, "model": "linear", "min": 2.0},
+    ]
+    out["results_new"] = [
+        {"case": "rule_of_thumb", "n": 500, "model": "linear", "min": 1.2},
+        {"case": "cross_validation", "n": 500, "model": "linear", "min": 4.0},
+        {"case": "cross_validation", "n": 5000, "model": "linear", "min": 40.0},
+    ]
+
+    return out
+
+
+def test_run_benchmarks_cases():
+    results = run_benchmarks(sizes=[500], models=["linear", "poly"], repeat=1)
+    expected_ids = [
+        f"{case}[n=500,model={model}]"
+        for model in ["linear", "poly"]
+        for case in BENCHMARK_CASES.keys()
+    ]
+    assert [benchmark_id(result) for result in results] == expected_ids
+    for result in results:
+        assert 0 < result["min"] <= result["median"]
+
+
+def test_run_benchmarks_max_n():
+    results = run_benchmarks(
+        sizes=[10000], models=["linear"], cases=["cross_validation_refit"], repeat=1
+    )
+    assert results == []
+    with pytest.raises(ValueError):
+        run_benchmarks(sizes=[500], models=["linear"], cases=["unknown"])
+
+
+def test_time_function_repeat_input():
+    with pytest.raises(ValueError):
+        time_function(sum, args=([1, 2],), repeat=0)
+
+
+def test_history_appends_runs(setup_history, tmp_path):
+    path = str(tmp_path / "benchmarks" / "history.json")
+    assert load_history(path) == []
+    append_history(path, setup_history["results"], version="abc")
+    runs = append_history(path, setup_history["results_new"], version="def")
+    assert runs == load_history(path)
+    assert [run["version"] for run in runs] == ["abc", "def"]
+    assert runs[1]["results"] == setup_history["results_new"]
+
+
+def test_find_regressions(setup_history):
+    runs = [{"results": setup_history["results"]}]
+    regressions = find_regressions(setup_history["results_new"], runs, threshold=1.5)
+    assert [benchmark_id(regression) for regression in regressions] == [
+        "cross_validation[n=500,model=linear]"
+    ]
+    assert regressions[0]["ratio"] == 2
+    assert find_regressions(setup_history["results_new"], runs=[]) == []
+    with pytest.raises(ValueError):
+        find_regressions(setup_history["results_new"], runs, threshold=1)
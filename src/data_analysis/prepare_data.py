@@ -0,0 +1,29 @@
+import numpy as np
+
+from bld.project_paths import project_paths_join as ppj
+from src.data_analysis.read_data import file_digest
+from src.data_analysis.read_data import read_analysis_data
+from src.data_analysis.read_data import store_columns
+from src.data_analysis.read_data import stored_key
+
+
+if __name__ == "__main__":
+    path = ppj("IN_DATA", "Data_public_small.dta")
+    directory = ppj("OUT_DATA", "data_analysis", "analysis_data")
+    cutoff = 40.0
+
+    # Prepare the data only if the source file or the cutoff changed.
+    key = {"source": file_digest(path), "cutoff": cutoff}
+    if stored_key(directory) != key:
+        data = read_analysis_data(path)
+
+        # Store the running variable, the treatment status and the outcomes.
+        columns = {
+            "r": data["age"],
+            "d": (data["age"] >= cutoff).astype(np.float64),
+            "ned": data["ned"],
+            "wg_c": data["wg_c"],
+        }
+        store_columns(directory, columns, key=key)
+    else:
+        pass
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def read_stata_columns(path, columns, row_filter=None, chunksize=100000):
+    """
+    Read selected columns of a Stata file chunk by chunk. Only the rows passing
+    the filter are kept from each chunk, such that memory use is bounded by the
+    size of the selected data plus a single chunk rather than by the size of the
+    file.
+
+    Args:
+        path (str): Path to the Stata file.
+        columns (list): Names of the columns to read.
+        row_filter (callable): Function taking a chunk as pd.DataFrame and
+                            returning a boolean mask of the rows to keep.
+                            Default is None, in which case all rows are kept.
+        chunksize (int): Number of rows read at once. Default is 100000.
+
+    Returns:
+        dict: Dictionary with a contiguous array of type np.float64 for each
+            column.
+    """
+
+    chunks = {column: [] for column in columns}
+    with pd.read_stata(path, columns=columns, chunksize=chunksize) as reader:
+        for chunk in reader:
+            if row_filter is not None:
+                chunk = chunk.loc[np.asarray(row_filter(chunk))]
+            else:
+                pass
+            for column in columns:
+                chunks[column].append(chunk[column].to_numpy(dtype=np.float64))
+
+    data = {}
+    for column in columns:
+        if len(chunks[column]) > 0:
+            data[column] = np.concatenate(chunks[column])
+        else:
+            data[column] = np.zeros(0)
+        # Release the chunks of a column once it is assembled.
+        chunks[column] = None
+
+    return data
+
+
+def read_analysis_data(path, chunksize=100000):
+    """
+    Read the data used in the data analysis, i.e. age at layoff and the outcomes
+    nonemployment duration and wage change of all observations with a
+    nonemployment duration of less than two years.
+
+    Args:
+        path (str): Path to the Stata file.
+        chunksize (int): Number of rows read at once. Default is 100000.
+
+    Returns:
+        dict: Dictionary with arrays of type np.float64 on "age", "ned" and
+            "wg_c".
+    """
+
+    return read_stata_columns(
+        path=path,
+        columns=["age", "ned", "wg_c"],
+        row_filter=lambda chunk: chunk["ned"] < 2 * 365,
+        chunksize=chunksize,
+    )
+
+
+def file_digest(path, blocksize=2 ** 20):
+    """
+    Compute the SHA-256 digest of a file, reading it block by block.
+
+    Args:
+        path (str): Path to the file.
+        blocksize (int): Number of bytes read at once. Default is 2 ** 20.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest of the contents of the file.
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def store_columns(directory, columns, key):
+    """
+    Store columns of data as .npy files in a directory together with a manifest
+    listing the columns and the key of the data they were prepared from. The
+    manifest is removed before and written after the columns, such that the
+    columns are only ever loaded once completely written.
+
+    Args:
+        directory (str): Directory the columns are stored in.
+        columns (dict): Dictionary with an array for each column.
+        key (dict): JSON serializable description of the data the columns were
+                    prepared from, e.g. the digest of the source file.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    path_manifest = os.path.join(directory, "manifest.json")
+    if os.path.exists(path_manifest):
+        os.remove(path_manifest)
+    else:
+        pass
+
+    for name, values in columns.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values))
+
+    path_tmp = f"{path_manifest}.{os.getpid()}.tmp"
+    with open(path_tmp, "w") as f:
+        json.dump({"key": key, "columns": list(columns.keys())}, f)
+    os.replace(path_tmp, path_manifest)
+
+
+def stored_key(directory):
+    """
+    Look up the key of the data the columns in a directory were prepared from.
+
+    Args:
+        directory (str): Directory the columns are stored in, see store_columns.
+
+    Returns:
+        dict: Key of the stored columns. None if no columns are stored.
+    """
+
+    try:
+        with open(os.path.join(directory, "manifest.json"), "r") as f:
+            return json.load(f)["key"]
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def load_columns(directory, key=None):
+    """
+    Load the columns stored in a directory as read-only memory maps, such that
+    no data is read until it is accessed.
+
+    Args:
+        directory (str): Directory the columns are stored in, see store_columns.
+        key (dict): Key the columns must have been prepared from. Default is
+                    None, in which case the key is not checked.
+
+    Returns:
+        dict: Dictionary with a memory-mapped array for each column.
+    """
+
+    with open(os.path.join(directory, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+
+    if key is not None and manifest["key"] != key:
+        raise ValueError("The stored columns were prepared from different data.")
+    else:
+        pass
+
+    columns = {}
+    for name in manifest["columns"]:
+        columns[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+    return columns
@@ -2,34 +2,29 @@ import numpy as np
 import pandas as pd
 
 from bld.project_paths import project_paths_join as ppj
+from src.data_analysis.read_data import load_columns
+from src.data_analysis.result_store import BANDWIDTH_PATH_SCHEMA
+from src.data_analysis.result_store import store_results
 from src.functions_nonparametric.cross_validation import cross_validation
+from src.functions_nonparametric.data_index import build_data_index
 from src.functions_nonparametric.rule_of_thumb import rule_of_thumb
 from src.functions_nonparametric.treatment_effect_estimation import (
-    estimate_treatment_effect_nonparametric,
+    estimate_treatment_effect_nonparametric_path,
 )
 from src.functions_parametric.treatment_effect_estimation import (
-    estimate_treatment_effect_parametric,
+    estimate_treatment_effect_parametric_degrees,
 )
 
-# Read in data.
-data = pd.read_stata(ppj("IN_DATA", "Data_public_small.dta"))
-data = data.astype(np.float64)
+# Map the prepared columns and observations relevant for the analysis.
+data = load_columns(ppj("OUT_DATA", "data_analysis", "analysis_data"))
 cutoff = 40.0
 
-# Assign treatment status.
-data["d"] = 0
-data.loc[data["age"] >= cutoff, "d"] = 1
-
 
 for outcome in ["ned", "wg_c"]:
     results = {}
 
-    # Select data relevant for analysis.
-    data_analysis = data.copy()
-    data_analysis = data_analysis.loc[data_analysis["ned"] < 2 * 365]
-
-    # Rename columns to align with estimation functions.
-    data_analysis = data_analysis.rename(columns={outcome: "y", "age": "r"})
+    # Select data relevant for analysis with columns aligned to estimation functions.
+    data_analysis = pd.DataFrame({"r": data["r"], "y": data[outcome], "d": data["d"]})
 
     if outcome == "wg_c":
         data_analysis.dropna(inplace=True)
@@ -37,37 +32,41 @@ for outcome in ["ned", "wg_c"]:
         pass
 
     # Parametric treatment effect estimation.
+    results_degrees = estimate_treatment_effect_parametric_degrees(
+        data=data_analysis, cutoff=cutoff, degrees=range(5),
+    )
     for degree in range(5):
-        results[f"Degree {degree}"] = estimate_treatment_effect_parametric(
-            data=data_analysis, cutoff=cutoff, degree=degree,
-        )
-
-    # Non-parametric treatment effect estimation.
-    h_rot = rule_of_thumb(data=data_analysis, cutoff=cutoff)
-
-    # Restrict dataset for cross-validation to be computationally feasible.
-    np.random.seed(123)
+        results[f"Degree {degree}"] = results_degrees[degree]
+
+    # Non-parametric treatment effect estimation. Split and sort the data once
+    # for the rule-of-thumb bandwidth and the estimation.
+    data_index = build_data_index(data=data_analysis, cutoff=cutoff)
+    h_rot = rule_of_thumb(data=data_index, cutoff=cutoff)
+
+    # Restrict dataset for cross-validation to the neighbourhood of the cutoff and
+    # bin the full sample to keep cross-validation computationally feasible. The
+    # criterion is computed on all observations in the neighbourhood rather than
+    # on a random subsample of 2000 of them, such that the selected bandwidth
+    # differs from the one obtained from the subsample.
     data_cv_sample = data_analysis.copy()
     data_cv_sample = data_cv_sample.loc[data_cv_sample["r"] < 43]
     data_cv_sample = data_cv_sample.loc[data_cv_sample["r"] > 37]
-    data_cv_sample = data_cv_sample.sample(n=2000)
     h_grid = np.linspace(start=0.5 * h_rot, stop=10, num=32)
     h_cv = cross_validation(
-        data=data_cv_sample, cutoff=cutoff, h_grid=h_grid, min_num_obs=10,
+        data=data_cv_sample,
+        cutoff=cutoff,
+        h_grid=h_grid,
+        min_num_obs=10,
+        tolerance=0.001,
     )
 
-    results["Rule-of-Thumb"] = estimate_treatment_effect_nonparametric(
-        data=data_analysis, cutoff=cutoff, bandwidth=h_rot,
+    # Estimate along the whole bandwidth path in one pass over the data.
+    results_path = estimate_treatment_effect_nonparametric_path(
+        data=data_index, cutoff=cutoff, h_grid=np.concatenate(([h_rot, h_cv], h_grid)),
     )
-
-    results["Cross-Validation"] = estimate_treatment_effect_nonparametric(
-        data=data_analysis, cutoff=cutoff, bandwidth=h_cv,
-    )
-
-    for index, h in enumerate(h_grid):
-        results[index + 7] = estimate_treatment_effect_nonparametric(
-            data=data_analysis, cutoff=cutoff, bandwidth=h
-        )
+    labels = ["Rule-of-Thumb", "Cross-Validation"] + list(range(7, 7 + len(h_grid)))
+    for index, label in enumerate(labels):
+        results[label] = {key: values[index] for key, values in results_path.items()}
 
     # Store results in DataFrame, distinguish between results for table and plot.
     df_result = pd.DataFrame.from_dict(results)
@@ -124,8 +123,13 @@ with open(
 ) as j:
     j.write(df_table_results.to_latex(index=True))
 
-# Store results for plotting purposes in separate .dta-files.
-df_plot_result_ned.to_stata(ppj("OUT_TABLES", "data_analysis", "plot_results_ned.dta"))
-df_plot_result_wg_c.to_stata(
-    ppj("OUT_TABLES", "data_analysis", "plot_results_wg_c.dta")
-)
+# Store results for plotting purposes in separate typed result files.
+for outcome, df_plot_result in [
+    ("ned", df_plot_result_ned),
+    ("wg_c", df_plot_result_wg_c),
+]:
+    store_results(
+        ppj("OUT_DATA", "data_analysis", f"plot_results_{outcome}.npz"),
+        results={name: df_plot_result[name] for name in BANDWIDTH_PATH_SCHEMA},
+        schema=BANDWIDTH_PATH_SCHEMA,
+    )
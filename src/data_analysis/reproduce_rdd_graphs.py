@@ -1,46 +1,34 @@
 import matplotlib.pyplot as plt
-import numpy as np
 import pandas as pd
 import seaborn as sns
 
 from bld.project_paths import project_paths_join as ppj
+from src.data_analysis.read_data import load_columns
+from src.functions_nonparametric.binning import aggregate_bins
+from src.functions_nonparametric.binning import evenly_spaced_bins
 
 
-data = pd.read_stata(ppj("IN_DATA", "Data_public_small.dta"))
+# Map the prepared columns and observations relevant for the graphs, including
+# the treatment status.
+data_graph = pd.DataFrame(
+    load_columns(ppj("OUT_DATA", "data_analysis", "analysis_data"))
+).rename(columns={"r": "age"})
 
 
 # Set RDD cutoff.
 cutoff = 40
 
-# Assign treatment status.
-data["d"] = 0
-data.loc[data["age"] >= cutoff, "d"] = 1
-
-data_graph = data.copy()
-data_graph = data_graph.loc[data_graph["ned"] < 2 * 365]
-
 # Bin data with age bins covering 4 months.
-rmin = min(data_graph["age"])
 binsize = 0.333
+bins = evenly_spaced_bins(data_graph["age"].to_numpy(), binsize=binsize, cutoff=cutoff)
 
-# Calculate midpoint of lowest bin.
-binmp_lowest = np.floor((rmin - cutoff) / binsize) * binsize + binsize / 2 + cutoff
-
-# Assign each running variable observation its bin.
-data_graph["binnum"] = round(
-    (
-        (
-            np.floor((data_graph["age"] - cutoff) / binsize) * binsize
-            + binsize / 2
-            + cutoff
-        )
-        - binmp_lowest
-    )
-    / binsize
+# Calculate mean of outcome and running variable for each non-empty bin.
+bin_stats = aggregate_bins(
+    bins["index"],
+    values={column: data_graph[column] for column in ["age", "ned", "wg_c", "d"]},
+    num_bins=bins["midpoints"].shape[0],
 )
-
-# Calculate mean of outcome and running variable for each discrete value.
-data_graph_d = data_graph.groupby(["binnum"], as_index=False).mean()
+data_graph_d = pd.DataFrame(bin_stats["means"])[bin_stats["counts"] > 0]
 # Omit first and last bin as they hold too few observations.
 data_graph_d = data_graph_d[1:-1]
 
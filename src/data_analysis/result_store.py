@@ -0,0 +1,86 @@
+import json
+import os
+
+import numpy as np
+
+
+BANDWIDTH_PATH_SCHEMA = {
+    "coef": "float64",
+    "conf_int_lower": "float64",
+    "conf_int_upper": "float64",
+    "bandwidth": "float64",
+    "rot": "int8",
+    "cv": "int8",
+    "degree": "float64",
+}
+
+
+def store_results(path, results, schema):
+    """
+    Store estimation results as a .npz file holding one typed array per column
+    together with the schema of the results. The file is written to a temporary
+    file first and then renamed, such that readers never see a partially written
+    file.
+
+    Args:
+        path (str): Path of the .npz file.
+        results (dict): Dictionary with an array for each column of the results.
+        schema (dict): Dictionary with the NumPy data type of each column, e.g.
+                    BANDWIDTH_PATH_SCHEMA.
+    """
+
+    if set(results.keys()) != set(schema.keys()):
+        raise ValueError("The results do not match the columns of the schema.")
+    else:
+        pass
+
+    arrays = {}
+    for name, dtype in schema.items():
+        arrays[name] = np.asarray(results[name], dtype=dtype)
+    if len({values.shape for values in arrays.values()}) > 1:
+        raise ValueError("All columns of the results must have the same shape.")
+    else:
+        pass
+    arrays["__schema__"] = np.array(json.dumps(schema))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    with open(path_tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(path_tmp, path)
+
+
+def load_results(path, columns=None, schema=None):
+    """
+    Load columns of estimation results stored with store_results. Only the
+    requested columns are read from the file.
+
+    Args:
+        path (str): Path of the .npz file.
+        columns (list): Names of the columns to load. Default is None, in which
+                        case all columns are loaded.
+        schema (dict): Schema the stored results must have. Default is None, in
+                    which case the schema is not checked.
+
+    Returns:
+        dict: Dictionary with an array for each requested column.
+    """
+
+    with np.load(path) as store:
+        stored_schema = json.loads(str(store["__schema__"]))
+
+        if schema is not None and stored_schema != schema:
+            raise ValueError("The stored results do not match the schema.")
+        else:
+            pass
+
+        if columns is None:
+            columns = list(stored_schema.keys())
+        elif set(columns).issubset(stored_schema.keys()) is False:
+            raise ValueError("Not all columns are contained in the stored results.")
+        else:
+            pass
+
+        results = {name: store[name] for name in columns}
+
+    return results
@@ -0,0 +1,77 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+from read_data import file_digest
+from read_data import load_columns
+from read_data import read_analysis_data
+from read_data import read_stata_columns
+from read_data import store_columns
+from read_data import stored_key
+
+
+@pytest.fixture
+def setup_read_data(tmp_path):
+    out = {}
+    np.random.seed(123)
+    out["data"] = pd.DataFrame(
+        {
+            "age": np.random.uniform(low=30, high=50, size=50),
+            "ned": np.random.uniform(low=0, high=1000, size=50).astype(np.float32),
+            "wg_c": np.random.normal(loc=0, scale=1, size=50),
+            "other": np.arange(50, dtype=np.int32),
+        }
+    )
+    out["data"].loc[3, "wg_c"] = np.nan
+    out["path"] = tmp_path / "data.dta"
+    out["data"].to_stata(out["path"], write_index=False)
+
+    return out
+
+
+def test_read_stata_columns_chunks_match_full_read(setup_read_data):
+    expected_data = pd.read_stata(setup_read_data["path"])
+    calc_data = read_stata_columns(
+        path=setup_read_data["path"], columns=["age", "other"], chunksize=7
+    )
+    assert list(calc_data.keys()) == ["age", "other"]
+    for column in ["age", "other"]:
+        assert calc_data[column].dtype == np.float64
+        assert np.array_equal(calc_data[column], expected_data[column])
+
+
+def test_read_analysis_data_filter(setup_read_data):
+    expected_data = pd.read_stata(setup_read_data["path"]).astype(np.float64)
+    expected_data = expected_data.loc[expected_data["ned"] < 2 * 365]
+    calc_data = read_analysis_data(path=setup_read_data["path"], chunksize=7)
+    for column in ["age", "ned", "wg_c"]:
+        assert calc_data[column].flags["C_CONTIGUOUS"]
+        np.testing.assert_array_equal(calc_data[column], expected_data[column])
+
+
+def test_file_digest(setup_read_data):
+    with open(setup_read_data["path"], "rb") as f:
+        expected_digest = hashlib.sha256(f.read()).hexdigest()
+    assert file_digest(setup_read_data["path"], blocksize=64) == expected_digest
+
+
+def test_stored_columns_are_memory_mapped(setup_read_data, tmp_path):
+    directory = tmp_path / "columns"
+    key = {"source": "abc", "cutoff": 40.0}
+    columns = {"r": setup_read_data["data"]["age"].to_numpy(), "d": np.ones(50)}
+    assert stored_key(directory) is None
+
+    store_columns(directory, columns, key=key)
+    assert stored_key(directory) == key
+    calc_columns = load_columns(directory, key=key)
+    for name, values in columns.items():
+        assert isinstance(calc_columns[name], np.memmap)
+        assert np.array_equal(calc_columns[name], values)
+
+
+def test_load_columns_different_key(setup_read_data, tmp_path):
+    directory = tmp_path / "columns"
+    store_columns(directory, {"d": np.ones(50)}, key={"source": "abc"})
+    with pytest.raises(ValueError):
+        load_columns(directory, key={"source": "def"})
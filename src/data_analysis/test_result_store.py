@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from result_store import BANDWIDTH_PATH_SCHEMA
+from result_store import load_results
+from result_store import store_results
+
+
+@pytest.fixture
+def setup_result_store(tmp_path):
+    out = {}
+    out["results"] = {
+        "coef": np.linspace(start=0.1, stop=0.5, num=5),
+        "conf_int_lower": np.linspace(start=0, stop=0.4, num=5),
+        "conf_int_upper": np.linspace(start=0.2, stop=0.6, num=5),
+        "bandwidth": np.array([np.nan, 1, 2, 3, 4]),
+        "rot": np.array([0, 1, 0, 0, 0]),
+        "cv": np.array([0, 0, 1, 0, 0]),
+        "degree": np.array([1, np.nan, np.nan, np.nan, np.nan]),
+    }
+    out["path"] = str(tmp_path / "results" / "plot_results.npz")
+
+    return out
+
+
+def test_stored_results_keep_values_and_types(setup_result_store):
+    store_results(
+        setup_result_store["path"],
+        results=setup_result_store["results"],
+        schema=BANDWIDTH_PATH_SCHEMA,
+    )
+    calc_results = load_results(
+        setup_result_store["path"], schema=BANDWIDTH_PATH_SCHEMA
+    )
+    for name, dtype in BANDWIDTH_PATH_SCHEMA.items():
+        assert calc_results[name].dtype == dtype
+        np.testing.assert_array_equal(
+            calc_results[name], setup_result_store["results"][name]
+        )
+
+
+def test_load_results_selected_columns(setup_result_store):
+    store_results(
+        setup_result_store["path"],
+        results=setup_result_store["results"],
+        schema=BANDWIDTH_PATH_SCHEMA,
+    )
+    calc_results = load_results(setup_result_store["path"], columns=["coef", "cv"])
+    assert list(calc_results.keys()) == ["coef", "cv"]
+    with pytest.raises(ValueError):
+        load_results(setup_result_store["path"], columns=["coef", "se"])
+
+
+def test_load_results_different_schema(setup_result_store):
+    store_results(
+        setup_result_store["path"],
+        results=setup_result_store["results"],
+        schema=BANDWIDTH_PATH_SCHEMA,
+    )
+    with pytest.raises(ValueError):
+        load_results(
+            setup_result_store["path"],
+            schema={**BANDWIDTH_PATH_SCHEMA, "rot": "float64"},
+        )
+
+
+def test_store_results_columns_input(setup_result_store):
+    results = dict(setup_result_store["results"])
+    del results["degree"]
+    with pytest.raises(ValueError):
+        store_results(
+            setup_result_store["path"], results=results, schema=BANDWIDTH_PATH_SCHEMA
+        )
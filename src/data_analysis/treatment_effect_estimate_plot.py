@@ -2,6 +2,8 @@ import matplotlib.pyplot as plt
 import pandas as pd
 
 from bld.project_paths import project_paths_join as ppj
+from src.data_analysis.result_store import BANDWIDTH_PATH_SCHEMA
+from src.data_analysis.result_store import load_results
 
 
 # Create plot for performance of different bandwidths.
@@ -11,10 +13,21 @@ plt.subplots_adjust(wspace=0.3)
 # Arrange plots for different outcome variables in subplots.
 plot_dict = {"121": "ned", "122": "wg_c"}
 for subplot in plot_dict.keys():
-    data = pd.read_stata(
-        ppj("OUT_TABLES", "data_analysis", f"plot_results_{plot_dict[subplot]}.dta")
+    data_graph = pd.DataFrame(
+        load_results(
+            ppj("OUT_DATA", "data_analysis", f"plot_results_{plot_dict[subplot]}.npz"),
+            columns=[
+                "coef",
+                "conf_int_lower",
+                "conf_int_upper",
+                "bandwidth",
+                "rot",
+                "cv",
+                "degree",
+            ],
+            schema=BANDWIDTH_PATH_SCHEMA,
+        )
     )
-    data_graph = data.copy()
 
     # Collect values used for plotting.
     bw_data = data_graph[data_graph["bandwidth"] != 0]
@@ -0,0 +1,274 @@
+import numpy as np
+
+
+def linear_binning(x, y, grid):
+    """
+    Assign data to an equally spaced grid with linear binning. Every observation
+    splits its unit weight between the two neighbouring grid points in proportion
+    to its distance to them, such that the weighted mean of the grid points
+    equals the mean of the data.
+
+    Args:
+        x (np.array): Array of type np.float64 containing regressor values within
+                    the range of the grid.
+        y (np.array): Array of type np.float64 containing dependent variable
+                    values in the order of x.
+        grid (np.array): Equally spaced grid points in ascending order.
+
+    Returns:
+        dict: Dictionary with arrays of the length of grid holding the sum of
+            weights "counts", the weighted sum of the dependent variable "y_sums"
+            and the weighted sum of its squared deviations from its weighted mean
+            at the grid point "y_ss" at each grid point.
+    """
+
+    num_bins = grid.shape[0]
+
+    if num_bins == 1:
+        out = {}
+        out["counts"] = np.array([x.shape[0]], dtype=np.float64)
+        out["y_sums"] = np.array([np.sum(y)])
+        out["y_ss"] = np.array([np.sum((y - np.mean(y)) ** 2)])
+
+        return out
+    else:
+        pass
+
+    # Locate the grid point below each observation and its relative distance.
+    position = (x - grid[0]) / (grid[1] - grid[0])
+    lower = np.clip(np.floor(position).astype(np.int64), 0, num_bins - 2)
+    share_upper = np.clip(position - lower, 0, 1)
+
+    out = {}
+    for key, values in [("counts", np.ones_like(x)), ("y_sums", y)]:
+        out[key] = np.bincount(
+            lower, weights=values * (1 - share_upper), minlength=num_bins
+        ) + np.bincount(lower + 1, weights=values * share_upper, minlength=num_bins)
+
+    # Sum the squared deviations from the mean at each grid point in a second
+    # pass rather than the squares of the dependent variable, which would cancel
+    # catastrophically for a dependent variable with a large mean.
+    y_means = np.divide(
+        out["y_sums"], out["counts"], out=np.zeros(num_bins), where=out["counts"] > 0,
+    )
+    out["y_ss"] = np.bincount(
+        lower,
+        weights=(1 - share_upper) * (y - y_means[lower]) ** 2,
+        minlength=num_bins,
+    ) + np.bincount(
+        lower + 1,
+        weights=share_upper * (y - y_means[lower + 1]) ** 2,
+        minlength=num_bins,
+    )
+
+    return out
+
+
+def sufficient_statistics(data, cutoff, tolerance=None):
+    """
+    Collect the data on either side of the cutoff as weighted points sorted by
+    the running variable. Without a tolerance, every observation forms a point
+    of unit weight. Otherwise, the running variable on either side is linearly
+    binned onto an equally spaced grid with a distance between grid points of
+    tolerance times the standard deviation of the running variable, and every
+    non-empty grid point forms a point holding the mean and the within-bin
+    variance of the dependent variable. Estimation on the binned data
+    approximates estimation on the original data and its cost depends on the
+    number of bins rather than the number of observations.
+
+    Args:
+        data (pd.DataFrame or dict): Dataframe or dictionary of arrays with data
+                            on the running variable in a column called "r" and
+                            data on the dependent variable in a column called "y".
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+        tolerance (float): Distance between grid points relative to the standard
+                        deviation of the running variable. Default is None, in
+                        which case the data is not binned.
+
+    Returns:
+        dict: Dictionary with keys "left" and "right", each holding a dictionary
+            with arrays on the running variable "r", the mean of the dependent
+            variable "y", the number of observations "weight" and the variance of
+            the dependent variable "y_var" of each point.
+    """
+
+    if tolerance is not None and tolerance <= 0:
+        raise ValueError("The specified tolerance must be positive.")
+    else:
+        pass
+
+    r = np.array(data["r"], dtype=np.float64)
+    y = np.array(data["y"], dtype=np.float64)
+    is_left = r < cutoff
+
+    if np.all(is_left) or not np.any(is_left):
+        raise ValueError("Cutoff must lie within range of the running variable.")
+    else:
+        pass
+
+    if tolerance is not None:
+        bin_width = tolerance * np.std(r)
+    else:
+        pass
+
+    stats = {}
+    for side, index in [("left", is_left), ("right", ~is_left)]:
+        r_side = r[index]
+        y_side = y[index]
+        order = np.argsort(r_side, kind="mergesort")
+        r_side = r_side[order]
+        y_side = y_side[order]
+
+        if tolerance is None:
+            stats[side] = {
+                "r": r_side,
+                "y": y_side,
+                "weight": np.ones_like(r_side),
+                "y_var": np.zeros_like(r_side),
+            }
+
+        else:
+            # Span the data on this side with a grid that starts at the observation
+            # closest to the cutoff, such that no grid point crosses the cutoff.
+            num_bins = int(np.ceil((r_side[-1] - r_side[0]) / bin_width)) + 1
+            if side == "left":
+                grid = r_side[-1] - bin_width * np.arange(num_bins)[::-1]
+            else:
+                grid = r_side[0] + bin_width * np.arange(num_bins)
+            bins = linear_binning(x=r_side, y=y_side, grid=grid)
+            non_empty = bins["counts"] > 0
+            weight = bins["counts"][non_empty]
+            y_mean = bins["y_sums"][non_empty] / weight
+            stats[side] = {
+                "r": grid[non_empty],
+                "y": y_mean,
+                "weight": weight,
+                "y_var": bins["y_ss"][non_empty] / weight,
+            }
+
+    return stats
+
+
+def evenly_spaced_bins(x, binsize, cutoff):
+    """
+    Assign data to evenly spaced bins of the running variable that are aligned
+    at the cutoff, such that no bin contains observations on both sides of it.
+    Bins are numbered starting with the bin holding the smallest observation.
+    The data may hold several datasets in its rows, in which case the bins of
+    each dataset are numbered separately.
+
+    Args:
+        x (np.array): Array of shape (n,) or (M, n) with data on the running
+                    variable. Missing values are not assigned to any bin.
+        binsize (float or np.array): Width of the bins, or an array of shape
+                    (M, 1) with the width of the bins for each dataset.
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+
+    Returns:
+        dict: Dictionary with the bin number of each observation "index", which
+            is -1 for missing values, and the midpoints of the bins "midpoints"
+            of shape (num_bins,) or (M, num_bins).
+    """
+
+    position = np.floor((x - cutoff) / binsize)
+    position_lowest = np.nanmin(position, axis=-1, keepdims=True)
+    index = np.where(np.isnan(x), -1, position - position_lowest).astype(np.int64)
+
+    num_bins = np.max(index) + 1
+    if x.ndim == 1:
+        position_lowest = position_lowest[0]
+    else:
+        pass
+    midpoints = (position_lowest + np.arange(num_bins)) * binsize + binsize / 2 + cutoff
+
+    return {"index": index, "midpoints": midpoints}
+
+
+def quantile_spaced_bins(x, num_bins, cutoff):
+    """
+    Assign data to bins of the running variable that hold about the same number
+    of observations, with num_bins bins on either side of the cutoff. The bins
+    on the left side are numbered first.
+
+    Args:
+        x (np.array): Array of shape (n,) with data on the running variable.
+        num_bins (int): Number of bins on either side of the cutoff.
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+
+    Returns:
+        dict: Dictionary with the bin number of each observation "index", which
+            is -1 for missing values, and the midpoints of the bins "midpoints".
+    """
+
+    if (isinstance(num_bins, int) and num_bins >= 1) is False:
+        raise ValueError("The number of bins must be a positive integer.")
+    else:
+        pass
+
+    is_left = x < cutoff
+    is_right = x >= cutoff
+    if not np.any(is_left) or not np.any(is_right):
+        raise ValueError("Cutoff must lie within range of the running variable.")
+    else:
+        pass
+
+    index = np.full(x.shape, -1, dtype=np.int64)
+    midpoints = []
+    for side, (within, offset) in enumerate([(is_left, 0), (is_right, num_bins)]):
+        edges = np.quantile(x[within], np.linspace(start=0, stop=1, num=num_bins + 1))
+        index[within] = offset + np.clip(
+            np.searchsorted(edges, x[within], side="right") - 1, 0, num_bins - 1
+        )
+        midpoints.append((edges[:-1] + edges[1:]) / 2)
+
+    return {"index": index, "midpoints": np.concatenate(midpoints)}
+
+
+def aggregate_bins(index, values, num_bins):
+    """
+    Compute the number of observations and the mean and variance of any number
+    of variables within each bin by counting and summing over the bin numbers.
+    Missing values of a variable are left out of its mean and variance, and
+    observations with a negative bin number are left out altogether.
+
+    Args:
+        index (np.array): Bin number of each observation, see evenly_spaced_bins
+                        and quantile_spaced_bins.
+        values (dict): Dictionary with an array of the shape of index for each
+                    variable.
+        num_bins (int): Number of bins.
+
+    Returns:
+        dict: Dictionary with the number of observations "counts" in each bin and
+            dictionaries "means" and "variances" holding an array for each
+            variable. Empty bins have a mean and variance of np.nan.
+    """
+
+    index = np.ravel(index)
+    assigned = index >= 0
+
+    stats = {"means": {}, "variances": {}}
+    stats["counts"] = np.bincount(index[assigned], minlength=num_bins)
+    for name, values_var in values.items():
+        values_var = np.ravel(values_var)[assigned].astype(np.float64)
+        observed = ~np.isnan(values_var)
+        bins = index[assigned][observed]
+        values_var = values_var[observed]
+        counts = np.bincount(bins, minlength=num_bins)
+        sums = np.bincount(bins, weights=values_var, minlength=num_bins)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = sums / counts
+        # Sum the squared deviations from the bin means in a second pass, which
+        # avoids the cancellation of the mean of squares minus the squared mean.
+        sums_squared = np.bincount(
+            bins, weights=(values_var - means[bins]) ** 2, minlength=num_bins
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variances = sums_squared / counts
+        stats["means"][name] = means
+        stats["variances"][name] = variances
+
+    return stats
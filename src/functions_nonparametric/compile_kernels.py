@@ -0,0 +1,72 @@
+import json
+import os
+
+import numpy as np
+
+from bld.project_paths import project_paths_join as ppj
+from src.functions_nonparametric.cross_validation import _add_window_moments
+from src.functions_nonparametric.cross_validation import _loo_prediction_matrix
+from src.functions_nonparametric.cross_validation import _solve_local_linear
+from src.functions_nonparametric.cross_validation import _window_moments
+from src.functions_nonparametric.cross_validation import _y_hat_local_linear
+from src.functions_nonparametric.cross_validation import _y_hat_local_linear_sorted
+from src.functions_nonparametric.data_index import _cumulate_moments
+
+
+NUMBA_KERNELS = {
+    "_y_hat_local_linear": _y_hat_local_linear,
+    "_y_hat_local_linear_sorted": _y_hat_local_linear_sorted,
+    "_solve_local_linear": _solve_local_linear,
+    "_add_window_moments": _add_window_moments,
+    "_window_moments": _window_moments,
+    "_loo_prediction_matrix": _loo_prediction_matrix,
+    "_cumulate_moments": _cumulate_moments,
+}
+
+
+def warm_up_kernels():
+    """
+    Prepare the numba kernels of the non-parametric functions for use. The kernels
+    are declared with explicit np.float64 signatures, such that they are compiled
+    once importing their modules and cached on disk next to the source files.
+    Later processes, e.g. the workers of a pool, load the compiled kernels from
+    the cache instead of compiling them again. Each kernel is then called once on
+    a small dataset.
+
+    Returns:
+        dict: Dictionary holding for each kernel the signatures loaded from the
+            on-disk cache in "cache_hits" and the signatures compiled in
+            "cache_misses".
+    """
+
+    x = np.linspace(start=0, stop=1, num=10)
+    y = np.sin(x)
+    weight = np.ones(10)
+
+    _y_hat_local_linear(x, y, 0.5, 0.5)
+    _y_hat_local_linear_sorted(x, y, 0.5, 0.5)
+    _solve_local_linear(1.0, 0.0, 1.0, 1.0, 0.0)
+    _add_window_moments(np.zeros(7), 0.5, 1.0, 1.0)
+    _window_moments(
+        x, y, weight, np.zeros(10, dtype=np.int64), np.arange(10, dtype=np.int64), 1.0
+    )
+    _loo_prediction_matrix(x, y, weight, np.array([0.5]), 2, False)
+    _cumulate_moments(x, y, 0.0, weight, np.zeros(10))
+
+    stats = {}
+    for name, kernel in NUMBA_KERNELS.items():
+        stats[name] = {
+            "cache_hits": sorted(kernel.stats.cache_hits.keys()),
+            "cache_misses": sorted(kernel.stats.cache_misses.keys()),
+        }
+
+    return stats
+
+
+if __name__ == "__main__":
+    # Compile the kernels once before the scripts using them run in parallel and
+    # record which kernels were compiled and which were loaded from the cache.
+    path = ppj("OUT_DATA", "functions_nonparametric", "numba_kernels.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(warm_up_kernels(), f, indent=4)
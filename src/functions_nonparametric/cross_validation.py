@@ -1,14 +1,151 @@
 import numba
 import numpy as np
+from scipy import optimize
 
+from src.functions_nonparametric.data_index import build_data_index
 
-@numba.jit(nopython=True)
-def y_hat_local_linear(x, y, x0, bandwidth):
+
+@numba.jit(
+    "float64(float64, float64, float64, float64, float64)",
+    nopython=True,
+    nogil=True,
+    cache=True,
+)
+def _solve_local_linear(s0, s1, s2, t0, t1):
     """
-    Perform local linear regression with the triangle kernel and a specified
-    bandwidth to predict the value of the dependent variable at some point x0.
-    The function is used in cross-validation to predict the value of the outcome
-    variable at the hold-out observation.
+    Solve the weighted normal equations of a local linear regression in closed
+    form and return the intercept, i.e. the prediction at the point the running
+    variable has been centered at. If the design is singular, e.g. because all
+    observations share the same value of the running variable, the weighted mean
+    of the dependent variable is returned instead.
+
+    Args:
+        s0 (float): Sum of weights.
+        s1 (float): Weighted sum of the centered regressor.
+        s2 (float): Weighted sum of the squared centered regressor.
+        t0 (float): Weighted sum of the dependent variable.
+        t1 (float): Weighted sum of the product of centered regressor and
+                    dependent variable.
+
+    Returns:
+        float: Predicted value of the dependent variable at the centering point.
+    """
+
+    det = s0 * s2 - s1 ** 2
+    if det <= 1e-12 * s0 * s2 or s2 == 0:
+        return t0 / s0
+    else:
+        return (s2 * t0 - s1 * t1) / det
+
+
+@numba.jit(
+    "void(float64[:], float64, float64, float64)",
+    nopython=True,
+    nogil=True,
+    cache=True,
+)
+def _add_window_moments(sums, u, y, weight):
+    """
+    Add an observation to the weighted sums of the moments of a kernel window,
+    see _window_moments. Passing the negative weight removes the observation.
+
+    Args:
+        sums (np.array): Sums of weight * u^0, ..., u^3 and weight * y * u^0, ...,
+                        y * u^2, updated in place.
+        u (float): Regressor value relative to the anchor of the window.
+        y (float): Value of the dependent variable.
+        weight (float): Weight of the observation.
+    """
+
+    sums[0] += weight
+    sums[1] += weight * u
+    sums[2] += weight * u ** 2
+    sums[3] += weight * u ** 3
+    sums[4] += weight * y
+    sums[5] += weight * y * u
+    sums[6] += weight * y * u ** 2
+
+
+@numba.jit(
+    "float64[:, :](float64[:], float64[:], float64[:], int64[:], int64[:], float64)",
+    nopython=True,
+    nogil=True,
+    cache=True,
+)
+def _window_moments(x, y, weight, lower, upper, span):
+    """
+    Compute the weighted sums of the powers of u = x_j - x_i and of their products
+    with y_j over the observations j from lower[i] to upper[i] - 1 for every
+    observation i. The data must be sorted by the regressor, and the windows must
+    move along the data, i.e. lower and upper must be non-decreasing and every
+    window must lie within span of x_i. The sums are updated as the window
+    slides, relative to an anchor that is moved to x_i and the sums recomputed
+    once x_i is more than span away from it. The terms of the sums are thus of
+    the order of the window width, and the moments of narrow windows do not
+    cancel out of sums over the whole data. The dependent variable should be
+    centered for the same reason.
+
+    Args:
+        x (np.array): Sorted array of type np.float64 containing regressor values.
+        y (np.array): Array of type np.float64 containing dependent variable
+                    values in the order of x.
+        weight (np.array): Array of type np.float64 containing the weight of
+                        each observation.
+        lower (np.array): First observation of the window of each observation.
+        upper (np.array): Observation after the window of each observation.
+        span (float): Largest distance between an observation and its window.
+
+    Returns:
+        np.array: Matrix of shape (len(x), 7) holding the sums of weight * u^0,
+                ..., u^3 and weight * y * u^0, ..., y * u^2 for each window.
+    """
+
+    n = x.shape[0]
+    moments = np.zeros((n, 7))
+    sums = np.zeros(7)
+    anchor = 0.0
+    start = 0
+    stop = 0
+
+    for i in range(n):
+        if i == 0 or x[i] - anchor > span:
+            anchor = x[i]
+            sums[:] = 0.0
+            start = lower[i]
+            stop = lower[i]
+        else:
+            pass
+        while stop < upper[i]:
+            _add_window_moments(sums, x[stop] - anchor, y[stop], weight[stop])
+            stop += 1
+        while start < lower[i]:
+            _add_window_moments(sums, x[start] - anchor, y[start], -weight[start])
+            start += 1
+
+        # Shift the sums from the anchor to x_i.
+        d = x[i] - anchor
+        moments[i, 0] = sums[0]
+        moments[i, 1] = sums[1] - d * sums[0]
+        moments[i, 2] = sums[2] - 2 * d * sums[1] + d ** 2 * sums[0]
+        moments[i, 3] = (
+            sums[3] - 3 * d * sums[2] + 3 * d ** 2 * sums[1] - d ** 3 * sums[0]
+        )
+        moments[i, 4] = sums[4]
+        moments[i, 5] = sums[5] - d * sums[4]
+        moments[i, 6] = sums[6] - 2 * d * sums[5] + d ** 2 * sums[4]
+
+    return moments
+
+
+@numba.jit(
+    "float64(float64[:], float64[:], float64, float64)",
+    nopython=True,
+    nogil=True,
+    cache=True,
+)
+def _y_hat_local_linear(x, y, x0, bandwidth):
+    """
+    Compiled kernel of y_hat_local_linear for arrays of type np.float64.
 
     Args:
         x (np.array): Array of type np.float64 containing regressor values used
@@ -59,56 +196,551 @@ def y_hat_local_linear(x, y, x0, bandwidth):
     return y0_hat
 
 
-def cross_validation(data, cutoff, h_grid, min_num_obs):
+def y_hat_local_linear(x, y, x0, bandwidth):
     """
-    Perform leave-one-out cross-validation to select the mean squared error
-    optimal bandwidth used in local linear regression out of a given grid.
-    The procedure is tailored for the context of Regression Discontinuity Design
-    and follows the ideas of Ludwig and Miller (2005) and Imbens and Lemieux (2008).
+    Perform local linear regression with the triangle kernel and a specified
+    bandwidth to predict the value of the dependent variable at some point x0.
+    The function is used in cross-validation to predict the value of the outcome
+    variable at the hold-out observation. The data is cast to contiguous arrays
+    of type np.float64 before it is handed to the compiled kernel.
 
     Args:
-        data (pd.DataFrame): Dataframe with data on the running variable in a
-                            column called "r" and data on the dependent variable
-                            in a column called "y", both of type np.float64.
+        x (np.array): Array containing regressor values used for regression.
+        y (np.array): Array containing dependent variable used for regression.
+        x0 (float): Regressor value at which value of dependent variable is predicted.
+        bandwidth (float): Range of data the kernel uses to assign weights.
+
+    Returns:
+        float: Predicted value of the dependent variable at x0.
+    """
+
+    return _y_hat_local_linear(
+        np.ascontiguousarray(x, dtype=np.float64),
+        np.ascontiguousarray(y, dtype=np.float64),
+        float(x0),
+        float(bandwidth),
+    )
+
+
+@numba.jit(
+    "float64(float64[:], float64[:], float64, float64)",
+    nopython=True,
+    nogil=True,
+    cache=True,
+)
+def _y_hat_local_linear_sorted(x, y, x0, bandwidth):
+    """
+    Compiled kernel of y_hat_local_linear_sorted for arrays of type np.float64.
+
+    Args:
+        x (np.array): Array of type np.float64 containing regressor values used
+                    for regression, sorted in ascending order.
+        y (np.array): Array of type np.float64 containing dependent variable used
+                    for regression in the order of x.
+        x0 (float): Regressor value at which value of dependent variable is predicted.
+        bandwidth (float): Range of data the kernel uses to assign weights.
+
+    Returns:
+        float: Predicted value of the dependent variable at x0.
+    """
+
+    if bandwidth <= 0:
+        raise ValueError("The specified bandwidth must be positive.")
+    else:
+        pass
+
+    # Locate the observations with positive weight, i.e. within (x0 - h, x0 + h).
+    lower = np.searchsorted(x, x0 - bandwidth, side="right")
+    upper = np.searchsorted(x, x0 + bandwidth, side="left")
+
+    # In case of sparse data in the range of the kernel return nan.
+    if upper - lower < 2:
+        return np.nan
+    else:
+        pass
+
+    # Accumulate the weighted normal equations with the regressor centered at x0.
+    s0 = 0.0
+    s1 = 0.0
+    s2 = 0.0
+    t0 = 0.0
+    t1 = 0.0
+    for j in range(lower, upper):
+        u = x[j] - x0
+        weight = 1 - abs(u) / bandwidth
+        s0 += weight
+        s1 += weight * u
+        s2 += weight * u ** 2
+        t0 += weight * y[j]
+        t1 += weight * u * y[j]
+
+    return _solve_local_linear(s0=s0, s1=s1, s2=s2, t0=t0, t1=t1)
+
+
+def y_hat_local_linear_sorted(x, y, x0, bandwidth):
+    """
+    Perform local linear regression with the triangle kernel and a specified
+    bandwidth to predict the value of the dependent variable at some point x0,
+    see y_hat_local_linear, for data sorted by the regressor. The observations
+    with positive kernel weight are located by binary search and the weighted
+    normal equations are accumulated over them and solved in closed form, such
+    that a prediction takes O(log n + k) operations for k observations within
+    the bandwidth and no arrays are allocated. The data is cast to contiguous
+    arrays of type np.float64 before it is handed to the compiled kernel.
+
+    Args:
+        x (np.array): Array containing regressor values used for regression,
+                    sorted in ascending order.
+        y (np.array): Array containing dependent variable used for regression in
+                    the order of x.
+        x0 (float): Regressor value at which value of dependent variable is predicted.
+        bandwidth (float): Range of data the kernel uses to assign weights.
+
+    Returns:
+        float: Predicted value of the dependent variable at x0.
+    """
+
+    return _y_hat_local_linear_sorted(
+        np.ascontiguousarray(x, dtype=np.float64),
+        np.ascontiguousarray(y, dtype=np.float64),
+        float(x0),
+        float(bandwidth),
+    )
+
+
+@numba.jit(
+    "float64[:, :](float64[:], float64[:], float64[:], float64[:], int64, boolean)",
+    nopython=True,
+    nogil=True,
+    cache=True,
+)
+def _loo_prediction_matrix(x, y, weight, h_grid, min_num_obs, left):
+    """
+    Compute the one-sided leave-one-out predictions of local linear regression
+    with the triangle kernel for all observations on one side of the cutoff and
+    all bandwidths at once. The data must be sorted by the running variable in
+    ascending order. For binned data, the points are weighted by the number of
+    observations in their bin and a bin is left out as a whole. For each
+    bandwidth, the moments of the running variable and the dependent variable
+    over the kernel windows are updated as the windows slide along the sorted
+    data, see _window_moments. The kernel-weighted moments of every window, and
+    hence every prediction, are then obtained in constant time.
+
+    Args:
+        x (np.array): Sorted array of type np.float64 containing regressor values.
+        y (np.array): Array of type np.float64 containing dependent variable
+                    values in the order of x.
+        weight (np.array): Array of type np.float64 containing the weight of
+                        each observation, i.e. one for unbinned data.
+        h_grid (np.array): Grid of bandwidths taken into consideration.
+        min_num_obs (int): Minimum number of observations used for fitting the
+                            data at a particular point.
+        left (bool): Whether the data lies left of the cutoff. Then only
+                    observations smaller than or equal to the hold-out observation
+                    are used for fitting, else only larger or equal ones.
+
+    Returns:
+        np.array: Matrix of shape (len(x), len(h_grid)) holding the prediction at
+                each hold-out observation for each bandwidth, np.nan if the
+                kernel includes less than two or the training data less than
+                min_num_obs observations.
+    """
+
+    n = x.shape[0]
+    num_h = h_grid.shape[0]
+    y_hat = np.full((n, num_h), np.nan)
+    if n == 0:
+        return y_hat
+    else:
+        pass
+
+    # Center the dependent variable, such that the moments of the windows do not
+    # cancel for outcomes with a large mean.
+    y_center = np.sum(weight * y) / np.sum(weight)
+    y_centered = y - y_center
+    sign = 1.0 if left else -1.0
+
+    # Left of the cutoff the kernel window of observation i covers (x_i - h, x_i],
+    # right of the cutoff it covers [x_i, x_i + h). The end at x_i is shared by all
+    # bandwidths.
+    cum_weight = np.zeros(n + 1)
+    cum_weight[1:] = np.cumsum(weight)
+    if left:
+        shared_bound = np.searchsorted(x, x, side="right")
+        num_training_obs = cum_weight[shared_bound] - weight
+    else:
+        shared_bound = np.searchsorted(x, x, side="left")
+        num_training_obs = cum_weight[n] - cum_weight[shared_bound] - weight
+
+    for h_index in range(num_h):
+        h = h_grid[h_index]
+        if left:
+            lower = np.searchsorted(x, x - h, side="right")
+            upper = shared_bound
+        else:
+            lower = shared_bound
+            upper = np.searchsorted(x, x + h, side="left")
+
+        # Sums of powers of u = x - x_i over the window of each observation.
+        moments = _window_moments(x, y_centered, weight, lower, upper, h)
+
+        for i in range(n):
+            # Leave the hold-out observation out of the training data.
+            if num_training_obs[i] < min_num_obs or upper[i] - lower[i] - 1 < 2:
+                continue
+            else:
+                pass
+
+            # The hold-out observation has u = 0 and only adds to the sums of u^0.
+            m0 = moments[i, 0] - weight[i]
+            m1 = moments[i, 1]
+            m2 = moments[i, 2]
+            m3 = moments[i, 3]
+            k0 = moments[i, 4] - weight[i] * y_centered[i]
+            k1 = moments[i, 5]
+            k2 = moments[i, 6]
+
+            # Apply the triangle kernel weights 1 - |u| / h which are linear in u
+            # on either side of the hold-out observation.
+            y_hat[i, h_index] = y_center + _solve_local_linear(
+                s0=m0 + sign * m1 / h,
+                s1=m1 + sign * m2 / h,
+                s2=m2 + sign * m3 / h,
+                t0=k0 + sign * k1 / h,
+                t1=k1 + sign * k2 / h,
+            )
+
+    return y_hat
+
+
+def _loo_hat_prediction_matrix(x, y, weight, h_grid, min_num_obs):
+    """
+    Compute the leave-one-out predictions of local linear regression with the
+    triangle kernel for all observations on one side of the cutoff and all
+    bandwidths, using the data on both sides of each hold-out observation. The
+    data must be sorted by the running variable in ascending order. For a linear
+    smoother the leave-one-out prediction follows from the fit on the full data
+    and the leverage L_ii of the hold-out observation as
+    (y_hat_i - L_ii * y_i) / (1 - L_ii). The kernel-weighted moments of all
+    observations are obtained from sliding windows, see _window_moments, such
+    that the predictions for a bandwidth are computed in one pass without
+    refitting. For binned data, the points are weighted by the number of
+    observations in their bin and a bin is left out as a whole.
+
+    Args:
+        x (np.array): Sorted array of type np.float64 containing regressor values.
+        y (np.array): Array of type np.float64 containing dependent variable
+                    values in the order of x.
+        weight (np.array): Array of type np.float64 containing the weight of
+                        each observation, i.e. one for unbinned data.
+        h_grid (np.array): Grid of bandwidths taken into consideration.
+        min_num_obs (int): Minimum number of observations used for fitting the
+                            data at a particular point.
+
+    Returns:
+        np.array: Matrix of shape (len(x), len(h_grid)) holding the prediction at
+                each hold-out observation for each bandwidth, np.nan if the
+                kernel includes less than two or the training data less than
+                min_num_obs observations.
+    """
+
+    n = x.shape[0]
+    y_hat = np.full((n, h_grid.shape[0]), np.nan)
+    if n == 0:
+        return y_hat
+    else:
+        pass
+    enough_training_obs = np.sum(weight) - weight >= min_num_obs
+
+    # Center the dependent variable, such that the moments of the windows do not
+    # cancel for outcomes with a large mean.
+    y_center = np.sum(weight * y) / np.sum(weight)
+    y_centered = y - y_center
+    # Observations up to and including ties of each hold-out observation.
+    middle = np.searchsorted(x, x, side="right")
+
+    for h_index, h in enumerate(h_grid):
+        lower = np.searchsorted(x, x - h, side="right")
+        upper = np.searchsorted(x, x + h, side="left")
+
+        # The triangle kernel weights are 1 + u / h left and 1 - u / h right of x_i.
+        m0, m1, m2, m3, k0, k1, k2 = _window_moments(
+            x, y_centered, weight, lower, middle, h
+        ).T
+        s0 = m0 + m1 / h
+        s1 = m1 + m2 / h
+        s2 = m2 + m3 / h
+        t0 = k0 + k1 / h
+        t1 = k1 + k2 / h
+        m0, m1, m2, m3, k0, k1, k2 = _window_moments(
+            x, y_centered, weight, middle, upper, h
+        ).T
+        s0 = s0 + m0 - m1 / h
+        s1 = s1 + m1 - m2 / h
+        s2 = s2 + m2 - m3 / h
+        t0 = t0 + k0 - k1 / h
+        t1 = t1 + k1 - k2 / h
+
+        # Fit at each observation and its leverage, the kernel weight of the
+        # observation itself is one. The hold-out observation has u = 0 and only
+        # adds to s0 and t0. If the design without it is singular, its leverage
+        # is one and, as in _solve_local_linear, the weighted mean of the other
+        # observations is used instead.
+        det = s0 * s2 - s1 ** 2
+        det_loo = (s0 - weight) * s2 - s1 ** 2
+        singular = (det_loo <= 1e-12 * (s0 - weight) * s2) | (s2 == 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fit = (s2 * t0 - s1 * t1) / det
+            leverage = weight * s2 / det
+            y_hat_loo = y_center + np.where(
+                singular,
+                (t0 - weight * y_centered) / (s0 - weight),
+                (fit - leverage * y_centered) / (1 - leverage),
+            )
+
+        # Leave the hold-out observation out of the training data.
+        valid = enough_training_obs & (upper - lower - 1 >= 2)
+        y_hat[valid, h_index] = y_hat_loo[valid]
+
+    return y_hat
+
+
+def _count_predictions(profile, points, y_hat, h_grid, criterion, left):
+    """
+    Add the number of hold-out predictions, of predictions skipped as np.nan and
+    of training observations inside the kernel windows of the predictions on one
+    side of the cutoff to the counters of a profile, see cross_validation_mse.
+
+    Args:
+        profile (dict): Profile the counters are added to.
+        points (dict): Dictionary holding the points on one side of the cutoff,
+                    see sufficient_statistics.
+        y_hat (np.array): Matrix of hold-out predictions, see
+                        _loo_prediction_matrix.
+        h_grid (np.array): Grid of bandwidths of type np.float64.
+        criterion (str): Data used to predict a hold-out observation, see
+                        cross_validation_mse.
+        left (bool): Whether the points lie left of the cutoff.
+    """
+
+    x = points["r"]
+    weight = points["weight"]
+    cum_weight = np.append(0, np.cumsum(weight))
+    fitted = ~np.isnan(y_hat)
+
+    # Training observations with positive kernel weight, see the windows of
+    # _loo_prediction_matrix and _loo_hat_prediction_matrix.
+    kernel_obs = np.zeros(y_hat.shape)
+    for h_index, h in enumerate(h_grid):
+        if criterion == "loo_hat" or left:
+            lower = np.searchsorted(x, x - h, side="right")
+        else:
+            lower = np.searchsorted(x, x, side="left")
+        if criterion == "loo_hat" or left is False:
+            upper = np.searchsorted(x, x + h, side="left")
+        else:
+            upper = np.searchsorted(x, x, side="right")
+        kernel_obs[:, h_index] = cum_weight[upper] - cum_weight[lower] - weight
+
+    _add_counts(
+        profile,
+        loo_fits=np.sum(fitted),
+        nan_predictions=np.sum(~fitted),
+        kernel_obs=np.sum(kernel_obs[fitted]),
+    )
+
+
+def _add_counts(profile, **counts):
+    """
+    Add counts of the cross-validation procedure to the counters of a profile.
+    The counters are stored in profile["count"] with names prefixed by "cv_".
+
+    Args:
+        profile (dict): Profile the counters are added to.
+        **counts: Count for each counter.
+    """
+
+    profile_counts = profile.setdefault("count", {})
+    for name, count in counts.items():
+        name = f"cv_{name}"
+        profile_counts[name] = profile_counts.get(name, 0) + int(round(count))
+
+
+def _sorted_cross_validation_mse(stats, h_grid, min_num_obs, criterion, profile=None):
+    """
+    Compute the leave-one-out cross-validation criterion for each bandwidth in a
+    grid from weighted points sorted on either side of the cutoff, see
+    cross_validation_mse. For binned data, the squared error of a bin comprises
+    the squared error of its mean and the variance within the bin.
+
+    Args:
+        stats (dict): Dictionary holding the points on either side of the cutoff,
+                    see sufficient_statistics.
+        h_grid (np.array): Grid of bandwidths of type np.float64.
+        min_num_obs (int): Minimum number of observations used for fitting the
+                            data at a particular point.
+        criterion (str): Data used to predict a hold-out observation, see
+                        cross_validation_mse.
+        profile (dict): Profile the counters of the procedure are added to, see
+                        cross_validation_mse. Default is None.
+
+    Returns:
+        np.array: Mean squared error of the hold-out predictions for each
+                bandwidth in h_grid.
+    """
+
+    squared_errors = []
+    weights = []
+    for side in ["left", "right"]:
+        points = stats[side]
+
+        # Obtain predictions for all hold-out points and bandwidths at once.
+        if criterion == "one_sided":
+            y_hat = _loo_prediction_matrix(
+                x=points["r"],
+                y=points["y"],
+                weight=points["weight"],
+                h_grid=h_grid,
+                min_num_obs=min_num_obs,
+                left=side == "left",
+            )
+        else:
+            y_hat = _loo_hat_prediction_matrix(
+                x=points["r"],
+                y=points["y"],
+                weight=points["weight"],
+                h_grid=h_grid,
+                min_num_obs=min_num_obs,
+            )
+        if profile is not None:
+            _count_predictions(
+                profile, points, y_hat, h_grid, criterion, left=side == "left"
+            )
+        else:
+            pass
+        squared_errors.append(
+            points["weight"][:, None]
+            * ((points["y"][:, None] - y_hat) ** 2 + points["y_var"][:, None])
+        )
+        weights.append(np.where(np.isnan(y_hat), 0, points["weight"][:, None]))
+    squared_errors = np.concatenate(squared_errors, axis=0)
+    weights = np.concatenate(weights, axis=0)
+
+    # Adjust mean squared errors according to number of nan-predictions.
+    sum_squared_errors = np.nansum(squared_errors, axis=0)
+    if np.any(sum_squared_errors == 0):
+        raise ValueError("The Kernel does never include any data.")
+    else:
+        mean_squared_errors = sum_squared_errors / np.sum(weights, axis=0)
+
+    return mean_squared_errors
+
+
+def cross_validation_mse(
+    data,
+    cutoff,
+    h_grid,
+    min_num_obs,
+    engine="sorted",
+    criterion="one_sided",
+    tolerance=None,
+    profile=None,
+):
+    """
+    Compute the leave-one-out cross-validation criterion, i.e. the mean squared
+    error of the hold-out predictions of local linear regression, for each
+    bandwidth in a given grid, see cross_validation.
+
+    Args:
+        data (pd.DataFrame or dict): Dataframe with data on the running variable
+                            in a column called "r" and data on the dependent
+                            variable in a column called "y", both of type
+                            np.float64, or an index of the data, see
+                            build_data_index.
         cutoff (float): Cutpoint in the range of the running variable used to
                         distinguish between treatment and control groups.
         h_grid (np.array): Grid of bandwidths taken into consideration.
         min_num_obs (int): Minimum number of observations used for fitting the
                             data at a particular point.
+        engine (str): Implementation used to compute the hold-out predictions.
+                    "sorted" sorts the data once and computes the predictions
+                    for all bandwidths in a single pass from cumulative moment
+                    sums, "refit" deletes every hold-out observation and refits
+                    with y_hat_local_linear_sorted for every bandwidth. Both
+                    yield the same bandwidth. Default is "sorted".
+        criterion (str): Data used to predict a hold-out observation. "one_sided"
+                        uses only the observations further away from the cutoff
+                        as in Ludwig and Miller (2005), "loo_hat" uses the
+                        observations on both sides of the hold-out observation
+                        and derives the leave-one-out predictions from the
+                        leverages of the full fit. Default is "one_sided".
+        tolerance (float): Distance between grid points relative to the standard
+                        deviation of the running variable if the data is binned
+                        to approximate the criterion on large samples, see
+                        sufficient_statistics. Bins are then left out as a whole.
+                        Requires the "sorted" engine. Default is None, in which
+                        case the data is not binned.
+        profile (dict): Profile the counters of the procedure are added to. The
+                        counters in profile["count"] are the number of hold-out
+                        predictions "cv_loo_fits", of predictions skipped as
+                        np.nan "cv_nan_predictions" and of training observations
+                        inside the kernel windows of the predictions
+                        "cv_kernel_obs". Default is None, in which case nothing
+                        is counted.
 
     Returns:
-        float: Mean squared error optimal bandwidth out of h_grid.
+        np.array: Mean squared error of the hold-out predictions for each
+                bandwidth in h_grid.
     """
 
     if np.any(h_grid <= 0):
         raise ValueError("All bandwidths must be positive.")
+    if engine not in ["sorted", "refit"]:
+        raise ValueError("'engine' takes 'sorted' or 'refit' only.")
+    if criterion not in ["one_sided", "loo_hat"]:
+        raise ValueError("'criterion' takes 'one_sided' or 'loo_hat' only.")
+    if tolerance is not None and engine == "refit":
+        raise ValueError("Binned data requires the 'sorted' engine.")
     else:
         pass
 
-    # Split data at the cutoff.
-    data = data[["r", "y"]]
-    data_left = np.array(data[data["r"] < cutoff])
-    data_right = np.array(data[data["r"] >= cutoff])
+    # Split data at the cutoff and sort either side once for all bandwidths,
+    # unless the data is indexed already.
+    index = build_data_index(data=data, cutoff=cutoff, tolerance=tolerance)
 
-    if data_left.size == 0 or data_right.size == 0:
-        raise ValueError("Cutoff must lie within range of the running variable.")
+    if engine == "sorted":
+        # Obtain predictions for all hold-out observations and bandwidths at once.
+        return _sorted_cross_validation_mse(
+            stats=index,
+            h_grid=h_grid.astype(np.float64),
+            min_num_obs=min_num_obs,
+            criterion=criterion,
+            profile=profile,
+        )
     else:
         pass
 
+    data_left = np.column_stack((index["left"]["r"], index["left"]["y"]))
+    data_right = np.column_stack((index["right"]["r"], index["right"]["y"]))
+
     mean_squared_errors = np.zeros_like(h_grid)
 
     # Estimate mean squared error for every bandwidth in h_grid.
     for h_index, h in enumerate(h_grid):
         intermediate_res = 0
         runner_not_nan = 0
+        kernel_obs = 0
 
         # Perform leave-one-out cross-validation separately for data to the left.
         for r_index, r_point in enumerate(data_left[:, 0]):
             training_data = np.delete(data_left, r_index, axis=0)
-            training_data = training_data[training_data[:, 0] <= r_point]
+            if criterion == "one_sided":
+                training_data = training_data[training_data[:, 0] <= r_point]
+            else:
+                pass
             # Predict outcome variable at the hold-out observation.
             if training_data.shape[0] >= min_num_obs:
-                y_hat = y_hat_local_linear(
+                y_hat = _y_hat_local_linear_sorted(
                     x=training_data[:, 0],
                     y=training_data[:, 1],
                     x0=r_point,
@@ -120,16 +752,23 @@ def cross_validation(data, cutoff, h_grid, min_num_obs):
                 else:
                     intermediate_res += (data_left[r_index, 1] - y_hat) ** 2
                     runner_not_nan += 1
+                    if profile is not None:
+                        kernel_obs += np.sum(np.abs(training_data[:, 0] - r_point) < h)
+                    else:
+                        pass
             else:
                 pass
 
         # Perform leave-one-out cross-validation separately for data to the right.
         for r_index, r_point in enumerate(data_right[:, 0]):
             training_data = np.delete(data_right, r_index, axis=0)
-            training_data = training_data[training_data[:, 0] >= r_point]
+            if criterion == "one_sided":
+                training_data = training_data[training_data[:, 0] >= r_point]
+            else:
+                pass
             # Predict outcome variable at the hold-out observation.
             if training_data.shape[0] >= min_num_obs:
-                y_hat = y_hat_local_linear(
+                y_hat = _y_hat_local_linear_sorted(
                     x=training_data[:, 0],
                     y=training_data[:, 1],
                     x0=r_point,
@@ -141,6 +780,10 @@ def cross_validation(data, cutoff, h_grid, min_num_obs):
                 else:
                     intermediate_res += (data_right[r_index, 1] - y_hat) ** 2
                     runner_not_nan += 1
+                    if profile is not None:
+                        kernel_obs += np.sum(np.abs(training_data[:, 0] - r_point) < h)
+                    else:
+                        pass
             else:
                 pass
 
@@ -150,6 +793,165 @@ def cross_validation(data, cutoff, h_grid, min_num_obs):
         else:
             mean_squared_errors[h_index] = intermediate_res / runner_not_nan
 
+        if profile is not None:
+            _add_counts(
+                profile,
+                loo_fits=runner_not_nan,
+                nan_predictions=len(data_left) + len(data_right) - runner_not_nan,
+                kernel_obs=kernel_obs,
+            )
+        else:
+            pass
+
+    return mean_squared_errors
+
+
+def cross_validation(
+    data,
+    cutoff,
+    h_grid,
+    min_num_obs,
+    engine="sorted",
+    criterion="one_sided",
+    tolerance=None,
+    profile=None,
+):
+    """
+    Perform leave-one-out cross-validation to select the mean squared error
+    optimal bandwidth used in local linear regression out of a given grid.
+    The procedure is tailored for the context of Regression Discontinuity Design
+    and follows the ideas of Ludwig and Miller (2005) and Imbens and Lemieux (2008).
+    Alternatively, the hold-out observations can be predicted from the data on
+    both of their sides within the same side of the cutoff, which allows to
+    obtain all leave-one-out predictions from a single fit per bandwidth.
+
+    Args:
+        data (pd.DataFrame or dict): Dataframe with data on the running variable
+                            in a column called "r" and data on the dependent
+                            variable in a column called "y", both of type
+                            np.float64, or an index of the data, see
+                            build_data_index.
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+        h_grid (np.array): Grid of bandwidths taken into consideration.
+        min_num_obs (int): Minimum number of observations used for fitting the
+                            data at a particular point.
+        engine (str): Implementation used to compute the hold-out predictions,
+                    see cross_validation_mse. Default is "sorted".
+        criterion (str): Data used to predict a hold-out observation, see
+                        cross_validation_mse. Default is "one_sided".
+        tolerance (float): Distance between grid points relative to the standard
+                        deviation of the running variable if the data is binned,
+                        see cross_validation_mse. Default is None.
+        profile (dict): Profile the counters of the procedure are added to, see
+                        cross_validation_mse. Default is None.
+
+    Returns:
+        float: Mean squared error optimal bandwidth out of h_grid.
+    """
+
+    mean_squared_errors = cross_validation_mse(
+        data=data,
+        cutoff=cutoff,
+        h_grid=h_grid,
+        min_num_obs=min_num_obs,
+        engine=engine,
+        criterion=criterion,
+        tolerance=tolerance,
+        profile=profile,
+    )
     h_opt = h_grid[np.argmin(mean_squared_errors)]
 
     return h_opt
+
+
+def cross_validation_search(
+    data,
+    cutoff,
+    h_pilot,
+    min_num_obs,
+    criterion="one_sided",
+    num_coarse=5,
+    xtol=0.01,
+    tolerance=None,
+    profile=None,
+):
+    """
+    Select the bandwidth used in local linear regression by minimizing the
+    leave-one-out cross-validation criterion over the interval from 50% to 200%
+    of a pilot bandwidth, e.g. the rule-of-thumb bandwidth. Instead of a dense
+    grid, the criterion is evaluated on a coarse grid first. Brent's method then
+    refines the bandwidth between the neighbours of the best coarse bandwidth,
+    which typically takes only a few evaluations of the criterion.
+
+    Args:
+        data (pd.DataFrame or dict): Dataframe with data on the running variable
+                            in a column called "r" and data on the dependent
+                            variable in a column called "y", both of type
+                            np.float64, or an index of the data, see
+                            build_data_index.
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+        h_pilot (float): Pilot bandwidth that determines the search interval.
+        min_num_obs (int): Minimum number of observations used for fitting the
+                            data at a particular point.
+        criterion (str): Data used to predict a hold-out observation, see
+                        cross_validation_mse. Default is "one_sided".
+        num_coarse (int): Number of bandwidths in the coarse grid. Default is 5.
+        xtol (float): Tolerance of the bandwidth relative to the pilot bandwidth
+                    at which the search stops. Default is 0.01.
+        tolerance (float): Distance between grid points relative to the standard
+                        deviation of the running variable if the data is binned,
+                        see cross_validation_mse. Default is None.
+        profile (dict): Profile the counters of the procedure are added to, see
+                        cross_validation_mse. Default is None.
+
+    Returns:
+        dict: Dictionary containing the selected bandwidth "h_opt" and the number
+            of evaluations of the criterion "num_evaluations".
+    """
+
+    if h_pilot <= 0:
+        raise ValueError("The pilot bandwidth must be positive.")
+    if criterion not in ["one_sided", "loo_hat"]:
+        raise ValueError("'criterion' takes 'one_sided' or 'loo_hat' only.")
+    if (isinstance(num_coarse, int) and num_coarse >= 3) is False:
+        raise ValueError("'num_coarse' must be an integer of at least 3.")
+    else:
+        pass
+
+    index = build_data_index(data=data, cutoff=cutoff, tolerance=tolerance)
+
+    # Evaluate the criterion on a coarse grid in a single pass over the data.
+    h_coarse = np.linspace(start=0.5 * h_pilot, stop=2 * h_pilot, num=num_coarse)
+    mse_coarse = _sorted_cross_validation_mse(
+        stats=index,
+        h_grid=h_coarse,
+        min_num_obs=min_num_obs,
+        criterion=criterion,
+        profile=profile,
+    )
+    best = np.argmin(mse_coarse)
+
+    # Refine the bandwidth between the neighbours of the best coarse bandwidth.
+    refinement = optimize.minimize_scalar(
+        lambda h: _sorted_cross_validation_mse(
+            stats=index,
+            h_grid=np.array([h]),
+            min_num_obs=min_num_obs,
+            criterion=criterion,
+            profile=profile,
+        )[0],
+        bounds=(h_coarse[max(best - 1, 0)], h_coarse[min(best + 1, num_coarse - 1)]),
+        method="bounded",
+        options={"xatol": xtol * h_pilot},
+    )
+
+    out = {}
+    if refinement.fun < mse_coarse[best]:
+        out["h_opt"] = refinement.x
+    else:
+        out["h_opt"] = h_coarse[best]
+    out["num_evaluations"] = num_coarse + refinement.nfev
+
+    return out
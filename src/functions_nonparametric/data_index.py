@@ -0,0 +1,184 @@
+import numba
+import numpy as np
+
+from src.functions_nonparametric.binning import sufficient_statistics
+
+
+def build_data_index(data, cutoff, tolerance=None):
+    """
+    Build an index of the data that the bandwidth selection procedures and the
+    treatment effect estimation share. The index holds the points on either side
+    of the cutoff sorted by the running variable, see sufficient_statistics, and
+    prefix sums of their weighted moments in the order of their distance to the
+    cutoff. Any window between the cutoff and a bound on the running variable is a
+    prefix of that order, such that its number of observations, mean and moments
+    are found by binary search. rule_of_thumb, cross_validation and the
+    estimation functions in treatment_effect_estimation.py accept the index in
+    place of the data, which saves splitting and sorting the data repeatedly.
+
+    Args:
+        data (pd.DataFrame or dict): Dataframe or dictionary of arrays with data
+                            on the running variable in a column called "r" and
+                            data on the dependent variable in a column called "y".
+                            If data already is an index, see is_data_index, it is
+                            returned as is.
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+        tolerance (float): Distance between grid points relative to the standard
+                        deviation of the running variable if the data is binned,
+                        see sufficient_statistics. Default is None, in which case
+                        the data is not binned.
+
+    Returns:
+        dict: Dictionary with the "cutoff" and "tolerance" the index was built
+            for, the number of observations "n", the standard deviation of the
+            running variable "r_scale", the mean of the dependent variable
+            "y_center" and for keys "left" and "right" the points on either side,
+            see sufficient_statistics, extended by their prefix sums "moments",
+            see window_moments.
+    """
+
+    if is_data_index(data):
+        if data["cutoff"] != cutoff or data["tolerance"] != tolerance:
+            raise ValueError(
+                "The data index was built for a different cutoff or tolerance."
+            )
+        else:
+            return data
+    else:
+        pass
+
+    stats = sufficient_statistics(data=data, cutoff=cutoff, tolerance=tolerance)
+    r = np.concatenate((stats["left"]["r"], stats["right"]["r"]))
+    y = np.concatenate((stats["left"]["y"], stats["right"]["y"]))
+    weight = np.concatenate((stats["left"]["weight"], stats["right"]["weight"]))
+    n = np.sum(stats["left"]["weight"]) + np.sum(stats["right"]["weight"])
+
+    index = {"cutoff": cutoff, "tolerance": tolerance, "n": n}
+    index["r_scale"] = np.sqrt(
+        np.sum(weight * (r - np.sum(weight * r) / n) ** 2) / (n - 1)
+    )
+    index["y_center"] = np.sum(weight * y) / n
+
+    # Accumulate the moments starting at the point closest to the cutoff. The
+    # running variable is scaled by its standard deviation and the dependent
+    # variable is centered for the sums of squares, which keeps the moments
+    # well-scaled.
+    for side, order in [("left", slice(None, None, -1)), ("right", slice(None))]:
+        points = stats[side]
+        index[side] = dict(points)
+        index[side]["moments"] = _cumulate_moments(
+            t=(points["r"][order] - cutoff) / index["r_scale"],
+            y=points["y"][order],
+            y_center=index["y_center"],
+            weight=points["weight"][order],
+            y_var=points["y_var"][order],
+        )
+
+    return index
+
+
+def is_data_index(data):
+    """
+    Check whether data is an index built by build_data_index rather than data in
+    a dataframe or a dictionary of columns. An index holds the prefix sums of the
+    moments of the points on either side of the cutoff.
+
+    Args:
+        data (pd.DataFrame or dict): Data or index of the data.
+
+    Returns:
+        bool: Indication whether data is an index.
+    """
+
+    return (
+        isinstance(data, dict)
+        and isinstance(data.get("left"), dict)
+        and "moments" in data["left"]
+    )
+
+
+def window_moments(index, side, bound, closed=True):
+    """
+    Look up the weighted moments of the points between the cutoff and a bound on
+    the running variable on one side of the cutoff.
+
+    Args:
+        index (dict): Index of the data, see build_data_index.
+        side (str): Side of the cutoff, "left" or "right".
+        bound (float): Bound on the running variable on the respective side.
+        closed (bool): Whether points at the bound are included. Default is True.
+
+    Returns:
+        dict: Dictionary with the sum of weights "weight", the weighted sums of
+            the powers zero to six of the running variable minus the cutoff and
+            scaled by r_scale "t", the weighted sums of the dependent variable
+            times powers zero to three of the scaled running variable "ty", the
+            weighted sum of the dependent variable minus y_center "y_centered"
+            and the weighted sum of its square plus the variance within each
+            point "y2".
+    """
+
+    if side == "left":
+        points = index["left"]
+        num_points = points["r"].shape[0] - np.searchsorted(
+            points["r"], bound, side="left" if closed is True else "right"
+        )
+    elif side == "right":
+        points = index["right"]
+        num_points = np.searchsorted(
+            points["r"], bound, side="right" if closed is True else "left"
+        )
+    else:
+        raise ValueError("'side' takes 'left' or 'right' only.")
+
+    cum_sums = points["moments"][num_points]
+
+    moments = {}
+    moments["weight"] = cum_sums[0]
+    moments["t"] = cum_sums[:7]
+    moments["ty"] = cum_sums[7:11]
+    moments["y_centered"] = cum_sums[11]
+    moments["y2"] = cum_sums[12]
+
+    return moments
+
+
+@numba.jit(
+    "float64[:, :](float64[:], float64[:], float64, float64[:], float64[:])",
+    nopython=True,
+    nogil=True,
+    cache=True,
+)
+def _cumulate_moments(t, y, y_center, weight, y_var):
+    """
+    Accumulate the prefix sums of the weighted moments in a single pass.
+
+    Args:
+        t (np.array): Scaled running variable in the order of accumulation.
+        y (np.array): Dependent variable in the order of t.
+        y_center (float): Value subtracted from the dependent variable in its
+                        sums of squares.
+        weight (np.array): Weight of each point in the order of t.
+        y_var (np.array): Variance of the dependent variable within each point.
+
+    Returns:
+        np.array: Array of shape (len(t) + 1, 13) holding the prefix sums of
+            w t^p for p = 0, ..., 6, of w y t^p for p = 0, ..., 3, of
+            w (y - y_center) and of w ((y - y_center)^2 + y_var) in its columns.
+    """
+
+    cum_sums = np.zeros((t.shape[0] + 1, 13))
+    for i in range(t.shape[0]):
+        cum_sums[i + 1] = cum_sums[i]
+        t_power = weight[i]
+        for p in range(7):
+            cum_sums[i + 1, p] += t_power
+            if p < 4:
+                cum_sums[i + 1, 7 + p] += t_power * y[i]
+            t_power *= t[i]
+        y_centered = y[i] - y_center
+        cum_sums[i + 1, 11] += weight[i] * y_centered
+        cum_sums[i + 1, 12] += weight[i] * (y_centered ** 2 + y_var[i])
+
+    return cum_sums
@@ -1,8 +1,10 @@
 import numpy as np
-import pandas as pd
 
+from src.functions_nonparametric.data_index import build_data_index
+from src.functions_nonparametric.data_index import window_moments
 
-def rule_of_thumb(data, cutoff):
+
+def rule_of_thumb(data, cutoff, tolerance=None):
     """
     Calculate the mean squared error optimal bandwidth to be used in local
     linear regression with a rule-of-thumb procedure developed by
@@ -13,46 +15,44 @@ def rule_of_thumb(data, cutoff):
     boundary optimal triangle kernel.
 
     Args:
-        data (pd.DataFrame): Dataframe with data on the running variable in a
-                            column called "r" and data on the dependent variable
-                            in a column called "y".
+        data (pd.DataFrame or dict): Dataframe with data on the running variable
+                            in a column called "r" and data on the dependent
+                            variable in a column called "y", or an index of the
+                            data, see build_data_index.
         cutoff (float): Cutpoint in range of the running variable used to
                         distinguish between treatment and control groups.
+        tolerance (float): Distance between grid points relative to the standard
+                        deviation of the running variable if the data is binned
+                        to approximate the bandwidth on large samples, see
+                        sufficient_statistics. Default is None, in which case the
+                        data is not binned.
 
     Returns:
         float: Mean squared error optimal rule-of-thumb bandwidth.
     """
 
-    # Split data at the cutoff.
-    data = data[["r", "y"]]
-    data_left = np.array(data[data["r"] < cutoff])
-    data_right = np.array(data[data["r"] >= cutoff])
-    n = data.shape[0]
-    n_left = data_left.shape[0]
-    n_right = data_right.shape[0]
-
-    if n_left == 0 or n_right == 0:
-        raise ValueError("Cutoff must lie within range of the running variable.")
-    else:
-        pass
+    # Look up the points on either side of the cutoff and their prefix sums.
+    index = build_data_index(data=data, cutoff=cutoff, tolerance=tolerance)
+    n_left = np.sum(index["left"]["weight"])
+    n_right = np.sum(index["right"]["weight"])
+    n = index["n"]
+    r_scale = index["r_scale"]
 
     # STEP 1: Estimation of density and conditional variance.
     # Compute bandwidth used for estimation of density and conditional variance
     # with Silverman's rule of thumb.
-    h_1 = 1.84 * np.sqrt(pd.DataFrame.var(data, axis=0)[0]) * n ** (-1 / 5)
+    h_1 = 1.84 * r_scale * n ** (-1 / 5)
 
     if h_1 <= 0:
         raise ValueError("The computed bandwidth h_1 is not positive.")
     else:
         pass
 
-    # Select data within the pilot bandwidth at the cutoff and compute mean of outcome variable.
-    data_h_1_left = data_left[data_left[:, 0] >= cutoff - h_1]
-    data_h_1_right = data_right[data_right[:, 0] <= cutoff + h_1]
-    n_h_1_left = data_h_1_left.shape[0]
-    n_h_1_right = data_h_1_right.shape[0]
-    y_mean_h_1_left = np.sum(data_h_1_left, axis=0)[1] / n_h_1_left
-    y_mean_h_1_right = np.sum(data_h_1_right, axis=0)[1] / n_h_1_right
+    # Select data within the pilot bandwidth at the cutoff.
+    moments_h_1_left = window_moments(index, side="left", bound=cutoff - h_1)
+    moments_h_1_right = window_moments(index, side="right", bound=cutoff + h_1)
+    n_h_1_left = moments_h_1_left["weight"]
+    n_h_1_right = moments_h_1_right["weight"]
 
     # Compute estimate of the running variable's density function at the cutoff.
     f_hat = (n_h_1_left + n_h_1_right) / (2 * n * h_1)
@@ -62,11 +62,15 @@ def rule_of_thumb(data, cutoff):
     else:
         pass
 
-    # Compute estimate of outcome given the running variable at the cutoff.
-    sigma_hat = (
-        np.sum((data_h_1_left[:, 1] - y_mean_h_1_left) ** 2)
-        + np.sum((data_h_1_right[:, 1] - y_mean_h_1_right) ** 2)
-    ) / (n_h_1_left + n_h_1_right)
+    # Compute estimate of outcome given the running variable at the cutoff from
+    # the sums of squares around the mean on either side.
+    ssr_h_1_left = (
+        moments_h_1_left["y2"] - moments_h_1_left["y_centered"] ** 2 / n_h_1_left
+    )
+    ssr_h_1_right = (
+        moments_h_1_right["y2"] - moments_h_1_right["y_centered"] ** 2 / n_h_1_right
+    )
+    sigma_hat = (ssr_h_1_left + ssr_h_1_right) / (n_h_1_left + n_h_1_right)
 
     if sigma_hat <= 0:
         raise ValueError(
@@ -77,23 +81,32 @@ def rule_of_thumb(data, cutoff):
 
     # STEP 2: Estimation of second derivatives.
     # Temporarily discard observations left of median_r_left and right of median_r_right.
-    median_r_left = np.median(data_left, axis=0)[0]
-    median_r_right = np.median(data_right, axis=0)[0]
-    bigger_than_median_left = data_left[data_left[:, 0] > median_r_left]
-    smaller_than_median_right = data_right[data_right[:, 0] < median_r_right]
-    data_temp = np.concatenate(
-        (bigger_than_median_left, smaller_than_median_right), axis=0
+    median_r_left = _weighted_median(index["left"]["r"], index["left"]["weight"])
+    median_r_right = _weighted_median(index["right"]["r"], index["right"]["weight"])
+    moments_median_left = window_moments(
+        index, side="left", bound=median_r_left, closed=False
+    )
+    moments_median_right = window_moments(
+        index, side="right", bound=median_r_right, closed=False
     )
-    r_temp = data_temp[:, 0] - cutoff
-    y_temp = data_temp[:, 1]
 
-    # Estimate third derivative of the regression function.
-    r_temp_powers = r_temp[:, None] ** np.arange(4)
-    treatment_indicator = np.zeros((data_temp.shape[0], 1))
-    treatment_indicator[np.where(data_temp[:, 0] >= cutoff)] = 1
-    r_temp_powers = np.concatenate((treatment_indicator, r_temp_powers), axis=1)
-    reg_results = np.linalg.lstsq(a=r_temp_powers, b=y_temp, rcond=None)
-    m3_hat = 6 * reg_results[0][4]
+    # Estimate third derivative of the regression function from the normal
+    # equations of a cubic fit with a treatment indicator.
+    powers = np.add.outer(np.arange(4), np.arange(4))
+    t_sums_left = moments_median_left["t"]
+    t_sums_right = moments_median_right["t"]
+    xtwx = np.zeros((5, 5))
+    xtwx[0, 0] = t_sums_right[0]
+    xtwx[0, 1:] = t_sums_right[:4]
+    xtwx[1:, 0] = t_sums_right[:4]
+    xtwx[1:, 1:] = t_sums_left[powers] + t_sums_right[powers]
+    xtwy = np.zeros(5)
+    xtwy[0] = moments_median_right["ty"][0]
+    xtwy[1:] = moments_median_left["ty"] + moments_median_right["ty"]
+    reg_results = _solve_normal_equations(
+        xtwx=xtwx, xtwy=xtwy, scale=np.append(1, r_scale ** np.arange(4))
+    )
+    m3_hat = 6 * reg_results[4]
 
     # Compute bandwidths used for estimation of the regression functions' curvature.
     h_2_left = (
@@ -115,24 +128,26 @@ def rule_of_thumb(data, cutoff):
         pass
 
     # Select data within the bandwidths at the cutoff.
-    data_h_2_left = data_left[data_left[:, 0] >= cutoff - h_2_left]
-    data_h_2_right = data_right[data_right[:, 0] <= cutoff + h_2_right]
-    n_h_2_left = data_h_2_left.shape[0]
-    n_h_2_right = data_h_2_right.shape[0]
-
-    # Estimate the curvature of the regression function left of the cutoff.
-    r_h_2_left = data_h_2_left[:, 0] - cutoff
-    y_h_2_left = data_h_2_left[:, 1]
-    r_powers_h_2_left = r_h_2_left[:, None] ** np.arange(3)
-    reg_results_left = np.linalg.lstsq(r_powers_h_2_left, y_h_2_left, rcond=None)
-    m2_hat_left = 2 * reg_results_left[0][2]
-
-    # Estimate the curvature of the regression function right of the cutoff.
-    r_h_2_right = data_h_2_right[:, 0] - cutoff
-    y_h_2_right = data_h_2_right[:, 1]
-    r_powers_h_2_right = r_h_2_right[:, None] ** np.arange(3)
-    reg_results_right = np.linalg.lstsq(a=r_powers_h_2_right, b=y_h_2_right, rcond=None)
-    m2_hat_right = 2 * reg_results_right[0][2]
+    moments_h_2_left = window_moments(index, side="left", bound=cutoff - h_2_left)
+    moments_h_2_right = window_moments(index, side="right", bound=cutoff + h_2_right)
+    n_h_2_left = moments_h_2_left["weight"]
+    n_h_2_right = moments_h_2_right["weight"]
+
+    # Estimate the curvature of the regression function on either side of the
+    # cutoff from the normal equations of a quadratic fit.
+    powers = np.add.outer(np.arange(3), np.arange(3))
+    reg_results_left = _solve_normal_equations(
+        xtwx=moments_h_2_left["t"][powers],
+        xtwy=moments_h_2_left["ty"][:3],
+        scale=r_scale ** np.arange(3),
+    )
+    m2_hat_left = 2 * reg_results_left[2]
+    reg_results_right = _solve_normal_equations(
+        xtwx=moments_h_2_right["t"][powers],
+        xtwy=moments_h_2_right["ty"][:3],
+        scale=r_scale ** np.arange(3),
+    )
+    m2_hat_right = 2 * reg_results_right[2]
 
     # STEP 3: Calculation of regularisation terms and optimal bandwidth.
     regul_term_left = 720 * sigma_hat / (n_h_2_left * h_2_left ** 4)
@@ -157,3 +172,46 @@ def rule_of_thumb(data, cutoff):
     )
 
     return h_opt
+
+
+def _weighted_median(x, weight):
+    """
+    Compute the weighted median of sorted data. For unit weights and an even
+    number of observations it is the mean of the two central observations.
+
+    Args:
+        x (np.array): Sorted data.
+        weight (np.array): Weight of each observation.
+
+    Returns:
+        float: Weighted median.
+    """
+
+    cum_weight = np.cumsum(weight)
+    half = cum_weight[-1] / 2
+    index = np.searchsorted(cum_weight, half, side="left")
+    if cum_weight[index] == half:
+        return (x[index] + x[index + 1]) / 2
+    else:
+        return x[index]
+
+
+def _solve_normal_equations(xtwx, xtwy, scale):
+    """
+    Solve the normal equations of a least squares problem whose regressors were
+    divided by a scale. The coefficients are returned for the unscaled
+    regressors. If the design is rank deficient, the solution with the smallest
+    norm of these coefficients is returned, as least squares on the unscaled
+    design matrix would.
+
+    Args:
+        xtwx (np.array): Weighted cross-products of the scaled regressors.
+        xtwy (np.array): Weighted cross-products of the scaled regressors and the
+                        dependent variable.
+        scale (np.array): Scale each regressor was divided by.
+
+    Returns:
+        np.array: Least squares coefficients of the unscaled regressors.
+    """
+
+    return np.linalg.lstsq(a=xtwx * scale, b=xtwy, rcond=None)[0]
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+import pytest
+from binning import aggregate_bins
+from binning import evenly_spaced_bins
+from binning import linear_binning
+from binning import quantile_spaced_bins
+from binning import sufficient_statistics
+from cross_validation import cross_validation_mse
+from rule_of_thumb import rule_of_thumb
+from treatment_effect_estimation import estimate_treatment_effect_nonparametric
+
+
+@pytest.fixture
+def setup_binning():
+    out = {}
+    np.random.seed(123)
+    r = np.random.normal(loc=0, scale=1, size=20000)
+    y = 1 + 0.75 * (r >= 0) + r + np.random.normal(loc=0, scale=0.5, size=20000)
+    out["data"] = pd.DataFrame({"r": r, "y": y, "d": (r >= 0).astype(np.float64)})
+    out["cutoff"] = 0
+    out["tolerance"] = 0.001
+
+    return out
+
+
+def test_linear_binning_preserves_moments():
+    np.random.seed(123)
+    x = np.random.uniform(low=0, high=1, size=100)
+    y = np.random.normal(loc=0, scale=1, size=100)
+    grid = np.linspace(start=0, stop=1, num=11)
+
+    calc_bins = linear_binning(x=x, y=y, grid=grid)
+    assert np.isclose(np.sum(calc_bins["counts"]), 100)
+    assert np.isclose(np.sum(calc_bins["y_sums"]), np.sum(y))
+    y_means = calc_bins["y_sums"] / calc_bins["counts"]
+    assert np.isclose(
+        np.sum(calc_bins["y_ss"]) + np.sum(calc_bins["counts"] * y_means ** 2),
+        np.sum(y ** 2),
+    )
+    assert np.isclose(np.sum(calc_bins["counts"] * grid), np.sum(x))
+
+
+def test_sufficient_statistics_unbinned(setup_binning):
+    calc_stats = sufficient_statistics(
+        data=setup_binning["data"], cutoff=setup_binning["cutoff"]
+    )
+    r = np.array(setup_binning["data"]["r"])
+    assert np.array_equal(calc_stats["left"]["r"], np.sort(r[r < 0]))
+    assert np.array_equal(calc_stats["right"]["r"], np.sort(r[r >= 0]))
+    assert np.all(calc_stats["left"]["weight"] == 1)
+    assert np.all(calc_stats["right"]["y_var"] == 0)
+
+
+def test_sufficient_statistics_binned_sides(setup_binning):
+    calc_stats = sufficient_statistics(
+        data=setup_binning["data"],
+        cutoff=setup_binning["cutoff"],
+        tolerance=setup_binning["tolerance"],
+    )
+    assert np.all(calc_stats["left"]["r"] < setup_binning["cutoff"])
+    assert np.all(calc_stats["right"]["r"] >= setup_binning["cutoff"])
+    assert np.isclose(
+        np.sum(calc_stats["left"]["weight"]) + np.sum(calc_stats["right"]["weight"]),
+        setup_binning["data"].shape[0],
+    )
+
+
+def test_sufficient_statistics_large_mean(setup_binning):
+    data = setup_binning["data"]
+    calc_stats = sufficient_statistics(
+        data=data, cutoff=setup_binning["cutoff"], tolerance=0.01,
+    )
+    calc_stats_shifted = sufficient_statistics(
+        data=data.assign(y=data["y"] + 1e8),
+        cutoff=setup_binning["cutoff"],
+        tolerance=0.01,
+    )
+    for side in ["left", "right"]:
+        assert np.allclose(
+            calc_stats_shifted[side]["y_var"], calc_stats[side]["y_var"], atol=1e-6
+        )
+
+
+def test_sufficient_statistics_positive_tolerance(setup_binning):
+    with pytest.raises(ValueError):
+        sufficient_statistics(
+            data=setup_binning["data"], cutoff=setup_binning["cutoff"], tolerance=0
+        )
+
+
+def test_binned_estimates_approximate_unbinned(setup_binning):
+    kwargs = {"data": setup_binning["data"], "cutoff": setup_binning["cutoff"]}
+    tolerance = setup_binning["tolerance"]
+
+    h_rot = rule_of_thumb(**kwargs)
+    assert np.isclose(rule_of_thumb(**kwargs, tolerance=tolerance), h_rot, rtol=0.05)
+
+    h_grid = np.linspace(start=0.5 * h_rot, stop=2 * h_rot, num=5)
+    assert np.allclose(
+        cross_validation_mse(**kwargs, h_grid=h_grid, min_num_obs=10),
+        cross_validation_mse(
+            **kwargs, h_grid=h_grid, min_num_obs=10, tolerance=tolerance
+        ),
+        rtol=0.01,
+    )
+
+    expected_reg_out = estimate_treatment_effect_nonparametric(
+        **kwargs, bandwidth=h_rot
+    )
+    calc_reg_out = estimate_treatment_effect_nonparametric(
+        **kwargs, bandwidth=h_rot, tolerance=tolerance
+    )
+    assert np.isclose(calc_reg_out["coef"], expected_reg_out["coef"], atol=0.01)
+    assert np.isclose(calc_reg_out["se"], expected_reg_out["se"], rtol=0.05)
+
+
+def test_evenly_spaced_bins_contain_observations(setup_binning):
+    r = setup_binning["data"]["r"].to_numpy()
+    calc_bins = evenly_spaced_bins(r, binsize=0.1, cutoff=setup_binning["cutoff"])
+    midpoints = calc_bins["midpoints"][calc_bins["index"]]
+    assert calc_bins["index"].min() == 0
+    assert np.all(np.abs(r - midpoints) <= 0.05 + 1e-12)
+    assert np.all((r >= 0) == (midpoints >= 0))
+
+
+def test_evenly_spaced_bins_numbered_by_dataset():
+    r = np.array([[-1.05, 0.25, 0.3, np.nan], [0.95, 1.05, 1.25, 2.0]])
+    calc_bins = evenly_spaced_bins(r, binsize=np.array([[0.5], [0.1]]), cutoff=0)
+    expected_index = np.array([[0, 3, 3, -1], [0, 1, 3, 11]])
+    assert np.array_equal(calc_bins["index"], expected_index)
+    assert np.allclose(calc_bins["midpoints"][:, 0], [-1.25, 0.95])
+
+
+def test_quantile_spaced_bins_equal_counts(setup_binning):
+    r = setup_binning["data"]["r"].to_numpy()
+    calc_bins = quantile_spaced_bins(r, num_bins=10, cutoff=setup_binning["cutoff"])
+    counts = np.bincount(calc_bins["index"], minlength=20)
+    assert np.all(np.abs(counts[:10] - np.sum(r < 0) / 10) <= 1)
+    assert np.all(np.abs(counts[10:] - np.sum(r >= 0) / 10) <= 1)
+    assert np.all((calc_bins["index"] >= 10) == (r >= 0))
+
+
+def test_aggregate_bins_match_groupby():
+    np.random.seed(123)
+    index = np.random.randint(low=0, high=5, size=200)
+    y = np.random.normal(size=200)
+    y[:10] = np.nan
+    calc_stats = aggregate_bins(index, values={"y": y}, num_bins=6)
+    expected_stats = pd.Series(y).groupby(index).agg(["mean", "var", "count"])
+    expected_var = expected_stats["var"] * (expected_stats["count"] - 1)
+    expected_var = expected_var / expected_stats["count"]
+    assert np.array_equal(calc_stats["counts"], np.bincount(index, minlength=6))
+    assert np.allclose(calc_stats["means"]["y"][:5], expected_stats["mean"])
+    assert np.allclose(calc_stats["variances"]["y"][:5], expected_var)
+    assert np.isnan(calc_stats["means"]["y"][5])
+
+
+def test_aggregate_bins_large_mean():
+    np.random.seed(123)
+    index = np.random.randint(low=0, high=5, size=200)
+    y = np.random.normal(size=200)
+    calc_stats = aggregate_bins(index, values={"y": y + 1e8}, num_bins=5)
+    expected_var = pd.Series(y).groupby(index).var(ddof=0)
+    assert np.allclose(calc_stats["variances"]["y"], expected_var, atol=1e-6)
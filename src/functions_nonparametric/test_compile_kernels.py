@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from compile_kernels import NUMBA_KERNELS
+from compile_kernels import warm_up_kernels
+
+
+def test_warm_up_kernels_covers_all_kernels():
+    calc_stats = warm_up_kernels()
+    assert set(calc_stats.keys()) == set(NUMBA_KERNELS.keys())
+    for name, kernel in NUMBA_KERNELS.items():
+        # Every kernel is compiled for its explicit signature only, either in this
+        # process or in an earlier one that filled the cache.
+        assert len(kernel.signatures) == 1
+        assert (
+            len(calc_stats[name]["cache_hits"]) + len(calc_stats[name]["cache_misses"])
+            == 1
+        )
+
+
+def test_kernels_signature_input():
+    with pytest.raises(TypeError):
+        NUMBA_KERNELS["_y_hat_local_linear"](np.arange(5), np.ones(5), 1.0, 2.0)
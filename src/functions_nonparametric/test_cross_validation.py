@@ -1,8 +1,14 @@
 import numpy as np
 import pandas as pd
 import pytest
+from cross_validation import _loo_hat_prediction_matrix
+from cross_validation import _loo_prediction_matrix
+from cross_validation import _window_moments
 from cross_validation import cross_validation
+from cross_validation import cross_validation_mse
+from cross_validation import cross_validation_search
 from cross_validation import y_hat_local_linear
+from cross_validation import y_hat_local_linear_sorted
 
 
 @pytest.fixture
@@ -79,6 +85,67 @@ def test_local_linear_empty_kernel(setup_local_linear):
     assert np.isnan(calc_y0_hat)
 
 
+def test_local_linear_integer_input():
+    x = np.arange(10)
+    y = 2 * np.arange(10) + 1
+    for predict in [y_hat_local_linear, y_hat_local_linear_sorted]:
+        calc_y0_hat = predict(x=x, y=list(y), x0=4, bandwidth=3)
+        assert np.isclose(calc_y0_hat, 9.0)
+
+
+def test_local_linear_sorted_y0_hat(setup_local_linear, expected_local_linear):
+    order = np.argsort(setup_local_linear["x"])
+    calc_y0_hat = y_hat_local_linear_sorted(
+        x=setup_local_linear["x"][order],
+        y=setup_local_linear["y"][order],
+        x0=setup_local_linear["x0"],
+        bandwidth=setup_local_linear["bandwidth"],
+    )
+    assert np.isclose(calc_y0_hat, expected_local_linear["y0_hat"])
+
+
+def test_local_linear_sorted_agrees_with_full_scan():
+    np.random.seed(123)
+    x = np.sort(np.random.uniform(low=-1, high=1, size=200))
+    y = np.sin(3 * x) + np.random.normal(loc=0, scale=0.2, size=200)
+    for x0 in [-1.0, -0.3, 0.0, 0.55, 0.9]:
+        for bandwidth in [0.05, 0.2, 1.0]:
+            assert np.isclose(
+                y_hat_local_linear_sorted(x=x, y=y, x0=x0, bandwidth=bandwidth),
+                y_hat_local_linear(x=x, y=y, x0=x0, bandwidth=bandwidth),
+            )
+
+
+def test_local_linear_sorted_empty_kernel(setup_local_linear):
+    order = np.argsort(setup_local_linear["x"])
+    calc_y0_hat = y_hat_local_linear_sorted(
+        x=setup_local_linear["x"][order],
+        y=setup_local_linear["y"][order],
+        x0=6.0,
+        bandwidth=setup_local_linear["bandwidth"],
+    )
+    assert np.isnan(calc_y0_hat)
+
+
+def test_window_moments_agree_with_direct_sums():
+    np.random.seed(123)
+    x = np.sort(np.round(np.random.uniform(low=30, high=50, size=200000), 4))
+    y = np.random.normal(loc=0, scale=30, size=200000)
+    weight = np.ones(200000)
+    h = 0.005
+    lower = np.searchsorted(x, x - h, side="right")
+    upper = np.searchsorted(x, x + h, side="left")
+
+    calc_moments = _window_moments(x, y, weight, lower, upper, h)
+    for i in np.random.choice(200000, size=100, replace=False):
+        u = x[lower[i] : upper[i]] - x[i]
+        y_window = y[lower[i] : upper[i]]
+        expected_moments = [np.sum(u ** p) for p in range(4)] + [
+            np.sum(y_window * u ** p) for p in range(3)
+        ]
+        assert np.allclose(calc_moments[i], expected_moments, rtol=1e-9, atol=1e-12)
+
+
 def test_cross_validation_positive_h_grid(setup_cross_validation):
     with pytest.raises(ValueError):
         cross_validation(
@@ -127,3 +194,269 @@ def test_cross_validation_h_opt_in_h_grid(setup_cross_validation):
         min_num_obs=setup_cross_validation["min_num_obs"],
     )
     assert np.any(setup_cross_validation["h_grid"] == calc_h_opt)
+
+
+def test_cross_validation_engines_agree(setup_cross_validation):
+    calc_h_opt_sorted = cross_validation(
+        data=setup_cross_validation["data"],
+        cutoff=setup_cross_validation["cutoff"],
+        h_grid=setup_cross_validation["h_grid"],
+        min_num_obs=setup_cross_validation["min_num_obs"],
+        engine="sorted",
+    )
+    calc_h_opt_refit = cross_validation(
+        data=setup_cross_validation["data"],
+        cutoff=setup_cross_validation["cutoff"],
+        h_grid=setup_cross_validation["h_grid"],
+        min_num_obs=setup_cross_validation["min_num_obs"],
+        engine="refit",
+    )
+    assert calc_h_opt_sorted == calc_h_opt_refit
+
+
+def test_cross_validation_engines_agree_simulated_data():
+    np.random.seed(123)
+    r = np.random.normal(loc=0, scale=1, size=200)
+    y = np.sin(3 * r) + 0.75 * (r >= 0) + np.random.normal(loc=0, scale=0.5, size=200)
+    data = pd.DataFrame({"r": r, "y": y})
+    h_grid = np.linspace(start=0.2, stop=1.5, num=12)
+
+    calc_h_opt_sorted = cross_validation(
+        data=data, cutoff=0, h_grid=h_grid, min_num_obs=10, engine="sorted"
+    )
+    calc_h_opt_refit = cross_validation(
+        data=data, cutoff=0, h_grid=h_grid, min_num_obs=10, engine="refit"
+    )
+    assert calc_h_opt_sorted == calc_h_opt_refit
+
+
+def test_cross_validation_engine_input(setup_cross_validation):
+    with pytest.raises(ValueError):
+        cross_validation(
+            data=setup_cross_validation["data"],
+            cutoff=setup_cross_validation["cutoff"],
+            h_grid=setup_cross_validation["h_grid"],
+            min_num_obs=setup_cross_validation["min_num_obs"],
+            engine="fast",
+        )
+
+
+def test_loo_prediction_matrix_agrees_with_refit(setup_cross_validation):
+    data = np.array(setup_cross_validation["data"])
+    data_right = data[data[:, 0] >= setup_cross_validation["cutoff"]]
+    h_grid = np.array([1.0, 0.5, 2.0])
+
+    calc_y_hat = _loo_prediction_matrix(
+        x=data_right[:, 0],
+        y=data_right[:, 1],
+        weight=np.ones(data_right.shape[0]),
+        h_grid=h_grid,
+        min_num_obs=2,
+        left=False,
+    )
+    assert calc_y_hat.shape == (data_right.shape[0], h_grid.shape[0])
+
+    for h_index, h in enumerate(h_grid):
+        for r_index, r_point in enumerate(data_right[:, 0]):
+            training_data = np.delete(data_right, r_index, axis=0)
+            training_data = training_data[training_data[:, 0] >= r_point]
+            if training_data.shape[0] >= 2:
+                expected_y_hat = y_hat_local_linear(
+                    x=training_data[:, 0],
+                    y=training_data[:, 1],
+                    x0=r_point,
+                    bandwidth=h,
+                )
+            else:
+                expected_y_hat = np.nan
+            assert np.isclose(
+                calc_y_hat[r_index, h_index], expected_y_hat, equal_nan=True
+            )
+
+
+def test_loo_prediction_matrix_large_sample_narrow_bandwidths():
+    np.random.seed(123)
+    x = np.sort(np.round(np.random.uniform(low=30, high=50, size=200000), 4))
+    y = 1e5 + np.sin(x) + np.random.normal(loc=0, scale=30, size=200000)
+    h_grid = np.array([0.005, 0.02])
+
+    for left in [True, False]:
+        calc_y_hat = _loo_prediction_matrix(
+            x=x, y=y, weight=np.ones(200000), h_grid=h_grid, min_num_obs=2, left=left,
+        )
+        for i in np.random.choice(np.arange(1000, 199000), size=50, replace=False):
+            training = np.arange(200000) != i
+            if left:
+                training &= x <= x[i]
+            else:
+                training &= x >= x[i]
+            for h_index, h in enumerate(h_grid):
+                expected_y_hat = y_hat_local_linear_sorted(
+                    x=x[training], y=y[training], x0=x[i], bandwidth=h
+                )
+                assert np.isclose(
+                    calc_y_hat[i, h_index], expected_y_hat, rtol=0, atol=1e-6
+                )
+
+
+def test_cross_validation_loo_hat_engines_agree_simulated_data():
+    np.random.seed(123)
+    r = np.random.normal(loc=0, scale=1, size=200)
+    y = np.sin(3 * r) + 0.75 * (r >= 0) + np.random.normal(loc=0, scale=0.5, size=200)
+    data = pd.DataFrame({"r": r, "y": y})
+    h_grid = np.linspace(start=0.2, stop=1.5, num=12)
+
+    calc_h_opt_sorted = cross_validation(
+        data=data,
+        cutoff=0,
+        h_grid=h_grid,
+        min_num_obs=10,
+        engine="sorted",
+        criterion="loo_hat",
+    )
+    calc_h_opt_refit = cross_validation(
+        data=data,
+        cutoff=0,
+        h_grid=h_grid,
+        min_num_obs=10,
+        engine="refit",
+        criterion="loo_hat",
+    )
+    assert calc_h_opt_sorted == calc_h_opt_refit
+
+
+def test_cross_validation_loo_hat_engines_agree_tied_data():
+    np.random.seed(123)
+    r = np.round(np.random.normal(loc=0, scale=1, size=200), 1)
+    y = np.sin(3 * r) + 0.75 * (r >= 0) + np.random.normal(loc=0, scale=0.5, size=200)
+    data = pd.DataFrame({"r": r, "y": y})
+    h_grid = np.linspace(start=0.16, stop=1.06, num=10)
+
+    calc_mse_sorted = cross_validation_mse(
+        data=data,
+        cutoff=0,
+        h_grid=h_grid,
+        min_num_obs=10,
+        engine="sorted",
+        criterion="loo_hat",
+    )
+    calc_mse_refit = cross_validation_mse(
+        data=data,
+        cutoff=0,
+        h_grid=h_grid,
+        min_num_obs=10,
+        engine="refit",
+        criterion="loo_hat",
+    )
+    assert np.allclose(calc_mse_sorted, calc_mse_refit, rtol=1e-10, atol=0)
+
+
+def test_cross_validation_profile_engines_agree():
+    np.random.seed(123)
+    r = np.random.normal(loc=0, scale=1, size=200)
+    y = np.sin(3 * r) + 0.75 * (r >= 0) + np.random.normal(loc=0, scale=0.5, size=200)
+    data = pd.DataFrame({"r": r, "y": y})
+    h_grid = np.linspace(start=0.2, stop=1.5, num=4)
+
+    for criterion in ["one_sided", "loo_hat"]:
+        profiles = []
+        for engine in ["sorted", "refit"]:
+            profile = {}
+            cross_validation(
+                data=data,
+                cutoff=0,
+                h_grid=h_grid,
+                min_num_obs=10,
+                engine=engine,
+                criterion=criterion,
+                profile=profile,
+            )
+            profiles.append(profile)
+        assert profiles[0] == profiles[1]
+        counts = profiles[0]["count"]
+        assert counts["cv_loo_fits"] + counts["cv_nan_predictions"] == 200 * 4
+        assert counts["cv_kernel_obs"] > 2 * counts["cv_loo_fits"]
+
+
+def test_cross_validation_criterion_input(setup_cross_validation):
+    with pytest.raises(ValueError):
+        cross_validation(
+            data=setup_cross_validation["data"],
+            cutoff=setup_cross_validation["cutoff"],
+            h_grid=setup_cross_validation["h_grid"],
+            min_num_obs=setup_cross_validation["min_num_obs"],
+            criterion="two_sided",
+        )
+
+
+def test_loo_hat_prediction_matrix_agrees_with_refit(setup_cross_validation):
+    data = np.array(setup_cross_validation["data"])
+    data_right = data[data[:, 0] >= setup_cross_validation["cutoff"]]
+    h_grid = np.array([1.0, 0.5, 2.0])
+
+    calc_y_hat = _loo_hat_prediction_matrix(
+        x=data_right[:, 0],
+        y=data_right[:, 1],
+        weight=np.ones(data_right.shape[0]),
+        h_grid=h_grid,
+        min_num_obs=2,
+    )
+    assert calc_y_hat.shape == (data_right.shape[0], h_grid.shape[0])
+
+    for h_index, h in enumerate(h_grid):
+        for r_index, r_point in enumerate(data_right[:, 0]):
+            training_data = np.delete(data_right, r_index, axis=0)
+            expected_y_hat = y_hat_local_linear(
+                x=training_data[:, 0], y=training_data[:, 1], x0=r_point, bandwidth=h,
+            )
+            assert np.isclose(
+                calc_y_hat[r_index, h_index], expected_y_hat, equal_nan=True
+            )
+
+
+def test_loo_hat_prediction_matrix_large_sample_narrow_bandwidths():
+    np.random.seed(123)
+    x = np.sort(np.round(np.random.uniform(low=30, high=50, size=200000), 4))
+    y = 1e5 + np.sin(x) + np.random.normal(loc=0, scale=30, size=200000)
+    h_grid = np.array([0.005, 0.02])
+
+    calc_y_hat = _loo_hat_prediction_matrix(
+        x=x, y=y, weight=np.ones(200000), h_grid=h_grid, min_num_obs=2,
+    )
+    for i in np.random.choice(np.arange(1000, 199000), size=50, replace=False):
+        training = np.arange(200000) != i
+        for h_index, h in enumerate(h_grid):
+            expected_y_hat = y_hat_local_linear_sorted(
+                x=x[training], y=y[training], x0=x[i], bandwidth=h
+            )
+            assert np.isclose(calc_y_hat[i, h_index], expected_y_hat, rtol=0, atol=1e-6)
+
+
+def test_cross_validation_search_beats_coarse_grid():
+    np.random.seed(123)
+    r = np.random.normal(loc=0, scale=1, size=300)
+    y = np.sin(3 * r) + 0.75 * (r >= 0) + np.random.normal(loc=0, scale=0.5, size=300)
+    data = pd.DataFrame({"r": r, "y": y})
+
+    calc_search = cross_validation_search(
+        data=data, cutoff=0, h_pilot=0.6, min_num_obs=10, num_coarse=5
+    )
+    assert 0.3 <= calc_search["h_opt"] <= 1.2
+    assert calc_search["num_evaluations"] > 5
+    mse_search = cross_validation_mse(
+        data=data, cutoff=0, h_grid=np.array([calc_search["h_opt"]]), min_num_obs=10
+    )
+    mse_coarse = cross_validation_mse(
+        data=data, cutoff=0, h_grid=np.linspace(0.3, 1.2, 5), min_num_obs=10
+    )
+    assert mse_search[0] <= np.min(mse_coarse)
+
+
+def test_cross_validation_search_positive_pilot(setup_cross_validation):
+    with pytest.raises(ValueError):
+        cross_validation_search(
+            data=setup_cross_validation["data"],
+            cutoff=setup_cross_validation["cutoff"],
+            h_pilot=-1.0,
+            min_num_obs=setup_cross_validation["min_num_obs"],
+        )
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from cross_validation import cross_validation_mse
+from data_index import build_data_index
+from data_index import is_data_index
+from data_index import window_moments
+from rule_of_thumb import rule_of_thumb
+from treatment_effect_estimation import estimate_treatment_effect_nonparametric
+
+
+@pytest.fixture
+def setup_data_index():
+    out = {}
+    np.random.seed(123)
+    r = np.round(np.random.normal(loc=0, scale=1, size=1000), 2)
+    y = 1 + 0.75 * (r >= 0) + r + np.random.normal(loc=0, scale=0.5, size=1000)
+    out["data"] = pd.DataFrame({"r": r, "y": y, "d": (r >= 0).astype(np.float64)})
+    out["cutoff"] = 0
+
+    return out
+
+
+def test_window_moments_match_window(setup_data_index):
+    r = setup_data_index["data"]["r"].to_numpy()
+    y = setup_data_index["data"]["y"].to_numpy()
+    index = build_data_index(
+        data=setup_data_index["data"], cutoff=setup_data_index["cutoff"]
+    )
+    for side, bound, closed in [
+        ("left", -0.5, True),
+        ("left", -0.5, False),
+        ("right", 0.5, True),
+        ("right", 0.5, False),
+    ]:
+        if side == "left" and closed is True:
+            within = (r >= bound) & (r < 0)
+        elif side == "left":
+            within = (r > bound) & (r < 0)
+        elif closed is True:
+            within = (r <= bound) & (r >= 0)
+        else:
+            within = (r < bound) & (r >= 0)
+        calc_moments = window_moments(index, side=side, bound=bound, closed=closed)
+        assert calc_moments["weight"] == np.sum(within)
+        assert np.isclose(calc_moments["ty"][0], np.sum(y[within]))
+        assert np.isclose(
+            calc_moments["t"][2], np.sum((r[within] / index["r_scale"]) ** 2)
+        )
+
+
+def test_window_moments_side_input(setup_data_index):
+    index = build_data_index(
+        data=setup_data_index["data"], cutoff=setup_data_index["cutoff"]
+    )
+    with pytest.raises(ValueError):
+        window_moments(index, side="both", bound=0.5)
+
+
+def test_data_index_in_place_of_data(setup_data_index):
+    data = setup_data_index["data"]
+    cutoff = setup_data_index["cutoff"]
+    index = build_data_index(data=data, cutoff=cutoff)
+
+    assert rule_of_thumb(index, cutoff) == rule_of_thumb(data, cutoff)
+
+    h_grid = np.linspace(start=0.5, stop=1, num=5)
+    assert np.array_equal(
+        cross_validation_mse(index, cutoff, h_grid=h_grid, min_num_obs=10),
+        cross_validation_mse(data, cutoff, h_grid=h_grid, min_num_obs=10),
+    )
+
+    calc_reg_out = estimate_treatment_effect_nonparametric(index, cutoff, bandwidth=1)
+    expected_reg_out = estimate_treatment_effect_nonparametric(
+        data, cutoff, bandwidth=1
+    )
+    for key in expected_reg_out:
+        assert np.isclose(calc_reg_out[key], expected_reg_out[key])
+
+
+def test_data_index_different_cutoff(setup_data_index):
+    index = build_data_index(
+        data=setup_data_index["data"], cutoff=setup_data_index["cutoff"]
+    )
+    with pytest.raises(ValueError):
+        rule_of_thumb(index, cutoff=0.5)
+
+
+def test_data_index_from_column_dict(setup_data_index):
+    data = setup_data_index["data"]
+    cutoff = setup_data_index["cutoff"]
+    columns = {var: data[var].to_numpy() for var in ["r", "y", "d"]}
+    index = build_data_index(data=columns, cutoff=cutoff)
+    assert is_data_index(index) and is_data_index(columns) is False
+
+    assert rule_of_thumb(columns, cutoff) == rule_of_thumb(data, cutoff)
+    h_grid = np.linspace(start=0.5, stop=1, num=5)
+    assert np.array_equal(
+        cross_validation_mse(columns, cutoff, h_grid=h_grid, min_num_obs=10),
+        cross_validation_mse(data, cutoff, h_grid=h_grid, min_num_obs=10),
+    )
+    calc_reg_out = estimate_treatment_effect_nonparametric(columns, cutoff, bandwidth=1)
+    expected_reg_out = estimate_treatment_effect_nonparametric(
+        data, cutoff, bandwidth=1
+    )
+    for key in expected_reg_out:
+        assert calc_reg_out[key] == expected_reg_out[key]
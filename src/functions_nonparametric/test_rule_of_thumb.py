@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import pytest
 from rule_of_thumb import rule_of_thumb
@@ -22,6 +23,7 @@ def setup_rule_of_thumb():
         index=range(9),
     )
     out["cutoff"] = 2.5
+    out["h_opt"] = 1.0606925551711828
 
     return out
 
@@ -33,6 +35,24 @@ def test_rule_of_thumb_positive_h_opt(setup_rule_of_thumb):
     assert calc_h_opt > 0
 
 
+def test_rule_of_thumb_expected_h_opt(setup_rule_of_thumb):
+    calc_h_opt = rule_of_thumb(
+        data=setup_rule_of_thumb["data"], cutoff=setup_rule_of_thumb["cutoff"]
+    )
+    assert np.isclose(calc_h_opt, setup_rule_of_thumb["h_opt"], rtol=1e-10)
+
+
+def test_rule_of_thumb_invariant_to_outcome_level():
+    np.random.seed(123)
+    r = np.random.normal(loc=40, scale=3, size=1000)
+    y = 0.1 * (r - 40) ** 2 + (r >= 40) + np.random.normal(size=1000)
+    calc_h_opt = rule_of_thumb(data=pd.DataFrame({"r": r, "y": y}), cutoff=40)
+    calc_h_opt_shifted = rule_of_thumb(
+        data=pd.DataFrame({"r": r, "y": y + 1000}), cutoff=40
+    )
+    assert np.isclose(calc_h_opt, calc_h_opt_shifted, rtol=1e-8)
+
+
 def test_rule_of_thumb_cutoff_within_range(setup_rule_of_thumb):
     with pytest.raises(ValueError):
         rule_of_thumb(data=setup_rule_of_thumb["data"], cutoff=6)
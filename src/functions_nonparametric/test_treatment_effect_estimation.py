@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 import pytest
 from treatment_effect_estimation import estimate_treatment_effect_nonparametric
+from treatment_effect_estimation import estimate_treatment_effect_nonparametric_path
 
 
 @pytest.fixture
@@ -48,3 +50,22 @@ def test_estimate_treatment_effect_nonparametric_empty_kernel(
             bandwidth=setup_treatment_effect_estimation["bandwidth"],
             alpha=setup_treatment_effect_estimation["alpha"],
         )
+
+
+def test_estimate_treatment_effect_nonparametric_path_matches_single():
+    np.random.seed(123)
+    r = np.random.normal(loc=0, scale=1, size=300)
+    d = (r >= 0).astype(np.float64)
+    y = 1 + 0.75 * d + np.sin(2 * r) + np.random.normal(loc=0, scale=0.5, size=300)
+    data = pd.DataFrame({"r": r, "y": y, "d": d})
+    h_grid = np.array([1.5, 0.3, 0.8, 2.5])
+
+    calc_reg_out = estimate_treatment_effect_nonparametric_path(
+        data=data, cutoff=0, h_grid=h_grid
+    )
+    for h_index, h in enumerate(h_grid):
+        expected_reg_out = estimate_treatment_effect_nonparametric(
+            data=data, cutoff=0, bandwidth=h
+        )
+        for key, value in expected_reg_out.items():
+            assert np.isclose(calc_reg_out[key][h_index], value)
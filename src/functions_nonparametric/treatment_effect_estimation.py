@@ -1,8 +1,13 @@
 import numpy as np
-import statsmodels.api as sm
+from scipy import stats
 
+from src.functions_nonparametric.data_index import build_data_index
+from src.functions_nonparametric.data_index import is_data_index
 
-def estimate_treatment_effect_nonparametric(data, cutoff, bandwidth, alpha=0.05):
+
+def estimate_treatment_effect_nonparametric(
+    data, cutoff, bandwidth, alpha=0.05, tolerance=None
+):
     """
     Estimate treatment effect non-parametrically with local linear regression
     using the boundary optimal triangle kernel and a specified bandwidth. Following
@@ -11,62 +16,173 @@ def estimate_treatment_effect_nonparametric(data, cutoff, bandwidth, alpha=0.05)
     Center the running variable by subtracting the cutoff before estimation.
 
     Args:
-        data (pd.DataFrame): Dataframe with data on the running variable in a
-                            column called "r", data on the dependent variable
-                            in a column called "y" and data on the treatment
-                            status in a column called "d".
+        data (pd.DataFrame or dict): Dataframe with data on the running variable
+                            in a column called "r", data on the dependent
+                            variable in a column called "y" and data on the
+                            treatment status in a column called "d", or an index
+                            of the data, see build_data_index.
         cutoff (float): Cutpoint in the range of the running variable used to
                         distinguish between treatment and control groups.
         bandwidth (float): Bandwidth used in local linear regression.
         alpha (float): Significance level used to construct confidence intervals.
                         Default is 0.05.
+        tolerance (float): Distance between grid points relative to the standard
+                        deviation of the running variable if the data is binned,
+                        see estimate_treatment_effect_nonparametric_path.
+                        Default is None.
 
     Returns:
         dict: Dictionary containing estimation results.
     """
 
-    if bandwidth <= 0:
+    # Estimate along a bandwidth path holding a single bandwidth.
+    reg_out_path = estimate_treatment_effect_nonparametric_path(
+        data=data,
+        cutoff=cutoff,
+        h_grid=np.array([bandwidth]),
+        alpha=alpha,
+        tolerance=tolerance,
+    )
+
+    reg_out = {}
+    for key, values in reg_out_path.items():
+        reg_out[key] = values[0]
+
+    return reg_out
+
+
+def estimate_treatment_effect_nonparametric_path(
+    data, cutoff, h_grid, alpha=0.05, tolerance=None
+):
+    """
+    Estimate treatment effect non-parametrically with local linear regression
+    using the boundary optimal triangle kernel for a whole grid of bandwidths, see
+    estimate_treatment_effect_nonparametric. The data is sorted by the distance
+    of the running variable to the cutoff once. As the triangle kernel weight of
+    an observation at distance a is 1 - a / h, the weighted cross-product matrices
+    of the regression equal sum(z z') - sum(a z z') / h over all observations
+    within the bandwidth. Both sums are accumulated while the bandwidth grows, so
+    the whole grid is estimated in a single pass over the sorted data. On large
+    samples, the data can be binned on either side of the cutoff, in which case
+    the cross-products are accumulated over bins weighted by their number of
+    observations, with the treatment status given by the side of the cutoff. The
+    same holds if an index of the data is passed, see build_data_index.
+
+    Args:
+        data (pd.DataFrame or dict): Dataframe with data on the running variable
+                            in a column called "r", data on the dependent
+                            variable in a column called "y" and data on the
+                            treatment status in a column called "d", or an index
+                            of the data, see build_data_index.
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+        h_grid (np.array): Grid of bandwidths used in local linear regression.
+        alpha (float): Significance level used to construct confidence intervals.
+                        Default is 0.05.
+        tolerance (float): Distance between grid points relative to the standard
+                        deviation of the running variable if the data is binned
+                        to approximate the estimates on large samples, see
+                        sufficient_statistics. Default is None, in which case the
+                        data is not binned.
+
+    Returns:
+        dict: Dictionary containing arrays of estimation results for each
+            bandwidth in h_grid.
+    """
+
+    h_grid = np.asarray(h_grid, dtype=np.float64)
+    if np.any(h_grid <= 0):
         raise ValueError("The specified bandwidth must be positive.")
     else:
         pass
 
-    r = np.array(data["r"])
-    y = np.array(data["y"])
-    d = np.array(data["d"])
+    if is_data_index(data) is False and tolerance is None:
+        r = np.array(data["r"], dtype=np.float64) - cutoff
+        y = np.array(data["y"], dtype=np.float64)
+        d = np.array(data["d"], dtype=np.float64)
+        weight = np.ones_like(r)
+        y_var = np.zeros_like(r)
+    else:
+        points = build_data_index(data=data, cutoff=cutoff, tolerance=tolerance)
+        r = np.concatenate((points["left"]["r"], points["right"]["r"])) - cutoff
+        y = np.concatenate((points["left"]["y"], points["right"]["y"]))
+        d = (r >= 0).astype(np.float64)
+        weight = np.concatenate((points["left"]["weight"], points["right"]["weight"]))
+        y_var = np.concatenate((points["left"]["y_var"], points["right"]["y_var"]))
+
+    # Sort observations by their distance to the cutoff.
+    distance = np.abs(r)
+    order = np.argsort(distance, kind="mergesort")
+    distance = distance[order]
+    weight = weight[order]
+    # Center the outcome to keep the sums of squares well-scaled. This leaves all
+    # coefficients but the intercept unchanged.
+    y = y[order] - np.sum(weight * y[order]) / np.sum(weight)
+    y_var = y_var[order]
+    regressors = np.column_stack((d, np.ones_like(r), r, r * d))[order]
 
-    # Compute weights with triangle kernel.
-    data_points = np.abs(r - cutoff) / bandwidth
-    weights = np.zeros_like(data_points)
-    index_pos_weight = np.where(data_points <= 1)
-    weights[index_pos_weight] = 1 - data_points[index_pos_weight]
+    # Number of observations with positive kernel weight for each bandwidth.
+    h_order = np.argsort(h_grid, kind="mergesort")
+    num_obs = np.searchsorted(distance, h_grid, side="left")
 
-    if np.all(weights == 0):
+    if np.any(num_obs == 0):
         raise ValueError("The Kernel does not include any data.")
     else:
         pass
 
-    # Consider only datapoints with positive weight to reduce computation time.
-    r = r[np.where(weights > 0)]
-    y = y[np.where(weights > 0)]
-    d = d[np.where(weights > 0)]
-    weights = weights[np.where(weights > 0)]
-    sqrt_weights = np.sqrt(weights)
-
-    # Perform local linear regression with centered running variable.
-    r = r - cutoff
-    r_powers = r[:, None] ** np.arange(2)
-    r_powers_interact = r_powers[:, 1:] * d[:, None]
-    regressors = np.column_stack((d, r_powers, r_powers_interact))
-    regressors_weighted = regressors * sqrt_weights[:, None]
-    y_weighted = y * sqrt_weights
-    reg_results = sm.OLS(endog=y_weighted, exog=regressors_weighted).fit()
+    coef = np.zeros_like(h_grid)
+    se = np.zeros_like(h_grid)
+    df_resid = np.zeros_like(h_grid)
+
+    # Accumulate sums of cross-products and distance-weighted cross-products.
+    zz = np.zeros((4, 4))
+    zz_dist = np.zeros((4, 4))
+    zy = np.zeros(4)
+    zy_dist = np.zeros(4)
+    yy = 0.0
+    yy_dist = 0.0
+    num_included = 0
+    weight_included = 0.0
+
+    for h_index in h_order:
+        h = h_grid[h_index]
+        new = slice(num_included, num_obs[h_index])
+        z_new = regressors[new]
+        z_new_weighted = z_new * weight[new, np.newaxis]
+        z_new_dist = z_new_weighted * distance[new, np.newaxis]
+        y2_new = weight[new] * (y[new] ** 2 + y_var[new])
+        zz += z_new_weighted.T @ z_new
+        zz_dist += z_new_dist.T @ z_new
+        zy += z_new_weighted.T @ y[new]
+        zy_dist += z_new_dist.T @ y[new]
+        yy += np.sum(y2_new)
+        yy_dist += y2_new @ distance[new]
+        num_included = num_obs[h_index]
+        weight_included += np.sum(weight[new])
+
+        # Apply the triangle kernel weights and solve the normal equations.
+        xtwx = zz - zz_dist / h
+        xtwy = zy - zy_dist / h
+        ytwy = yy - yy_dist / h
+        xtwx_inv = np.linalg.pinv(xtwx)
+        params = xtwx_inv @ xtwy
+        df_resid[h_index] = weight_included - np.linalg.matrix_rank(xtwx)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = (ytwy - params @ xtwy) / df_resid[h_index]
+        coef[h_index] = params[0]
+        se[h_index] = np.sqrt(scale * xtwx_inv[0, 0])
+
+    # Construct t-based confidence intervals and p-values.
+    q = stats.t.ppf(1 - alpha / 2, df_resid)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_values = coef / se
 
     # Store estimation results in a dictionary.
     reg_out = {}
-    reg_out["coef"] = reg_results.params[0]
-    reg_out["se"] = reg_results.bse[0]
-    reg_out["conf_int_lower"] = reg_results.conf_int(alpha=alpha)[0, 0]
-    reg_out["conf_int_upper"] = reg_results.conf_int(alpha=alpha)[0, 1]
-    reg_out["p_value"] = reg_results.pvalues[0]
+    reg_out["coef"] = coef
+    reg_out["se"] = se
+    reg_out["conf_int_lower"] = coef - q * se
+    reg_out["conf_int_upper"] = coef + q * se
+    reg_out["p_value"] = 2 * stats.t.sf(np.abs(t_values), df_resid)
 
     return reg_out
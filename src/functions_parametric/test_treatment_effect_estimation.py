@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 import pytest
 from treatment_effect_estimation import estimate_treatment_effect_parametric
+from treatment_effect_estimation import estimate_treatment_effect_parametric_batch
+from treatment_effect_estimation import estimate_treatment_effect_parametric_degrees
 
 
 @pytest.fixture
@@ -28,3 +31,160 @@ def test_treatment_effect_estimation_model_input(setup_treatment_effect_estimati
             data=setup_treatment_effect_estimation["data"],
             degree=setup_treatment_effect_estimation["degree"],
         )
+
+
+@pytest.fixture
+def setup_treatment_effect_estimation_batch():
+    np.random.seed(123)
+    out = {}
+    out["r"] = np.random.normal(loc=0, scale=1, size=(3, 50))
+    out["d"] = (out["r"] >= 0).astype(np.float64)
+    out["y"] = (
+        1 + 0.5 * out["d"] + out["r"] + np.random.normal(loc=0, scale=1, size=(3, 50))
+    )
+    out["cutoff"] = 0
+    out["degree"] = 2
+
+    return out
+
+
+def test_treatment_effect_estimation_coef(setup_treatment_effect_estimation_batch):
+    data = pd.DataFrame(
+        {
+            "r": setup_treatment_effect_estimation_batch["r"][0],
+            "d": setup_treatment_effect_estimation_batch["d"][0],
+            "y": setup_treatment_effect_estimation_batch["y"][0],
+        }
+    )
+    r = np.array(data["r"])
+    X = np.column_stack(
+        (data["d"], r ** 0, r, r ** 2, r * data["d"], r ** 2 * data["d"])
+    )
+    expected_coef = np.linalg.lstsq(X, data["y"], rcond=None)[0][0]
+
+    calc_reg_out = estimate_treatment_effect_parametric(
+        data=data, cutoff=setup_treatment_effect_estimation_batch["cutoff"], degree=2,
+    )
+    assert np.isclose(calc_reg_out["coef"], expected_coef)
+    assert calc_reg_out["conf_int_lower"] < calc_reg_out["coef"]
+    assert calc_reg_out["coef"] < calc_reg_out["conf_int_upper"]
+
+
+def test_treatment_effect_estimation_column_dict(
+    setup_treatment_effect_estimation_batch,
+):
+    setup = setup_treatment_effect_estimation_batch
+    data = {"r": setup["r"][0], "d": setup["d"][0], "y": setup["y"][0]}
+
+    calc_reg_out = estimate_treatment_effect_parametric(
+        data=data, cutoff=setup["cutoff"], degree=2,
+    )
+    expected_reg_out = estimate_treatment_effect_parametric(
+        data=pd.DataFrame(data), cutoff=setup["cutoff"], degree=2,
+    )
+    calc_reg_outs = estimate_treatment_effect_parametric_degrees(
+        data=data, cutoff=setup["cutoff"], degrees=[2],
+    )
+    for key, value in expected_reg_out.items():
+        assert np.isclose(calc_reg_out[key], value)
+        assert np.isclose(calc_reg_outs[2][key], value)
+
+
+def test_treatment_effect_estimation_batch_matches_single(
+    setup_treatment_effect_estimation_batch,
+):
+    setup = setup_treatment_effect_estimation_batch
+    # Pad the last dataset to hold fewer observations.
+    r = setup["r"].copy()
+    r[2, 40:] = np.nan
+
+    calc_reg_out = estimate_treatment_effect_parametric_batch(
+        r=r, d=setup["d"], y=setup["y"], cutoff=setup["cutoff"], degree=setup["degree"],
+    )
+    for m, n_obs in enumerate([50, 50, 40]):
+        expected_reg_out = estimate_treatment_effect_parametric(
+            data=pd.DataFrame(
+                {
+                    "r": setup["r"][m, :n_obs],
+                    "d": setup["d"][m, :n_obs],
+                    "y": setup["y"][m, :n_obs],
+                }
+            ),
+            cutoff=setup["cutoff"],
+            degree=setup["degree"],
+        )
+        for key, value in expected_reg_out.items():
+            assert np.isclose(calc_reg_out[key][m], value)
+
+
+def test_treatment_effect_estimation_degrees_match_single(
+    setup_treatment_effect_estimation_batch,
+):
+    setup = setup_treatment_effect_estimation_batch
+    data = pd.DataFrame({"r": setup["r"][0], "d": setup["d"][0], "y": setup["y"][0]})
+
+    calc_reg_outs = estimate_treatment_effect_parametric_degrees(
+        data=data, cutoff=setup["cutoff"], degrees=[4, 0, 2]
+    )
+    assert list(calc_reg_outs.keys()) == [4, 0, 2]
+    for degree, calc_reg_out in calc_reg_outs.items():
+        expected_reg_out = estimate_treatment_effect_parametric(
+            data=data, cutoff=setup["cutoff"], degree=degree
+        )
+        for key, value in expected_reg_out.items():
+            assert np.isclose(calc_reg_out[key], value)
+
+
+def test_treatment_effect_estimation_degrees_input(
+    setup_treatment_effect_estimation_batch,
+):
+    setup = setup_treatment_effect_estimation_batch
+    data = pd.DataFrame({"r": setup["r"][0], "d": setup["d"][0], "y": setup["y"][0]})
+    with pytest.raises(ValueError):
+        estimate_treatment_effect_parametric_degrees(
+            data=data, cutoff=setup["cutoff"], degrees=[1, 2.5]
+        )
+
+
+def test_treatment_effect_estimation_rank_deficient(
+    setup_treatment_effect_estimation_batch,
+):
+    setup = setup_treatment_effect_estimation_batch
+    # All observations are treated, such that the treatment indicator is
+    # collinear with the constant and the minimum norm solution splits the
+    # intercept equally between them.
+    d = np.ones_like(setup["d"])
+    data = pd.DataFrame({"r": setup["r"][0], "d": d[0], "y": setup["y"][0]})
+
+    calc_reg_out = estimate_treatment_effect_parametric(
+        data=data, cutoff=setup["cutoff"], degree=0
+    )
+    assert np.isclose(calc_reg_out["coef"], np.mean(setup["y"][0]) / 2)
+    assert np.isfinite(calc_reg_out["se"])
+
+    calc_reg_outs = estimate_treatment_effect_parametric_degrees(
+        data=data, cutoff=setup["cutoff"], degrees=[0, 1]
+    )
+    for degree, calc_reg_out in calc_reg_outs.items():
+        expected_reg_out = estimate_treatment_effect_parametric(
+            data=data, cutoff=setup["cutoff"], degree=degree
+        )
+        for key, value in expected_reg_out.items():
+            assert np.isclose(calc_reg_out[key], value)
+
+    # Regressions with full rank designs in the same batch are unaffected.
+    calc_reg_out = estimate_treatment_effect_parametric_batch(
+        r=setup["r"][:2],
+        d=np.vstack((d[0], setup["d"][1])),
+        y=setup["y"][:2],
+        cutoff=setup["cutoff"],
+        degree=1,
+    )
+    expected_reg_out = estimate_treatment_effect_parametric(
+        data=pd.DataFrame({"r": setup["r"][1], "d": setup["d"][1], "y": setup["y"][1]}),
+        cutoff=setup["cutoff"],
+        degree=1,
+    )
+    for key, value in expected_reg_out.items():
+        assert np.isclose(calc_reg_out[key][1], value)
+    assert np.isclose(calc_reg_outs[1]["coef"], calc_reg_out["coef"][0])
@@ -1,5 +1,5 @@
 import numpy as np
-import statsmodels.api as sm
+from scipy import stats
 
 
 def estimate_treatment_effect_parametric(data, cutoff, degree=1, alpha=0.05):
@@ -9,10 +9,11 @@ def estimate_treatment_effect_parametric(data, cutoff, degree=1, alpha=0.05):
     center the running variable by subtracting the cutoff before estimation.
 
     Args:
-        data (pd.DataFrame): Dataframe with data on the running variable in a
-                            column called "r", data on the dependent variable
-                            in a column called "y" and data on the treatment
-                            status in a column called "d".
+        data (pd.DataFrame or dict): Dataframe or dictionary of arrays with data
+                            on the running variable in a column called "r",
+                            data on the dependent variable in a column called
+                            "y" and data on the treatment status in a column
+                            called "d".
         cutoff (float): Cutpoint in the range of the running variable used to
                         distinguish between treatment and control groups.
         degree (int): Degree of polynomial used for fitting. Default is linear model.
@@ -23,30 +24,289 @@ def estimate_treatment_effect_parametric(data, cutoff, degree=1, alpha=0.05):
         dict: Dictionary containing estimation results.
     """
 
-    if {"y", "d", "r"}.issubset(data.columns) is False:
+    if {"y", "d", "r"}.issubset(data.keys()) is False:
         raise IndexError("'y', 'd' or 'r' not in index.")
+    else:
+        pass
+
+    r = np.array(data["r"], dtype=np.float64)
+    d = np.array(data["d"], dtype=np.float64)
+    y = np.array(data["y"], dtype=np.float64)
+
+    # Estimate as a batch holding a single dataset.
+    reg_out_batch = estimate_treatment_effect_parametric_batch(
+        r=r[np.newaxis, :],
+        d=d[np.newaxis, :],
+        y=y[np.newaxis, :],
+        cutoff=cutoff,
+        degree=degree,
+        alpha=alpha,
+    )
+
+    reg_out = {}
+    for key, values in reg_out_batch.items():
+        reg_out[key] = values[0]
+
+    return reg_out
+
+
+def estimate_treatment_effect_parametric_batch(r, d, y, cutoff, degree=1, alpha=0.05):
+    """
+    Estimate treatment effect parametrically with global polynomial fitting of a
+    specified degree for a batch of datasets at once, e.g. the stacked repetitions
+    of a Monte Carlo simulation. The regressions are solved in closed form from
+    one QR factorization of each design matrix, from which the coefficient on the
+    treatment indicator, its standard error and t-based confidence interval and
+    p-value are obtained directly.
+
+    Args:
+        r (np.array): Array of shape (M, n) with data on the running variable of
+                    M datasets. Datasets with less than n observations are padded
+                    with np.nan.
+        d (np.array): Array of shape (M, n) with data on the treatment status.
+        y (np.array): Array of shape (M, n) with data on the dependent variable.
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+        degree (int): Degree of polynomial used for fitting. Default is linear model.
+        alpha (float): Significance level used to construct confidence intervals.
+                        Default is 0.05.
+
+    Returns:
+        dict: Dictionary containing arrays of estimation results for each dataset.
+    """
+
     if (isinstance(degree, int) and degree >= 0) is False:
         raise ValueError("Polynomial order must be weakly positive integer.")
     else:
         pass
 
-    r = np.array(data["r"])
-    d = np.array(data["d"])
-    y = np.array(data["y"])
+    # Set padded observations to zero, which removes them from the regressions.
+    observed = ~np.isnan(r)
+    r = np.where(observed, r, cutoff)
+    d = np.where(observed, d, 0)
+    y = np.where(observed, y, 0)
 
     # Construct running variable polynomials of flexible degree,
     # and interactions thereof with treatment indicator.
     # Center running variable by subtracting cutoff.
-    r_polys = (r[:, np.newaxis] - cutoff) ** np.arange(degree + 1)
-    r_polys_interact = r_polys[:, 1:] * d[:, np.newaxis]
-    X = np.column_stack((d, r_polys, r_polys_interact))
+    r_polys = (r[:, :, np.newaxis] - cutoff) ** np.arange(degree + 1)
+    r_polys = r_polys * observed[:, :, np.newaxis]
+    r_polys_interact = r_polys[:, :, 1:] * d[:, :, np.newaxis]
+    X = np.concatenate((d[:, :, np.newaxis], r_polys, r_polys_interact), axis=2)
+
+    return _ols_first_coefficient(X=X, y=y, n_obs=np.sum(observed, axis=1), alpha=alpha)
+
+
+def estimate_treatment_effect_parametric_degrees(
+    data, cutoff, degrees=range(6), alpha=0.05
+):
+    """
+    Estimate treatment effect parametrically with global polynomial fitting for
+    several polynomial degrees at once. The design matrices of increasing degrees
+    are nested, such that a single QR factorization of the design matrix of the
+    highest degree, with columns ordered by degree, contains the factorizations of
+    all lower degrees in its leading columns. The running variable is centered at
+    the cutoff and scaled by its standard deviation before taking powers, which
+    leaves the treatment effect estimate unchanged but improves the numerical
+    stability for high degrees.
+
+    Args:
+        data (pd.DataFrame or dict): Dataframe or dictionary of arrays with data
+                            on the running variable in a column called "r",
+                            data on the dependent variable in a column called
+                            "y" and data on the treatment status in a column
+                            called "d".
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+        degrees (iterable): Degrees of polynomials used for fitting. Default are
+                            degrees zero to five.
+        alpha (float): Significance level used to construct confidence intervals.
+                        Default is 0.05.
+
+    Returns:
+        dict: Dictionary containing a dictionary of estimation results for each
+            degree.
+    """
+
+    if {"y", "d", "r"}.issubset(data.keys()) is False:
+        raise IndexError("'y', 'd' or 'r' not in index.")
+    if all(isinstance(degree, int) and degree >= 0 for degree in degrees) is False:
+        raise ValueError("Polynomial order must be weakly positive integer.")
+    else:
+        pass
+
+    r = np.array(data["r"], dtype=np.float64) - cutoff
+    d = np.array(data["d"], dtype=np.float64)
+    y = np.array(data["y"], dtype=np.float64)
+    r = r / np.std(r)
+
+    # Order columns such that the design of degree p consists of the first
+    # 2 + 2p columns: treatment indicator, constant, and for each power of the
+    # running variable the power itself and its interaction with treatment.
+    columns = [d, np.ones_like(r)]
+    for power in range(1, max(degrees) + 1):
+        columns.extend([r ** power, r ** power * d])
+    X = np.column_stack(columns)
+
+    Q, R = np.linalg.qr(X)
+    Qty = Q.T @ y
+
+    # If the design of a degree is rank deficient, so are the designs of all
+    # higher degrees. The inverse of a leading block of R is the leading block of
+    # its inverse, such that the largest full rank block is inverted once.
+    sizes = np.array([2 + 2 * degree for degree in degrees])
+    deficient = np.array([_rank_deficient(R[:k, :k], X.shape[0]) for k in sizes])
+    if np.any(~deficient):
+        k_full = np.max(sizes[~deficient])
+        R_inv = np.linalg.inv(R[:k_full, :k_full])
+    else:
+        pass
+
+    # Fit each degree from the leading k columns of the factorization. Rank
+    # deficient designs are fitted with the pseudo-inverse.
+    coef = np.zeros(len(sizes))
+    ssr = np.zeros(len(sizes))
+    var_factor = np.zeros(len(sizes))
+    df_resid = y.shape[0] - sizes
+    for index, k in enumerate(sizes):
+        if deficient[index]:
+            coef[index], ssr[index], var_factor[index], rank = _pinv_first_coefficient(
+                X=X[:, :k], y=y
+            )
+            df_resid[index] = y.shape[0] - rank
+        else:
+            coef[index] = R_inv[0, :k] @ Qty[:k]
+            ssr[index] = np.sum((y - Q[:, :k] @ Qty[:k]) ** 2)
+            var_factor[index] = np.sum(R_inv[0, :k] ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        se = np.sqrt(ssr / df_resid * var_factor)
+    reg_out_degrees = _t_inference(coef=coef, se=se, df_resid=df_resid, alpha=alpha)
+
+    reg_outs = {}
+    for index, degree in enumerate(degrees):
+        reg_outs[degree] = {}
+        for key, values in reg_out_degrees.items():
+            reg_outs[degree][key] = values[index]
+
+    return reg_outs
+
+
+def _ols_first_coefficient(X, y, n_obs, alpha):
+    """
+    Solve a batch of least squares problems with a QR factorization and collect
+    inference on the first coefficient based on homoskedastic standard errors.
+
+    Args:
+        X (np.array): Array of shape (M, n, k) holding the design matrices.
+        y (np.array): Array of shape (M, n) holding the dependent variables.
+        n_obs (np.array): Number of observations in each regression.
+        alpha (float): Significance level used to construct confidence intervals.
+
+    Returns:
+        dict: Dictionary containing arrays of estimation results.
+    """
+
+    # Factorize the design of each dataset separately, as np.linalg.qr accepts
+    # stacked matrices only from NumPy 1.22 on.
+    Q = np.zeros(X.shape)
+    R = np.zeros((X.shape[0], X.shape[2], X.shape[2]))
+    for m in range(X.shape[0]):
+        Q[m], R[m] = np.linalg.qr(X[m])
+    full = ~_rank_deficient(R, X.shape[1])
+    coef = np.zeros(X.shape[0])
+    se = np.zeros(X.shape[0])
+    df_resid = n_obs - X.shape[2]
+
+    if np.any(full):
+        Qty = np.einsum("mnk,mn->mk", Q[full], y[full])
+        params = np.linalg.solve(R[full], Qty[:, :, np.newaxis])[:, :, 0]
+        coef[full] = params[:, 0]
+
+        # Residual variance and variance of the first coefficient. The first row
+        # of the inverse of R yields the first diagonal element of (X'X)^(-1).
+        resid = y[full] - np.einsum("mnk,mk->mn", X[full], params)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.sum(resid ** 2, axis=1) / df_resid[full]
+            R_inv = np.linalg.inv(R[full])
+            se[full] = np.sqrt(scale * np.sum(R_inv[:, 0, :] ** 2, axis=1))
+    else:
+        pass
+
+    # Fit rank deficient designs, e.g. with collinear columns, with the
+    # pseudo-inverse.
+    for m in np.flatnonzero(~full):
+        coef[m], ssr, var_factor, rank = _pinv_first_coefficient(X=X[m], y=y[m])
+        df_resid[m] = n_obs[m] - rank
+        with np.errstate(divide="ignore", invalid="ignore"):
+            se[m] = np.sqrt(ssr / df_resid[m] * var_factor)
+
+    return _t_inference(coef=coef, se=se, df_resid=df_resid, alpha=alpha)
+
+
+def _rank_deficient(R, n_rows):
+    """
+    Check whether the design matrices of least squares problems are numerically
+    rank deficient from the R factors of their QR factorizations, using the
+    tolerance of np.linalg.matrix_rank.
+
+    Args:
+        R (np.array): Array of shape (..., k, k) holding the R factors.
+        n_rows (int): Number of rows of the design matrices.
+
+    Returns:
+        bool or np.array: Indication whether each design is rank deficient.
+    """
+
+    diag = np.abs(np.diagonal(R, axis1=-2, axis2=-1))
+    tol = np.max(diag, axis=-1) * max(n_rows, R.shape[-1]) * np.finfo(R.dtype).eps
+
+    return np.any(diag <= tol[..., np.newaxis], axis=-1)
+
+
+def _pinv_first_coefficient(X, y):
+    """
+    Solve a least squares problem with the pseudo-inverse of the design matrix,
+    i.e. obtain the minimum norm solution if the design is rank deficient.
+
+    Args:
+        X (np.array): Array of shape (n, k) holding the design matrix.
+        y (np.array): Array of shape (n,) holding the dependent variable.
+
+    Returns:
+        tuple: First coefficient, sum of squared residuals, first diagonal element
+            of the pseudo-inverse of X'X and rank of the design matrix.
+    """
+
+    X_pinv = np.linalg.pinv(X)
+    params = X_pinv @ y
+    ssr = np.sum((y - X @ params) ** 2)
+
+    return params[0], ssr, np.sum(X_pinv[0] ** 2), np.linalg.matrix_rank(X)
+
+
+def _t_inference(coef, se, df_resid, alpha):
+    """
+    Construct t-based confidence intervals and p-values for coefficient estimates.
+
+    Args:
+        coef (float or np.array): Coefficient estimates.
+        se (float or np.array): Standard errors of the coefficient estimates.
+        df_resid (int or np.array): Residual degrees of freedom.
+        alpha (float): Significance level used to construct confidence intervals.
+
+    Returns:
+        dict: Dictionary containing estimation results.
+    """
+
+    q = stats.t.ppf(1 - alpha / 2, df_resid)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_values = coef / se
 
     reg_out = {}
-    results = sm.OLS(y, X).fit()
-    reg_out["coef"] = results.params[0]
-    reg_out["se"] = results.bse[0]
-    reg_out["conf_int_lower"] = results.conf_int(alpha=alpha)[0, 0]
-    reg_out["conf_int_upper"] = results.conf_int(alpha=alpha)[0, 1]
-    reg_out["p_value"] = results.pvalues[0]
+    reg_out["coef"] = coef
+    reg_out["se"] = se
+    reg_out["conf_int_lower"] = coef - q * se
+    reg_out["conf_int_upper"] = coef + q * se
+    reg_out["p_value"] = 2 * stats.t.sf(np.abs(t_values), df_resid)
 
     return reg_out
@@ -0,0 +1,117 @@
+import json
+import os
+
+import numpy as np
+
+
+def encode_rng_state(state):
+    """
+    Convert the state of the global NumPy random state to a JSON serializable
+    list.
+
+    Args:
+        state (tuple): State as returned by np.random.get_state.
+
+    Returns:
+        list: Name of the bit generator, its key as a list of integers, the
+            position in the key and the cached Gaussian draw.
+    """
+
+    name, key, pos, has_gauss, cached_gaussian = state
+
+    return [name, key.tolist(), int(pos), int(has_gauss), float(cached_gaussian)]
+
+
+def decode_rng_state(state):
+    """
+    Convert a state encoded with encode_rng_state back to the format of
+    np.random.set_state.
+
+    Args:
+        state (list): Encoded state.
+
+    Returns:
+        tuple: State accepted by np.random.set_state.
+    """
+
+    name, key, pos, has_gauss, cached_gaussian = state
+
+    return (name, np.array(key, dtype=np.uint32), pos, has_gauss, cached_gaussian)
+
+
+def start_checkpoint(path, header):
+    """
+    Start a new checkpoint file holding the header of a simulation. An existing
+    file is replaced.
+
+    Args:
+        path (str): Path of the checkpoint file.
+        header (dict): JSON serializable description of the simulation, e.g. its
+                    parameters and seed.
+    """
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    with open(path_tmp, "w") as f:
+        f.write(json.dumps({"header": header}) + "\n")
+    os.replace(path_tmp, path)
+
+
+def append_checkpoint(f, record):
+    """
+    Append the record of a completed repetition to an open checkpoint file. The
+    record is flushed to the operating system at once, such that it survives the
+    process being killed.
+
+    Args:
+        f (file): Checkpoint file opened for appending.
+        record (dict): JSON serializable record of the repetition.
+    """
+
+    f.write(json.dumps(record) + "\n")
+    f.flush()
+
+
+def read_checkpoint(path):
+    """
+    Read the header and the records of a checkpoint file. A last line that was
+    only partially written when the process was killed is removed from the file,
+    such that new records can be appended to it.
+
+    Args:
+        path (str): Path of the checkpoint file.
+
+    Returns:
+        tuple: Header of the simulation and list of records in the order they were
+            appended. The header is None if there is no checkpoint file.
+    """
+
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None, []
+
+    lines = []
+    size = 0
+    for line in content.splitlines(keepends=True):
+        try:
+            if line.endswith(b"\n") is False:
+                raise ValueError("The line was not completely written.")
+            else:
+                pass
+            lines.append(json.loads(line))
+        except ValueError:
+            break
+        size += len(line)
+
+    if size < len(content):
+        with open(path, "r+b") as f:
+            f.truncate(size)
+    else:
+        pass
+
+    if len(lines) == 0:
+        return None, []
+    else:
+        return lines[0]["header"], lines[1:]
@@ -1,8 +1,11 @@
 import numpy as np
 import pandas as pd
 
+from src.functions_nonparametric.binning import aggregate_bins
+from src.functions_nonparametric.binning import evenly_spaced_bins
 
-def data_generating_process(params):
+
+def data_generating_process(params, rng=None):
     """
     Implementation of the data generating process in the simulation study.
     Obtain artificial data on individual-level variables given a sharp Regression
@@ -12,6 +15,9 @@ def data_generating_process(params):
 
     Args:
         params (dict): Dictionary holding the simulation parameters.
+        rng (np.random.Generator): Random number generator used to draw the data.
+                                Default is None, in which case the global NumPy
+                                random state is used.
 
     Returns:
         pd.DataFrame: Dataframe with data on "r", "d" and "y" -
@@ -19,98 +25,170 @@ def data_generating_process(params):
                 each individual.
     """
 
+    if params["discrete"] not in [False, True]:
+        return np.nan
+    else:
+        pass
+
+    # Draw a batch holding a single repetition.
+    data_batch = data_generating_process_batch(params={**params, "M": 1}, rng=rng)
+    data = pd.DataFrame(repetition_data(data_batch, 0))
+
+    return data
+
+
+def data_generating_process_batch(params, rng=None):
+    """
+    Draw the data of all Monte Carlo repetitions of the data generating process at
+    once and store every variable as a NumPy array with one row per repetition.
+
+    With a single source of randomness, every variable is obtained from a single
+    call to it. A batch of M > 1 repetitions then draws a different random stream
+    than M calls to data_generating_process, and only a batch of one repetition
+    yields the same data. With a list holding one source per repetition, the
+    data of each repetition is drawn from its own source in the order of
+    data_generating_process, such that row m equals the data drawn by
+    data_generating_process from the m-th source.
+
+    Args:
+        params (dict): Dictionary holding the simulation parameters.
+        rng (np.random.Generator or list): Random number generator used to draw
+                                the data, or a list of one source per repetition,
+                                each a np.random.Generator, a
+                                np.random.SeedSequence turned into a Generator or
+                                None for the global NumPy random state. Default is
+                                None, in which case the global NumPy random state
+                                is used.
+
+    Returns:
+        dict: Dictionary with arrays of shape (M, n) on "r", "d" and "y" - the
+            running variable, treatment status and observed outcome. For
+            discretized data, the arrays hold the means within bins of the running
+            variable instead, padded with np.nan, along with the bin numbers in
+            "binnum" and the number of bins of each repetition in "n_bins".
+    """
+
     # Obtain model parameters.
     model = params["model"]
     cutoff = params["cutoff"]
     tau = params["tau"]
     noise_var = params["noise_var"]
     n = params["n"]
+    M = params["M"]
 
-    data = pd.DataFrame()
+    if model not in ["linear", "poly", "nonpolynomial"]:
+        raise ValueError("'model' takes 'linear', 'poly' or 'nonpolynomial' only.")
+    if isinstance(rng, list) and len(rng) != M:
+        raise ValueError("'rng' must hold one source of randomness per repetition.")
+    else:
+        pass
 
-    # Draw running variable from Gaussian distribution.
-    data["r"] = np.random.normal(loc=0, scale=1, size=n)
+    # Draw running variable from Gaussian distribution and the noise of the model.
+    if isinstance(rng, list):
+        r = np.zeros((M, n))
+        noise = np.zeros((M, n))
+        for m, source in enumerate(rng):
+            if source is None:
+                source = np.random
+            elif isinstance(source, np.random.SeedSequence):
+                source = np.random.default_rng(source)
+            else:
+                pass
+            r[m] = source.normal(loc=0, scale=1, size=n)
+            noise[m] = source.normal(loc=0, scale=noise_var, size=n)
+    else:
+        if rng is None:
+            rng = np.random
+        else:
+            pass
+        r = rng.normal(loc=0, scale=1, size=(M, n))
+        noise = rng.normal(loc=0, scale=noise_var, size=(M, n))
 
-    if cutoff < np.min(data["r"]) or cutoff > np.max(data["r"]):
+    if np.any(cutoff < np.min(r, axis=1)) or np.any(cutoff > np.max(r, axis=1)):
         raise AssertionError("Cutoff out of bounds.")
     else:
         pass
 
     # Assign binary treatment status.
-    data["d"] = 0
-    data.loc[data["r"] >= cutoff, "d"] = 1
+    d = (r >= cutoff).astype(np.int64)
 
     if model == "linear":
         # Obtain potential outcomes through linear model.
-        data["y"] = (
-            10
-            + tau * data["d"]
-            + 1 * data["r"]
-            + (1 + 0.5) * data["d"] * data["r"]
-            + np.random.normal(loc=0, scale=noise_var, size=n)
-        )
+        y = 10 + tau * d + 1 * r + (1 + 0.5) * d * r + noise
 
     elif model == "poly":
         # Obtain potential outcomes through 'poly' model.
-        data["y"] = (
-            2
-            + tau * data["d"]
-            + 0.8 * (data["r"])
-            - 0.8 * (data["r"]) ** 2
-            - 0.2 * (data["r"]) ** 3
-            + 0.2 * (data["r"]) ** 4
-            + np.random.normal(loc=0, scale=noise_var, size=n)
-        )
+        y = 2 + tau * d + 0.8 * r - 0.8 * r ** 2 - 0.2 * r ** 3 + 0.2 * r ** 4 + noise
 
     elif model == "nonpolynomial":
         # Obtain potential outcomes through 'nonparametric' model.
-        data["y"] = (
-            tau * data["d"]
-            + data["r"] * np.sin(4 * data["r"]) * np.cos(data["r"] * data["d"])
-            + (1 / (1 + data["r"] * data["d"])) * 1.5
-            + np.random.normal(loc=0, scale=noise_var, size=n)
+        y = (
+            tau * d
+            + r * np.sin(4 * r) * np.cos(r * d)
+            + (1 / (1 + r * d)) * 1.5
+            + noise
         )
-    else:
-        pass
 
     if params["discrete"] is False:
-        return data
+        return {"r": r, "d": d, "y": y}
 
-    elif params["discrete"] is True:
-        rmin = min(data["r"])
-        binsize = 2 * np.std(data["r"]) * n ** (-1 / 2)
+    else:
+        pass
 
-        # Calculate midpoint of lowest bin.
-        binmp_lowest = (
-            np.floor((rmin - cutoff) / binsize) * binsize + binsize / 2 + cutoff
-        )
+    # Assign observations to bins of the running variable and compute the means of
+    # each bin and repetition over a flat index of all bins of all repetitions.
+    binsize = 2 * np.std(r, axis=1)[:, None] * n ** (-1 / 2)
+    binnum = evenly_spaced_bins(r, binsize=binsize, cutoff=cutoff)["index"]
+    num_bins = np.max(binnum) + 1
+    flat_index = np.arange(M)[:, None] * num_bins + binnum
+    bin_stats = aggregate_bins(
+        flat_index, values={"r": r, "d": d, "y": y}, num_bins=M * num_bins
+    )
+    counts = bin_stats["counts"].reshape(M, num_bins)
+
+    # Move the non-empty bins of each repetition to the front of its row.
+    rows, bins = np.nonzero(counts)
+    n_bins = np.sum(counts > 0, axis=1)
+    position = (np.cumsum(counts > 0, axis=1) - 1)[rows, bins]
+
+    data_discrete = {}
+    data_discrete["n_bins"] = n_bins
+    data_discrete["binnum"] = np.full((M, np.max(n_bins)), np.nan)
+    data_discrete["binnum"][rows, position] = bins
+    for var in ["r", "d", "y"]:
+        means = bin_stats["means"][var].reshape(M, num_bins)
+        data_discrete[var] = np.full((M, np.max(n_bins)), np.nan)
+        data_discrete[var][rows, position] = means[rows, bins]
+
+    # Mean of treatment indicator across bins must be zero or one.
+    d_means = data_discrete["d"][~np.isnan(data_discrete["d"])]
+    if np.any((d_means > 0) & (d_means < 1)):
+        raise ValueError("A bin contains both treatment and control observations.")
+    else:
+        pass
 
-        # Assign each running variable observation its bin.
-        data["binnum"] = round(
-            (
-                (
-                    np.floor((data["r"] - cutoff) / binsize) * binsize
-                    + binsize / 2
-                    + cutoff
-                )
-                - binmp_lowest
-            )
-            / binsize
-        )
+    return data_discrete
 
-        # Calculate mean of outcome and running variable for each discrete value.
-        data_discrete = data.groupby(["binnum"], as_index=False).mean()
 
-        # Mean of treatment indicator across bins must be zero or one.
-        d_means = np.array(data_discrete["d"].dropna().drop_duplicates())
-        if len(d_means) > 2:
-            raise ValueError("A bin contains both treatment and control observations.")
-        if np.array_equal(d_means, np.array([0, 1])) is False:
-            raise ValueError("A bin contains both treatment and control observations.")
-        else:
-            pass
+def repetition_data(data_batch, m):
+    """
+    Extract the data of a single repetition from a batch drawn with
+    data_generating_process_batch, dropping the padding of discretized data.
+
+    Args:
+        data_batch (dict): Batch of data, see data_generating_process_batch.
+        m (int): Index of the repetition.
 
-        return data_discrete
+    Returns:
+        dict: Dictionary with arrays on "r", "d" and "y" of the repetition, and on
+            "binnum" for discretized data.
+    """
 
+    if "n_bins" in data_batch:
+        n_obs = data_batch["n_bins"][m]
+        variables = ["binnum", "r", "d", "y"]
     else:
-        return np.nan
+        n_obs = data_batch["r"].shape[1]
+        variables = ["r", "d", "y"]
+
+    return {var: data_batch[var][m, :n_obs] for var in variables}
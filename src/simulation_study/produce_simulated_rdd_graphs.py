@@ -1,8 +1,11 @@
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 import seaborn as sns
 
 from bld.project_paths import project_paths_join as ppj
+from src.functions_nonparametric.binning import aggregate_bins
+from src.functions_nonparametric.binning import evenly_spaced_bins
 from src.simulation_study.data_generating_process import data_generating_process
 from src.simulation_study.sim_study import fix_simulation_params
 
@@ -19,29 +22,19 @@ for model in ["linear", "poly", "nonpolynomial"]:
     data_temp = data_generating_process(params=sim_params)
 
     # Bin data.
-    rmin = min(data_temp["r"])
     binsize = 0.07
 
     cutoff = sim_params["cutoff"]
 
-    # Calculate midpoint of lowest bin.
-    binmp_lowest = np.floor((rmin - cutoff) / binsize) * binsize + binsize / 2 + cutoff
-
-    # Assign each running variable observation its bin.
-    data_temp["binnum"] = round(
-        (
-            (
-                np.floor((data_temp["r"] - cutoff) / binsize) * binsize
-                + binsize / 2
-                + cutoff
-            )
-            - binmp_lowest
-        )
-        / binsize
-    )
+    bins = evenly_spaced_bins(data_temp["r"].to_numpy(), binsize=binsize, cutoff=cutoff)
 
-    # Calculate mean of outcome and running variable for each discrete value.
-    data_temp = data_temp.groupby(["binnum"], as_index=False).mean()
+    # Calculate mean of outcome and running variable for each non-empty bin.
+    bin_stats = aggregate_bins(
+        bins["index"],
+        values={column: data_temp[column] for column in ["r", "d", "y"]},
+        num_bins=bins["midpoints"].shape[0],
+    )
+    data_temp = pd.DataFrame(bin_stats["means"])[bin_stats["counts"] > 0]
     # Omit first and last bins as they hold too few observations.
     data_temp = data_temp[3:-3]
 
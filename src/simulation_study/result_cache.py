@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+
+
+def code_version(paths):
+    """
+    Fingerprint the source code that simulation results depend on. Changing any
+    of the files, e.g. an estimator or the data generating process, invalidates
+    all results cached under the previous fingerprint.
+
+    Args:
+        paths (list): Paths to the source files the results depend on.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest of the contents of the files.
+    """
+
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def cache_key(params, estimator, seed, version):
+    """
+    Compute the content address of a cell of the simulation study, i.e. the
+    performance measures of one estimator in one scenario.
+
+    Args:
+        params (dict): Dictionary containing simulation parameters.
+        estimator (dict): Dictionary describing the estimator, e.g.
+                        {"degree": 2} or {"bandwidth": "cv"}.
+        seed (int): Seed of the random numbers the data is drawn from.
+        version (str): Fingerprint of the source code, see code_version.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest identifying the cell.
+    """
+
+    cell = {"params": params, "estimator": estimator, "seed": seed, "version": version}
+    serialized = json.dumps(cell, sort_keys=True, default=str)
+
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def load_result(cache_dir, key):
+    """
+    Load the cached result stored under a key. A hit marks the entry as recently
+    used, which protects it from eviction.
+
+    Args:
+        cache_dir (str): Directory holding the cache.
+        key (str): Key of the entry, see cache_key.
+
+    Returns:
+        dict: Cached result. None if the key is not in the cache.
+    """
+
+    path = os.path.join(cache_dir, f"{key}.json")
+    try:
+        with open(path, "r") as f:
+            result = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    os.utime(path)
+
+    return result
+
+
+def store_result(cache_dir, key, result):
+    """
+    Store a result in the cache under a key. The entry is written to a temporary
+    file first and then renamed, such that concurrent readers never see a
+    partially written entry.
+
+    Args:
+        cache_dir (str): Directory holding the cache.
+        key (str): Key of the entry, see cache_key.
+        result (dict): JSON serializable result, e.g. performance measures.
+    """
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    with open(path_tmp, "w") as f:
+        json.dump(result, f, default=float)
+    os.replace(path_tmp, path)
+
+
+def evict_results(cache_dir, max_size):
+    """
+    Bound the size of the cache by removing the least recently used entries
+    until the entries left take up at most max_size bytes.
+
+    Args:
+        cache_dir (str): Directory holding the cache.
+        max_size (int): Maximum size of the cache in bytes.
+
+    Returns:
+        int: Number of removed entries.
+    """
+
+    if os.path.isdir(cache_dir) is False:
+        return 0
+    else:
+        pass
+
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".json"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    # Remove entries starting with the one used longest ago.
+    total_size = sum(size for _, size, _ in entries)
+    num_removed = 0
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        os.remove(path)
+        total_size -= size
+        num_removed += 1
+
+    return num_removed
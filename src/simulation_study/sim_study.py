@@ -1,9 +1,20 @@
+import json
+import os
+from concurrent.futures import as_completed
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
 from bld.project_paths import project_paths_join as ppj
+from src.simulation_study.result_cache import cache_key
+from src.simulation_study.result_cache import code_version
+from src.simulation_study.result_cache import evict_results
+from src.simulation_study.result_cache import load_result
+from src.simulation_study.result_cache import store_result
+from src.simulation_study.simulate_estimator_performance import merge_profiles
 from src.simulation_study.simulate_estimator_performance import (
-    simulate_estimator_performance,
+    simulate_estimators_common_data,
 )
 
 
@@ -62,151 +73,432 @@ def fix_simulation_params(
     return sim_params
 
 
-if __name__ == "__main__":
-    # Run simulation for continuous data (all DGPs) and discrete data (linear DGP).
-    for discrete in [False, True]:
+def scenario_jobs(common_random_numbers=True):
+    """
+    Collect the cells of the simulation study as a list of independent jobs. The
+    study covers continuous data for all potential outcome models and discrete
+    data for the linear model. For each of these scenarios, the treatment effect is
+    estimated parametrically with polynomials of degree zero to five and
+    non-parametrically with four bandwidth selection procedures.
 
-        # Vary simulation along potential outcome models.
-        for model in ["linear", "poly", "nonpolynomial"]:
+    Args:
+        common_random_numbers (bool): Indication whether all estimators of a
+                                    scenario are evaluated in one job on the same
+                                    simulated data, or each estimator forms a job
+                                    of its own. Default is True.
 
-            if model == "poly" and discrete is True:
-                continue
-            elif model == "nonpolynomial" and discrete is True:
+    Returns:
+        list: List of dictionaries, each describing one job by the keys "model",
+            "discrete", "degrees" and "bandwidths".
+    """
+
+    degrees = list(range(0, 6, 1))
+    bandwidths = ["rot", "rot_under", "rot_over", "cv"]
+
+    jobs = []
+    for discrete in [False, True]:
+        for model in ["linear", "poly", "nonpolynomial"]:
+            if model != "linear" and discrete is True:
                 continue
             else:
-                sim_params = fix_simulation_params(model=model, discrete=discrete)
-
-            # Estimate treatment effect parametrically and non-parametrically.
-            for parametric in [True, False]:
-                performance_measures = []
-
-                if parametric is True:
-                    # Estimate parametric model with different polyonomial degrees.
-                    degrees = list(range(0, 6, 1))
-                    for degree in degrees:
-                        np.random.seed(123)
-                        performance_measures.append(
-                            simulate_estimator_performance(
-                                params=sim_params,
-                                degree=degree,
-                                parametric=parametric,
-                                bandwidth=None,
-                            )
-                        )
-
-                    # Convert dictionary to pd.DataFrame format to allow table construction.
-                    df_performance_measures = pd.DataFrame.from_dict(
-                        performance_measures
-                    )
-                    # Restrict interest to first four measures.
-                    df_performance_measures = df_performance_measures.drop(
-                        "bandwidths_numeric", 1
-                    )
-                    df_performance_measures["degree"] = degrees
-
-                    # Round all measures for representation purposes.
-                    df_performance_measures = df_performance_measures.round(3)
-                    # Place 'degree' in first column for representation purposes.
-                    cols = df_performance_measures.columns.tolist()
-                    cols = cols[-1:] + cols[:-1]
-                    df_performance_measures = df_performance_measures[cols]
-                    # Rename columns for LaTex table.
-                    df_performance_measures = df_performance_measures.rename(
-                        columns={
-                            "coverage_prob": "Cov. Prob.",
-                            "mse_tau_hat": "MSE",
-                            "tau_hat": "Estimate",
-                            "stdev_tau_hat": "Std. Dev.",
-                            "degree": "Polynomial degree",
-                        },
-                    )
-
-                    # Construct table from dataframe holding performance measures.
-                    with open(
-                        ppj(
-                            "OUT_TABLES",
-                            "simulation_study",
-                            f"perf_meas_table_{model}_p_discr_{discrete}.tex",
-                        ),
-                        "w",
-                    ) as j:
-                        j.write(df_performance_measures.to_latex(index=False))
-
-                elif parametric is False:
-                    # Estimate non-parametric model with different bandwidths.
-                    bandwidths = ["rot", "rot_under", "rot_over", "cv"]
-                    for bandwidth in bandwidths:
-                        np.random.seed(123)
-                        performance_measures.append(
-                            simulate_estimator_performance(
-                                params=sim_params,
-                                degree=None,
-                                parametric=parametric,
-                                bandwidth=bandwidth,
-                            )
-                        )
-
-                    # Produce table with results on estimator performance.
-                    df_performance_measures = pd.DataFrame.from_dict(
-                        performance_measures
-                    )
-                    df_performance_measures = df_performance_measures.drop(
-                        "bandwidths_numeric", 1
-                    )
-                    df_performance_measures["bandwidth_proced"] = bandwidths
-                    df_performance_measures = df_performance_measures.round(3)
-                    # Place 'bandwidth procedure' in first column of table.
-                    cols = df_performance_measures.columns.tolist()
-                    cols = cols[-1:] + cols[:-1]
-                    df_performance_measures = df_performance_measures[cols]
-
-                    # Rename columns of LaTex table.
-                    df_performance_measures = df_performance_measures.rename(
-                        columns={
-                            "coverage_prob": "Cov. Prob.",
-                            "mse_tau_hat": "MSE",
-                            "tau_hat": "Estimate",
-                            "stdev_tau_hat": "Std. Dev.",
-                            "bandwidth_proced": "Bandwidth procedure",
-                        },
-                    )
-
-                    with open(
-                        ppj(
-                            "OUT_TABLES",
-                            "simulation_study",
-                            f"perf_meas_table_{model}_np_discr_{discrete}.tex",
-                        ),
-                        "w",
-                    ) as j:
-                        j.write(df_performance_measures.to_latex(index=False))
-
-                    # Produce table with results on bandwidth selection procedures.
-                    df_bw_select = pd.DataFrame(
-                        columns=[
-                            "Bandwidth procedure",
-                            "Min",
-                            "Max",
-                            "Mean",
-                            "Std. Dev.",
-                        ],
-                    )
-                    df_bw_select["Bandwidth procedure"] = bandwidths
-                    for i in range(4):
-                        bw_values = performance_measures[i]["bandwidths_numeric"]
-                        df_bw_select["Min"][i] = np.min(bw_values)
-                        df_bw_select["Max"][i] = np.max(bw_values)
-                        df_bw_select["Mean"][i] = np.mean(bw_values)
-                        df_bw_select["Std. Dev."][i] = np.std(bw_values)
-
-                    df_bw_select = df_bw_select.round(3)
-
-                    with open(
-                        ppj(
-                            "OUT_TABLES",
-                            "simulation_study",
-                            f"bw_select_table_{model}_np_discr_{discrete}.tex",
-                        ),
-                        "w",
-                    ) as j:
-                        j.write(df_bw_select.to_latex(index=False))
+                pass
+
+            scenario = {"model": model, "discrete": discrete}
+            if common_random_numbers is True:
+                jobs.append({**scenario, "degrees": degrees, "bandwidths": bandwidths})
+            else:
+                for degree in degrees:
+                    jobs.append({**scenario, "degrees": [degree], "bandwidths": []})
+                for bandwidth in bandwidths:
+                    jobs.append({**scenario, "degrees": [], "bandwidths": [bandwidth]})
+
+    return jobs
+
+
+def expected_job_cost(job):
+    """
+    Assign a job of the simulation study its expected computational cost relative
+    to parametric estimation on continuous data. Cross-validation dominates as it
+    fits the data at every observation for a grid of bandwidths.
+
+    Args:
+        job (dict): Dictionary describing the job, see scenario_jobs.
+
+    Returns:
+        float: Expected relative cost of the job.
+    """
+
+    cost = 1.0 * len(job["degrees"])
+    for bandwidth in job["bandwidths"]:
+        if bandwidth in ["cv", "cv_search"]:
+            cost += 20.0
+        else:
+            cost += 2.0
+
+    # Discretized data holds considerably fewer observations.
+    if job["discrete"] is True:
+        cost = cost / 2
+    else:
+        pass
+
+    return cost
+
+
+def run_job(job, cache_dir=None, version=None, profile=False, checkpoint_dir=None):
+    """
+    Simulate the performance of the estimators specified by a job. The global
+    random state is seeded identically for every job, such that all estimators
+    are evaluated on the same simulated datasets. As the data does not depend on
+    the estimators of a job, the performance measures of each estimator can be
+    cached separately and only the estimators missing from the cache are run.
+    While they run, the completed repetitions are checkpointed, such that a job
+    that was killed resumes where it stopped.
+
+    Args:
+        job (dict): Dictionary describing the job, see scenario_jobs.
+        cache_dir (str): Directory of the result cache. Default is None, in which
+                        case no results are cached.
+        version (str): Fingerprint of the source code the results depend on, see
+                        code_version. Default is None.
+        profile (bool): Indication whether the simulation of the estimators
+                        missing from the cache is profiled. Default is False.
+        checkpoint_dir (str): Directory of the checkpoint files. The file of a job
+                        is removed once its results are complete. Default is None,
+                        in which case no checkpoint is kept.
+
+    Returns:
+        dict: Dictionary containing the performance measures of the estimators,
+            see simulate_estimators_common_data. If profile is True, the profile
+            of the simulation is added under "profile", see
+            simulate_replication.
+    """
+
+    seed = 123
+    sim_params = fix_simulation_params(model=job["model"], discrete=job["discrete"])
+
+    # Look up the performance measures of each estimator in the cache.
+    estimators = [("degree", degree) for degree in job["degrees"]] + [
+        ("bandwidth", bandwidth) for bandwidth in job["bandwidths"]
+    ]
+    keys = {}
+    cached = {}
+    for estimator in estimators:
+        keys[estimator] = cache_key(sim_params, dict([estimator]), seed, version)
+        if cache_dir is not None:
+            cached[estimator] = load_result(cache_dir, keys[estimator])
+        else:
+            cached[estimator] = None
+
+    # Simulate the estimators missing from the cache on the same data.
+    missing = [estimator for estimator in estimators if cached[estimator] is None]
+    if profile is True:
+        job_profile = {}
+    else:
+        job_profile = None
+    if len(missing) > 0:
+        if checkpoint_dir is not None:
+            checkpoint = os.path.join(
+                checkpoint_dir,
+                cache_key(sim_params, {"estimators": missing}, seed, version)
+                + ".jsonl",
+            )
+        else:
+            checkpoint = None
+        np.random.seed(seed)
+        computed = simulate_estimators_common_data(
+            params=sim_params,
+            degrees=[value for kind, value in missing if kind == "degree"],
+            bandwidths=[value for kind, value in missing if kind == "bandwidth"],
+            profile=job_profile,
+            checkpoint=checkpoint,
+        )
+        for estimator, performance_measure in zip(
+            missing, computed["parametric"] + computed["nonparametric"]
+        ):
+            cached[estimator] = performance_measure
+            if cache_dir is not None:
+                store_result(cache_dir, keys[estimator], performance_measure)
+            else:
+                pass
+        if checkpoint is not None:
+            os.remove(checkpoint)
+        else:
+            pass
+    else:
+        pass
+
+    performance_measures = {}
+    performance_measures["parametric"] = [
+        cached[("degree", degree)] for degree in job["degrees"]
+    ]
+    performance_measures["nonparametric"] = [
+        cached[("bandwidth", bandwidth)] for bandwidth in job["bandwidths"]
+    ]
+    if profile is True:
+        performance_measures["profile"] = job_profile
+    else:
+        pass
+
+    return performance_measures
+
+
+def schedule_jobs(
+    jobs,
+    n_workers=None,
+    cache_dir=None,
+    version=None,
+    profile=False,
+    checkpoint_dir=None,
+):
+    """
+    Dispatch jobs of the simulation study to a pool of processes. Jobs are
+    submitted in the order of their expected cost, longest first, such that
+    expensive jobs do not block the pool at the end of the run.
+
+    Args:
+        jobs (list): List of dictionaries describing the jobs, see scenario_jobs.
+        n_workers (int): Number of processes. Default is None, in which case the
+                        number of processors is used.
+        cache_dir (str): Directory of the result cache, see run_job. Default is
+                        None.
+        version (str): Fingerprint of the source code, see run_job. Default is
+                        None.
+        profile (bool): Indication whether the jobs are profiled, see run_job.
+                        Default is False.
+        checkpoint_dir (str): Directory of the checkpoint files, see run_job.
+                        Default is None.
+
+    Yields:
+        tuple: Job and the performance measures of its estimators, in the order of
+            completion.
+    """
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = {
+            pool.submit(run_job, job, cache_dir, version, profile, checkpoint_dir): job
+            for job in sorted(jobs, key=expected_job_cost, reverse=True)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def write_profile(model, discrete, profile):
+    """
+    Write the profile of a scenario, i.e. the wall time spent in each stage of the
+    simulation summed over all repetitions and the counters of cross-validation,
+    to a JSON file next to the LaTeX tables of the scenario.
+
+    Args:
+        model (str): Potential outcome model of the scenario.
+        discrete (bool): Indication if data of the scenario is discretized or not.
+        profile (dict): Profile of the scenario, see simulate_replication.
+    """
+
+    path = ppj(
+        "OUT_TABLES", "simulation_study", f"profile_{model}_discr_{discrete}.json"
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as j:
+        json.dump(profile, j, indent=4, sort_keys=True)
+
+
+def write_parametric_tables(model, discrete, degrees, performance_measures):
+    """
+    Write the LaTeX table with performance measures of parametric estimation.
+
+    Args:
+        model (str): Potential outcome model of the scenario.
+        discrete (bool): Indication if data of the scenario is discretized or not.
+        degrees (list): Polynomial degrees used for estimation.
+        performance_measures (list): Performance measures for each degree, see
+                                    simulate_estimator_performance.
+    """
+
+    # Convert dictionary to pd.DataFrame format to allow table construction.
+    df_performance_measures = pd.DataFrame.from_dict(performance_measures)
+    # Restrict interest to first four measures.
+    df_performance_measures = df_performance_measures.drop(
+        ["bandwidths_numeric", "n_replications"], 1
+    )
+    df_performance_measures["degree"] = degrees
+
+    # Round all measures for representation purposes.
+    df_performance_measures = df_performance_measures.round(3)
+    # Place 'degree' in first column for representation purposes.
+    cols = df_performance_measures.columns.tolist()
+    cols = cols[-1:] + cols[:-1]
+    df_performance_measures = df_performance_measures[cols]
+    # Rename columns for LaTex table.
+    df_performance_measures = df_performance_measures.rename(
+        columns={
+            "coverage_prob": "Cov. Prob.",
+            "mse_tau_hat": "MSE",
+            "tau_hat": "Estimate",
+            "stdev_tau_hat": "Std. Dev.",
+            "degree": "Polynomial degree",
+        },
+    )
+
+    # Construct table from dataframe holding performance measures.
+    with open(
+        ppj(
+            "OUT_TABLES",
+            "simulation_study",
+            f"perf_meas_table_{model}_p_discr_{discrete}.tex",
+        ),
+        "w",
+    ) as j:
+        j.write(df_performance_measures.to_latex(index=False))
+
+
+def write_nonparametric_tables(model, discrete, bandwidths, performance_measures):
+    """
+    Write the LaTeX tables with performance measures of non-parametric estimation
+    and with descriptive statistics on the selected bandwidths.
+
+    Args:
+        model (str): Potential outcome model of the scenario.
+        discrete (bool): Indication if data of the scenario is discretized or not.
+        bandwidths (list): Bandwidth selection procedures used for estimation.
+        performance_measures (list): Performance measures for each bandwidth
+                                    selection procedure, see
+                                    simulate_estimator_performance.
+    """
+
+    # Produce table with results on estimator performance.
+    df_performance_measures = pd.DataFrame.from_dict(performance_measures)
+    df_performance_measures = df_performance_measures.drop(
+        ["bandwidths_numeric", "n_replications"], 1
+    )
+    df_performance_measures["bandwidth_proced"] = bandwidths
+    df_performance_measures = df_performance_measures.round(3)
+    # Place 'bandwidth procedure' in first column of table.
+    cols = df_performance_measures.columns.tolist()
+    cols = cols[-1:] + cols[:-1]
+    df_performance_measures = df_performance_measures[cols]
+
+    # Rename columns of LaTex table.
+    df_performance_measures = df_performance_measures.rename(
+        columns={
+            "coverage_prob": "Cov. Prob.",
+            "mse_tau_hat": "MSE",
+            "tau_hat": "Estimate",
+            "stdev_tau_hat": "Std. Dev.",
+            "bandwidth_proced": "Bandwidth procedure",
+        },
+    )
+
+    with open(
+        ppj(
+            "OUT_TABLES",
+            "simulation_study",
+            f"perf_meas_table_{model}_np_discr_{discrete}.tex",
+        ),
+        "w",
+    ) as j:
+        j.write(df_performance_measures.to_latex(index=False))
+
+    # Produce table with results on bandwidth selection procedures.
+    df_bw_select = pd.DataFrame(
+        columns=["Bandwidth procedure", "Min", "Max", "Mean", "Std. Dev."],
+    )
+    df_bw_select["Bandwidth procedure"] = bandwidths
+    for i in range(len(bandwidths)):
+        bw_values = performance_measures[i]["bandwidths_numeric"]
+        df_bw_select["Min"][i] = np.min(bw_values)
+        df_bw_select["Max"][i] = np.max(bw_values)
+        df_bw_select["Mean"][i] = np.mean(bw_values)
+        df_bw_select["Std. Dev."][i] = np.std(bw_values)
+
+    df_bw_select = df_bw_select.round(3)
+
+    with open(
+        ppj(
+            "OUT_TABLES",
+            "simulation_study",
+            f"bw_select_table_{model}_np_discr_{discrete}.tex",
+        ),
+        "w",
+    ) as j:
+        j.write(df_bw_select.to_latex(index=False))
+
+
+if __name__ == "__main__":
+    jobs = scenario_jobs(common_random_numbers=True)
+    degrees = list(range(0, 6, 1))
+    bandwidths = ["rot", "rot_under", "rot_over", "cv"]
+
+    # Cache performance measures under the code they were computed with, such that
+    # changes to the tables only do not require to rerun the simulation.
+    cache_dir = ppj("OUT_DATA", "simulation_study", "result_cache")
+    version = code_version(
+        [
+            ppj("SIMULATION_STUDY", "data_generating_process.py"),
+            ppj("SIMULATION_STUDY", "simulate_estimator_performance.py"),
+            ppj("FUNCTIONS_PARAMETRIC", "treatment_effect_estimation.py"),
+            ppj("FUNCTIONS_NONPARAMETRIC", "treatment_effect_estimation.py"),
+            ppj("FUNCTIONS_NONPARAMETRIC", "rule_of_thumb.py"),
+            ppj("FUNCTIONS_NONPARAMETRIC", "cross_validation.py"),
+            ppj("FUNCTIONS_NONPARAMETRIC", "binning.py"),
+            ppj("FUNCTIONS_NONPARAMETRIC", "data_index.py"),
+        ]
+    )
+
+    # Collect performance measures by scenario, i.e. by model and data type.
+    results = {}
+    # Checkpoint the repetitions of every job, such that a killed run resumes
+    # after the last completed repetition.
+    checkpoint_dir = ppj("OUT_DATA", "simulation_study", "checkpoints")
+    for job, performance_measures in schedule_jobs(
+        jobs,
+        cache_dir=cache_dir,
+        version=version,
+        profile=True,
+        checkpoint_dir=checkpoint_dir,
+    ):
+        scenario = results.setdefault(
+            (job["model"], job["discrete"]),
+            {"parametric": {}, "nonparametric": {}, "profile": {}},
+        )
+        scenario["parametric"].update(
+            zip(job["degrees"], performance_measures["parametric"])
+        )
+        scenario["nonparametric"].update(
+            zip(job["bandwidths"], performance_measures["nonparametric"])
+        )
+
+        # Profile the scenario over all of its jobs. Estimators taken from the
+        # cache do not contribute to the profile.
+        merge_profiles(scenario["profile"], [performance_measures["profile"]])
+        write_profile(
+            model=job["model"], discrete=job["discrete"], profile=scenario["profile"]
+        )
+
+        # Write a scenario's tables as soon as all of its estimators are done.
+        if len(job["degrees"]) > 0 and len(scenario["parametric"]) == len(degrees):
+            write_parametric_tables(
+                model=job["model"],
+                discrete=job["discrete"],
+                degrees=degrees,
+                performance_measures=[
+                    scenario["parametric"][degree] for degree in degrees
+                ],
+            )
+        else:
+            pass
+        if len(job["bandwidths"]) > 0 and len(scenario["nonparametric"]) == len(
+            bandwidths
+        ):
+            write_nonparametric_tables(
+                model=job["model"],
+                discrete=job["discrete"],
+                bandwidths=bandwidths,
+                performance_measures=[
+                    scenario["nonparametric"][bandwidth] for bandwidth in bandwidths
+                ],
+            )
+        else:
+            pass
+
+    # Keep the cache within 50 MB by evicting the least recently used results.
+    evict_results(cache_dir, max_size=50 * 1024 ** 2)
@@ -1,22 +1,653 @@
+import json
+import os
+import time
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 from src.functions_nonparametric.cross_validation import cross_validation
+from src.functions_nonparametric.cross_validation import cross_validation_search
+from src.functions_nonparametric.data_index import build_data_index
 from src.functions_nonparametric.rule_of_thumb import rule_of_thumb
 from src.functions_nonparametric.treatment_effect_estimation import (
     estimate_treatment_effect_nonparametric,
 )
 from src.functions_parametric.treatment_effect_estimation import (
-    estimate_treatment_effect_parametric,
+    estimate_treatment_effect_parametric_degrees,
 )
-from src.simulation_study.data_generating_process import data_generating_process
+from src.simulation_study.checkpoint import append_checkpoint
+from src.simulation_study.checkpoint import decode_rng_state
+from src.simulation_study.checkpoint import encode_rng_state
+from src.simulation_study.checkpoint import read_checkpoint
+from src.simulation_study.checkpoint import start_checkpoint
+from src.simulation_study.data_generating_process import data_generating_process_batch
+from src.simulation_study.data_generating_process import repetition_data
+
+
+def select_bandwidth(data, cutoff, bandwidth, h_rot=None, profile=None):
+    """
+    Select the bandwidth used in local linear regression with the specified
+    procedure.
+
+    Args:
+        data (pd.DataFrame or dict): Dataframe with data on the running variable
+                            in a column called "r" and data on the dependent
+                            variable in a column called "y", or an index of the
+                            data, see build_data_index.
+        cutoff (float): Cutpoint in the range of the running variable used to
+                        distinguish between treatment and control groups.
+        bandwidth (str): Bandwidth selection procedure, see
+                        simulate_estimator_performance.
+        h_rot (float): Rule-of-thumb bandwidth already computed for the data.
+                        Default is None, in which case it is computed if needed.
+        profile (dict): Profile the counters of cross-validation are added to,
+                        see cross_validation_mse. Default is None.
+
+    Returns:
+        float: Selected bandwidth.
+    """
+
+    if bandwidth not in ["cv", "cv_search", "rot", "rot_under", "rot_over"]:
+        raise ValueError("The specified bandwidth procedure is incorrect.")
+    elif h_rot is None:
+        h_rot = rule_of_thumb(data, cutoff)
+    else:
+        pass
+
+    if bandwidth == "cv":
+        h = cross_validation(
+            data=data,
+            cutoff=cutoff,
+            h_grid=np.linspace(start=0.5 * h_rot, stop=2 * h_rot, num=32),
+            min_num_obs=10,
+            profile=profile,
+        )
+    elif bandwidth == "cv_search":
+        h = cross_validation_search(
+            data=data, cutoff=cutoff, h_pilot=h_rot, min_num_obs=10, profile=profile
+        )["h_opt"]
+
+    elif bandwidth == "rot":
+        h = h_rot
+
+    elif bandwidth == "rot_under":
+        h = 0.5 * h_rot
+
+    elif bandwidth == "rot_over":
+        h = 2 * h_rot
+
+    return h
+
+
+def _record_time(profile, stage, start):
+    """
+    Add the wall time passed since start to the time spent in a stage of the
+    simulation.
+
+    Args:
+        profile (dict): Profile holding the time spent in each stage in
+                        profile["time"].
+        stage (str): Name of the stage.
+        start (float): Value of time.perf_counter at the start of the stage.
+
+    Returns:
+        float: Current value of time.perf_counter, i.e. the start of the next stage.
+    """
+
+    now = time.perf_counter()
+    timings = profile.setdefault("time", {})
+    timings[stage] = timings.get(stage, 0) + now - start
+
+    return now
+
+
+def merge_profiles(profile, profiles):
+    """
+    Add the stage times and counters of several profiles to a profile.
+
+    Args:
+        profile (dict): Profile the other profiles are added to in place.
+        profiles (list): Profiles to add, see simulate_replication.
+
+    Returns:
+        dict: The profile holding the sums of all profiles.
+    """
+
+    for other in profiles:
+        for kind, values in other.items():
+            totals = profile.setdefault(kind, {})
+            for name, value in values.items():
+                totals[name] = totals.get(name, 0) + value
+
+    return profile
+
+
+def simulate_replication(params, degrees, bandwidths, data, profile=None):
+    """
+    Run a single Monte Carlo repetition: apply all specified treatment effect
+    estimators to the data of the repetition, see repetition_data.
+
+    Args:
+        params (dict): Dictionary containing simulation parameters.
+        degrees (list): Degrees of polynomials used for global polynomial fitting.
+        bandwidths (list): Bandwidth selection procedures used in local linear
+                        regression, see simulate_estimator_performance.
+        data (dict): Dictionary with arrays on "r", "d" and "y" of the repetition.
+        profile (dict): Profile the wall time spent in each stage of the
+                        repetition is added to in profile["time"], i.e. in
+                        "parametric_estimation", "data_index", "rule_of_thumb",
+                        "bandwidth_<procedure>" and "nonparametric_estimation".
+                        The number of repetitions and the counters of
+                        cross-validation are added to profile["count"]. Default
+                        is None, in which case nothing is recorded.
+
+    Returns:
+        list: Treatment effect estimate, indicator whether the true treatment
+            effect lies in the confidence interval and the numeric bandwidth
+            (None for parametric estimation) for each estimator, degrees first.
+    """
+
+    if profile is not None:
+        counts = profile.setdefault("count", {})
+        counts["replications"] = counts.get("replications", 0) + 1
+        start = time.perf_counter()
+    else:
+        pass
+
+    out_regs = []
+    if len(degrees) > 0:
+        # Fit all polynomial degrees from one factorization of the design.
+        out_reg_degrees = estimate_treatment_effect_parametric_degrees(
+            data=data, cutoff=params["cutoff"], degrees=degrees,
+        )
+        for degree in degrees:
+            out_regs.append((out_reg_degrees[degree], None))
+        if profile is not None:
+            start = _record_time(profile, "parametric_estimation", start)
+        else:
+            pass
+    else:
+        pass
+
+    # All bandwidth selection procedures build on the rule-of-thumb bandwidth and
+    # share the split and sorted data with the estimation.
+    if len(bandwidths) > 0:
+        index = build_data_index(data=data, cutoff=params["cutoff"])
+        if profile is not None:
+            start = _record_time(profile, "data_index", start)
+        else:
+            pass
+        h_rot = rule_of_thumb(index, params["cutoff"])
+        if profile is not None:
+            start = _record_time(profile, "rule_of_thumb", start)
+        else:
+            pass
+    else:
+        pass
+
+    for bandwidth in bandwidths:
+        h = select_bandwidth(
+            data=index,
+            cutoff=params["cutoff"],
+            bandwidth=bandwidth,
+            h_rot=h_rot,
+            profile=profile,
+        )
+        if profile is not None:
+            start = _record_time(profile, f"bandwidth_{bandwidth}", start)
+        else:
+            pass
+        out_reg = estimate_treatment_effect_nonparametric(
+            data=index, cutoff=params["cutoff"], bandwidth=h,
+        )
+        if profile is not None:
+            start = _record_time(profile, "nonparametric_estimation", start)
+        else:
+            pass
+        out_regs.append((out_reg, h))
+
+    results = []
+    for out_reg, h in out_regs:
+        # Count if true value falls into its estimate's confidence region.
+        if out_reg["conf_int_lower"] <= params["tau"] <= out_reg["conf_int_upper"]:
+            in_conf_int = 1
+        else:
+            in_conf_int = 0
+        results.append((out_reg["coef"], in_conf_int, h))
+
+    return results
+
+
+def _simulate_replication_profiled(params, degrees, bandwidths, data):
+    """
+    Run a single Monte Carlo repetition with a profile of its own, such that the
+    profile can be returned from a worker of a pool, see simulate_replication.
+
+    Args:
+        params (dict): Dictionary containing simulation parameters.
+        degrees (list): Degrees of polynomials used for global polynomial fitting.
+        bandwidths (list): Bandwidth selection procedures used in local linear
+                        regression.
+        data (dict): Data of the repetition, see simulate_replication.
+
+    Returns:
+        tuple: Results of simulate_replication and the profile of the repetition.
+    """
+
+    profile = {}
+    results = simulate_replication(params, degrees, bandwidths, data, profile=profile)
+
+    return results, profile
+
+
+def run_replication_batches(
+    params,
+    degrees,
+    bandwidths,
+    executor,
+    n_workers,
+    seed,
+    batch_size,
+    profile=None,
+    checkpoint=None,
+):
+    """
+    Run the Monte Carlo repetitions in batches with the specified executor. A pool
+    of workers is kept across batches, and the caller can stop the simulation
+    after any batch. Every repetition draws from the same random number stream
+    regardless of the batch size, such that the first repetitions of a simulation
+    do not depend on whether it stops early.
+
+    The data of the repetitions of a batch is drawn at once with
+    data_generating_process_batch and handed to the repetitions as arrays.
+
+    If a checkpoint file is specified, the results of every completed repetition
+    are appended to it. If the data is drawn from the global NumPy random state,
+    the state before the data of a batch is drawn is appended once per batch, and
+    every repetition records its position within the batch. A simulation that
+    was killed resumes after the last repetition in the checkpoint file and
+    yields the same batches as an uninterrupted run.
+
+    Args:
+        params (dict): Dictionary containing simulation parameters. The number of
+                    repetitions params["M"] is the maximum number run.
+        degrees (list): Degrees of polynomials used for global polynomial fitting.
+        bandwidths (list): Bandwidth selection procedures used in local linear
+                        regression.
+        executor (str): Execution of the Monte Carlo repetitions, see
+                        simulate_estimator_performance.
+        n_workers (int): Number of workers of the pool.
+        seed (int): Seed from which the random number streams of the single
+                    repetitions are spawned.
+        batch_size (int): Number of repetitions in a batch.
+        profile (dict): Profile the profiles of all repetitions are added to, see
+                        simulate_replication. Repetitions read from the checkpoint
+                        file are not profiled. Default is None.
+        checkpoint (str): Path of the checkpoint file. Default is None, in which
+                        case no checkpoint is kept.
+
+    Yields:
+        list: Results of simulate_replication for each repetition of a batch.
+    """
+
+    if executor not in ["serial", "process", "thread"]:
+        raise ValueError("'executor' takes 'serial', 'process' or 'thread' only.")
+    if (isinstance(batch_size, int) and batch_size > 0) is False:
+        raise ValueError("'batch_size' must be a positive integer.")
+    else:
+        pass
+
+    global_state = seed is None and executor == "serial"
+    header = {
+        "params": params,
+        "degrees": degrees,
+        "bandwidths": bandwidths,
+        "seed": seed,
+        "global_state": global_state,
+    }
+    records = []
+    batch_records = []
+    if checkpoint is not None:
+        header = json.loads(json.dumps(header))
+        header_stored, checkpoint_records = read_checkpoint(checkpoint)
+        # The file holds the records of the repetitions and, if the data is drawn
+        # from the global NumPy random state, a record of the state before the
+        # data of each batch was drawn.
+        records = [record for record in checkpoint_records if "results" in record]
+        batch_records = [
+            record for record in checkpoint_records if "rng_state" in record
+        ]
+        if header_stored is None:
+            pass
+        elif {key: header_stored.get(key) for key in header.keys()} != header:
+            raise ValueError("The checkpoint belongs to a different simulation.")
+        else:
+            # Spawn the random number streams from the seed of the interrupted run.
+            seed = header_stored["spawn_seed"]
+    else:
+        pass
+
+    if global_state is True:
+        # Draw data for all repetitions from the global NumPy random state. On
+        # resumption, restore the state before the last batch was drawn and draw
+        # the data of its completed repetitions again.
+        rngs = [None] * params["M"]
+        if len(batch_records) > 0:
+            np.random.set_state(decode_rng_state(batch_records[-1]["rng_state"]))
+            if "results" in checkpoint_records[-1]:
+                num_redrawn = checkpoint_records[-1]["rng_offset"] + 1
+            else:
+                num_redrawn = 0
+            data_generating_process_batch(
+                params={**params, "M": num_redrawn}, rng=[None] * num_redrawn
+            )
+        else:
+            pass
+    else:
+        if seed is None:
+            seed = np.random.randint(np.iinfo(np.int32).max)
+        else:
+            pass
+        # Spawn an independent random number stream for every repetition.
+        rngs = np.random.SeedSequence(seed).spawn(params["M"])
+
+    if checkpoint is not None and len(records) == 0:
+        start_checkpoint(checkpoint, header={**header, "spawn_seed": seed})
+    else:
+        pass
+
+    # Every repetition returns its profile along with its results, as the workers
+    # of a pool cannot add to the profile of the caller.
+    if profile is not None:
+        replicate = _simulate_replication_profiled
+    else:
+        replicate = simulate_replication
+
+    if executor == "process":
+        pool = ProcessPoolExecutor(max_workers=n_workers)
+    elif executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=n_workers)
+    else:
+        pool = None
+
+    if checkpoint is not None:
+        f = open(checkpoint, "a")
+    else:
+        f = None
+
+    try:
+        for start in range(0, params["M"], batch_size):
+            stop = min(start + batch_size, params["M"])
+
+            # Repetitions completed before an interruption are read from the
+            # checkpoint file.
+            results = [
+                [tuple(estimate) for estimate in record["results"]]
+                for record in records[start:stop]
+            ]
+            rngs_batch = rngs[start + len(results) : stop]
+
+            # Draw the data of the remaining repetitions of the batch at once,
+            # every repetition from its own random number stream.
+            if f is not None and global_state is True and len(rngs_batch) > 0:
+                batch_record = {
+                    "batch": start + len(results),
+                    "rng_state": encode_rng_state(np.random.get_state()),
+                }
+                append_checkpoint(f, batch_record)
+            else:
+                pass
+            if len(rngs_batch) > 0:
+                if profile is not None:
+                    time_start = time.perf_counter()
+                else:
+                    pass
+                data_batch = data_generating_process_batch(
+                    params={**params, "M": len(rngs_batch)}, rng=list(rngs_batch)
+                )
+                if profile is not None:
+                    _record_time(profile, "data_generating_process", time_start)
+                else:
+                    pass
+            else:
+                pass
+            args = (
+                [params] * len(rngs_batch),
+                [degrees] * len(rngs_batch),
+                [bandwidths] * len(rngs_batch),
+                [repetition_data(data_batch, m) for m in range(len(rngs_batch))],
+            )
+
+            if len(rngs_batch) == 0:
+                results_new = []
+
+            elif executor == "serial":
+                results_new = map(replicate, *args)
+
+            elif executor == "process":
+                # Hand repetitions to the processes in chunks to save on
+                # communication.
+                chunksize = max(
+                    1, len(rngs_batch) // (4 * (n_workers or os.cpu_count()))
+                )
+                results_new = pool.map(replicate, *args, chunksize=chunksize)
+
+            elif executor == "thread":
+                results_new = pool.map(replicate, *args)
+
+            # The results arrive in the order of the repetitions, and each is
+            # written to the checkpoint file as soon as it is available.
+            offset = 0
+            for result in results_new:
+                if profile is not None:
+                    merge_profiles(profile, [result[1]])
+                    result = result[0]
+                else:
+                    pass
+                if f is not None:
+                    record = {"replication": start + len(results), "results": result}
+                    if global_state is True:
+                        record["rng_offset"] = offset
+                    else:
+                        pass
+                    append_checkpoint(f, record)
+                else:
+                    pass
+                results.append(result)
+                offset += 1
+
+            yield results
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        else:
+            pass
+        if f is not None:
+            f.close()
+        else:
+            pass
+
+
+def run_replications(
+    params,
+    degrees,
+    bandwidths,
+    executor,
+    n_workers,
+    seed,
+    profile=None,
+    checkpoint=None,
+):
+    """
+    Run all Monte Carlo repetitions with the specified executor.
+
+    Args:
+        params (dict): Dictionary containing simulation parameters.
+        degrees (list): Degrees of polynomials used for global polynomial fitting.
+        bandwidths (list): Bandwidth selection procedures used in local linear
+                        regression.
+        executor (str): Execution of the Monte Carlo repetitions, see
+                        simulate_estimator_performance.
+        n_workers (int): Number of workers of the pool.
+        seed (int): Seed from which the random number streams of the single
+                    repetitions are spawned.
+        profile (dict): Profile the profiles of all repetitions are added to, see
+                        simulate_replication. Default is None.
+        checkpoint (str): Path of the checkpoint file, see
+                        run_replication_batches. Default is None.
+
+    Returns:
+        list: Results of simulate_replication for each repetition.
+    """
+
+    results = []
+    for results_batch in run_replication_batches(
+        params=params,
+        degrees=degrees,
+        bandwidths=bandwidths,
+        executor=executor,
+        n_workers=n_workers,
+        seed=seed,
+        batch_size=max(params["M"], 1),
+        profile=profile,
+        checkpoint=checkpoint,
+    ):
+        results.extend(results_batch)
+
+    return results
+
+
+def compute_performance_measures(estimates, tau, parametric):
+    """
+    Compute performance measures of an estimator from its Monte Carlo estimates.
+
+    Args:
+        estimates (list): Treatment effect estimate, confidence interval indicator
+                        and numeric bandwidth for each Monte Carlo repetition.
+        tau (float): True value of the treatment effect.
+        parametric (bool): Indication whether the estimator is parametric.
+
+    Returns:
+        dict: Dictionary containing performance measures, see
+            simulate_estimator_performance.
+    """
+
+    tau_hats = [estimate[0] for estimate in estimates]
+    tau_in_conf_int = [estimate[1] for estimate in estimates]
+    if parametric is True:
+        bandwidths_numeric = []
+    else:
+        bandwidths_numeric = [estimate[2] for estimate in estimates]
+
+    performance_measure = {}
+    performance_measure["tau_hat"] = np.mean(tau_hats)
+    performance_measure["coverage_prob"] = np.mean(tau_in_conf_int)
+    performance_measure["stdev_tau_hat"] = np.std(tau_hats)
+    performance_measure["mse_tau_hat"] = np.square(np.subtract(tau_hats, tau)).mean()
+    performance_measure["bandwidths_numeric"] = bandwidths_numeric
+    performance_measure["n_replications"] = len(estimates)
+
+    return performance_measure
+
+
+def monte_carlo_standard_errors(estimates, tau):
+    """
+    Compute the Monte Carlo standard errors of the bias, the mean squared error
+    and the coverage probability of an estimator, i.e. the standard deviations of
+    these performance measures across simulations with the same number of
+    repetitions, see Morris, White and Crowther (2019). The coverage probability
+    entering its standard error is shrunk towards one half by adding two covered
+    and two uncovered repetitions, such that a coverage probability of zero or one
+    in the first repetitions does not suggest perfect precision.
+
+    Args:
+        estimates (list): Treatment effect estimate, confidence interval indicator
+                        and numeric bandwidth for each Monte Carlo repetition.
+        tau (float): True value of the treatment effect.
+
+    Returns:
+        dict: Dictionary with the Monte Carlo standard errors of the bias "bias",
+            the mean squared error "mse" and the coverage probability
+            "coverage_prob". np.inf for less than two repetitions.
+    """
+
+    num_reps = len(estimates)
+    if num_reps < 2:
+        return {"bias": np.inf, "mse": np.inf, "coverage_prob": np.inf}
+    else:
+        pass
+
+    tau_hats = np.array([estimate[0] for estimate in estimates], dtype=np.float64)
+    num_in_conf_int = np.sum([estimate[1] for estimate in estimates])
+    coverage_prob = (num_in_conf_int + 2) / (num_reps + 4)
+
+    mcse = {}
+    mcse["bias"] = np.std(tau_hats, ddof=1) / np.sqrt(num_reps)
+    mcse["mse"] = np.std((tau_hats - tau) ** 2, ddof=1) / np.sqrt(num_reps)
+    mcse["coverage_prob"] = np.sqrt(coverage_prob * (1 - coverage_prob) / num_reps)
+
+    return mcse
+
+
+def _within_tolerances(results, tau, tolerances):
+    """
+    Check whether the Monte Carlo standard errors of all estimators are within the
+    tolerances, see simulate_estimators_common_data.
+
+    Args:
+        results (list): Results of simulate_replication for each repetition run.
+        tau (float): True value of the treatment effect.
+        tolerances (dict): Largest acceptable Monte Carlo standard errors.
+
+    Returns:
+        bool: Indication whether all standard errors are within the tolerances.
+    """
+
+    for index in range(len(results[0])):
+        mcse = monte_carlo_standard_errors(
+            estimates=[result[index] for result in results], tau=tau
+        )
+        for measure, tolerance in tolerances.items():
+            if mcse[measure] > tolerance:
+                return False
+            else:
+                pass
+
+    return True
 
 
-def simulate_estimator_performance(params, degree, parametric, bandwidth):
+def simulate_estimator_performance(
+    params,
+    degree,
+    parametric,
+    bandwidth,
+    executor="serial",
+    n_workers=None,
+    seed=None,
+    profile=None,
+    tolerances=None,
+    batch_size=50,
+    checkpoint=None,
+):
     """
     Collect performance measures on the specified treatment effect estimator applied
     to data simulated with the data_generating_process function. The function works
     for parametric as well as non-parametric treatment effect estimation methods.
 
+    The Monte Carlo repetitions can be spread across several workers. In that case,
+    every repetition draws its data from an independent random number stream
+    spawned from a common seed, such that the results do not depend on the
+    executor or the number of workers.
+
+    Instead of running a fixed number of repetitions, the simulation can stop
+    early once the performance measures are precise enough. The repetitions are
+    then run in batches, and the simulation stops after the first batch at which
+    the Monte Carlo standard errors of the bias, the mean squared error and the
+    coverage probability are all within the specified tolerances, or once
+    params["M"] repetitions are run.
+
     Args:
         params (dict): Dictionary containing simulation parameters.
         degree (int): Degree of polynomial used for global polynomial fitting.
@@ -24,88 +655,181 @@ def simulate_estimator_performance(params, degree, parametric, bandwidth):
         parametric (bool): Indication whether the treatment effect is estimated
                            using parametric or non-parametric methods.
         bandwidth (str): Bandwidth used in local linear regression. Options are
-                        leave-one-out cross-validation "cv", the rule-of-thumb
-                        bandwidth selection procedure "rot" or rescaling of the
-                        rule-of-thumb bandwidth by taking 50% or 200% of it,
-                        "rot_under" or "rot_over", respectively.
+                        leave-one-out cross-validation "cv" over a grid between
+                        50% and 200% of the rule-of-thumb bandwidth or
+                        "cv_search" with a search over the same interval, the
+                        rule-of-thumb bandwidth selection procedure "rot" or
+                        rescaling of the rule-of-thumb bandwidth by taking 50% or
+                        200% of it, "rot_under" or "rot_over", respectively.
+        executor (str): Execution of the Monte Carlo repetitions. Options are
+                        "serial", "process" for a pool of processes and "thread"
+                        for a pool of threads. Default is "serial".
+        n_workers (int): Number of workers of the pool. Default is None, in which
+                        case the number of processors is used.
+        seed (int): Seed from which the random number streams of the single
+                    repetitions are spawned. Default is None, in which case
+                    serial execution draws from the global NumPy random state and
+                    parallel execution takes the seed from it.
+        profile (dict): Profile the wall time spent in each stage of the
+                        repetitions and the counters of cross-validation are added
+                        to, see simulate_replication. Default is None, in which
+                        case nothing is recorded.
+        tolerances (dict): Largest acceptable Monte Carlo standard errors of the
+                        bias "bias", the mean squared error "mse" and the coverage
+                        probability "coverage_prob", see
+                        monte_carlo_standard_errors. Measures without tolerance
+                        are not checked. Default is None, in which case all
+                        params["M"] repetitions are run.
+        batch_size (int): Number of repetitions run between two checks of the
+                        tolerances. Default is 50.
+        checkpoint (str): Path of a file the results of the completed repetitions
+                        are appended to. If the file holds results of an
+                        interrupted run of the same simulation, the simulation
+                        resumes after its last completed repetition and returns
+                        the same performance measures as an uninterrupted run.
+                        Default is None, in which case no checkpoint is kept.
 
     Returns:
         dict: Dictionary containing measures for descriptive statistics -
             the coverage probability, mean, standard deviation and mean squared
             error of the estimator across all Monte Carlo repetitions as well as
-            numeric values of the bandwidths selected by the single procedures.
+            numeric values of the bandwidths selected by the single procedures
+            and the number of repetitions run "n_replications".
     """
 
-    tau_hats = []
-    tau_in_conf_int = []
-    bandwidths_numeric = []
-
     if parametric is True:
-        for _ in range(params["M"]):
-            out_reg = estimate_treatment_effect_parametric(
-                data=data_generating_process(params=params),
-                cutoff=params["cutoff"],
-                degree=degree,
-            )
-            tau_hat = out_reg["coef"]
-            ci_lower = out_reg["conf_int_lower"]
-            ci_upper = out_reg["conf_int_upper"]
-
-            # Collect estimates for subsequent investigation.
-            tau_hats.append(tau_hat)
-            if ci_lower <= params["tau"] and params["tau"] <= ci_upper:
-                # Count if true value falls into its estimate's confidence region.
-                tau_in_conf_int.append(1)
-            else:
-                tau_in_conf_int.append(0)
+        out = simulate_estimators_common_data(
+            params=params,
+            degrees=[degree],
+            bandwidths=[],
+            executor=executor,
+            n_workers=n_workers,
+            seed=seed,
+            profile=profile,
+            tolerances=tolerances,
+            batch_size=batch_size,
+            checkpoint=checkpoint,
+        )
+        performance_measure = out["parametric"][0]
 
     elif parametric is False:
-        for _ in range(params["M"]):
-            data = data_generating_process(params=params)
-
-            if bandwidth == "cv":
-                h_pilot = rule_of_thumb(data, params["cutoff"])
-                h = cross_validation(
-                    data=data,
-                    cutoff=params["cutoff"],
-                    h_grid=np.linspace(start=0.5 * h_pilot, stop=2 * h_pilot, num=32),
-                    min_num_obs=10,
-                )
-            elif bandwidth == "rot":
-                h = rule_of_thumb(data, params["cutoff"])
+        out = simulate_estimators_common_data(
+            params=params,
+            degrees=[],
+            bandwidths=[bandwidth],
+            executor=executor,
+            n_workers=n_workers,
+            seed=seed,
+            profile=profile,
+            tolerances=tolerances,
+            batch_size=batch_size,
+            checkpoint=checkpoint,
+        )
+        performance_measure = out["nonparametric"][0]
 
-            elif bandwidth == "rot_under":
-                h = 0.5 * rule_of_thumb(data, params["cutoff"])
+    else:
+        raise TypeError("Argument 'parametric' must be boolean.")
 
-            elif bandwidth == "rot_over":
-                h = 2 * rule_of_thumb(data, params["cutoff"])
+    return performance_measure
 
-            else:
-                raise ValueError("The specified bandwidth procedure is incorrect.")
 
-            out_reg = estimate_treatment_effect_nonparametric(
-                data=data, cutoff=params["cutoff"], bandwidth=h,
-            )
-            tau_hat = out_reg["coef"]
-            ci_lower = out_reg["conf_int_lower"]
-            ci_upper = out_reg["conf_int_upper"]
-            tau_hats.append(tau_hat)
-            bandwidths_numeric.append(h)
-            if ci_lower <= params["tau"] and params["tau"] <= ci_upper:
-                tau_in_conf_int.append(1)
-            else:
-                tau_in_conf_int.append(0)
+def simulate_estimators_common_data(
+    params,
+    degrees,
+    bandwidths,
+    executor="serial",
+    n_workers=None,
+    seed=None,
+    profile=None,
+    tolerances=None,
+    batch_size=50,
+    checkpoint=None,
+):
+    """
+    Collect performance measures on several treatment effect estimators that are
+    applied to the same simulated data. Each Monte Carlo repetition draws its data
+    once and evaluates all estimators on it, which keeps the comparison between
+    estimators based on common random numbers and shares the rule-of-thumb
+    bandwidth between the bandwidth selection procedures.
+
+    Args:
+        params (dict): Dictionary containing simulation parameters.
+        degrees (list): Degrees of polynomials used for global polynomial fitting.
+        bandwidths (list): Bandwidth selection procedures used in local linear
+                        regression, see simulate_estimator_performance.
+        executor (str): Execution of the Monte Carlo repetitions, see
+                        simulate_estimator_performance. Default is "serial".
+        n_workers (int): Number of workers of the pool. Default is None.
+        seed (int): Seed from which the random number streams of the single
+                    repetitions are spawned. Default is None.
+        profile (dict): Profile of the repetitions, see
+                        simulate_estimator_performance. Default is None.
+        tolerances (dict): Largest acceptable Monte Carlo standard errors, see
+                        simulate_estimator_performance. The simulation stops
+                        once they are met by all estimators. Default is None.
+        batch_size (int): Number of repetitions run between two checks of the
+                        tolerances. Default is 50.
+        checkpoint (str): Path of the checkpoint file, see
+                        simulate_estimator_performance. Default is None.
+
+    Returns:
+        dict: Dictionary with keys "parametric" and "nonparametric", holding lists
+            of performance measures for each degree and each bandwidth selection
+            procedure, respectively. See simulate_estimator_performance.
+    """
 
+    for degree in degrees:
+        if (isinstance(degree, int) and degree >= 0) is False:
+            raise ValueError("Polynomial order must be weakly positive integer.")
+    for bandwidth in bandwidths:
+        if bandwidth not in ["cv", "cv_search", "rot", "rot_under", "rot_over"]:
+            raise ValueError("The specified bandwidth procedure is incorrect.")
+    if tolerances is not None and (
+        set(tolerances.keys()).issubset(["bias", "mse", "coverage_prob"]) is False
+    ):
+        raise ValueError("'tolerances' takes 'bias', 'mse' and 'coverage_prob' only.")
     else:
-        raise TypeError("Argument 'parametric' must be boolean.")
+        pass
 
-    performance_measure = {}
-    performance_measure["tau_hat"] = np.mean(tau_hats)
-    performance_measure["coverage_prob"] = np.mean(tau_in_conf_int)
-    performance_measure["stdev_tau_hat"] = np.std(tau_hats)
-    performance_measure["mse_tau_hat"] = np.square(
-        np.subtract(tau_hats, params["tau"])
-    ).mean()
-    performance_measure["bandwidths_numeric"] = bandwidths_numeric
+    # Without tolerances, all repetitions are run as a single batch.
+    if tolerances is None:
+        batch_size = max(params["M"], 1)
+    else:
+        pass
 
-    return performance_measure
+    results = []
+    with closing(
+        run_replication_batches(
+            params=params,
+            degrees=degrees,
+            bandwidths=bandwidths,
+            executor=executor,
+            n_workers=n_workers,
+            seed=seed,
+            batch_size=batch_size,
+            profile=profile,
+            checkpoint=checkpoint,
+        )
+    ) as batches:
+        for results_batch in batches:
+            results.extend(results_batch)
+            if tolerances is not None and _within_tolerances(
+                results, tau=params["tau"], tolerances=tolerances
+            ):
+                break
+            else:
+                pass
+
+    performance_measures = {"parametric": [], "nonparametric": []}
+    for index in range(len(degrees) + len(bandwidths)):
+        parametric = index < len(degrees)
+        estimates = [result[index] for result in results]
+        performance_measure = compute_performance_measures(
+            estimates=estimates, tau=params["tau"], parametric=parametric
+        )
+        if parametric is True:
+            performance_measures["parametric"].append(performance_measure)
+        else:
+            performance_measures["nonparametric"].append(performance_measure)
+
+    return performance_measures
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+from checkpoint import append_checkpoint
+from checkpoint import decode_rng_state
+from checkpoint import encode_rng_state
+from checkpoint import read_checkpoint
+from checkpoint import start_checkpoint
+
+
+@pytest.fixture
+def setup_checkpoint():
+    out = {}
+    out["header"] = {"params": {"n": 500, "M": 3}, "seed": None}
+    out["records"] = [
+        {"replication": 0, "results": [[0.75, 1, None]]},
+        {"replication": 1, "results": [[0.5, 0, 0.25]]},
+    ]
+
+    return out
+
+
+def test_rng_state_round_trip():
+    np.random.seed(123)
+    np.random.normal()
+    state = json.loads(json.dumps(encode_rng_state(np.random.get_state())))
+    expected = np.random.normal(size=3)
+    np.random.set_state(decode_rng_state(state))
+    assert np.array_equal(np.random.normal(size=3), expected)
+
+
+def test_read_checkpoint_appended_records(setup_checkpoint, tmp_path):
+    path = str(tmp_path / "checkpoints" / "job.jsonl")
+    assert read_checkpoint(path) == (None, [])
+    start_checkpoint(path, setup_checkpoint["header"])
+    with open(path, "a") as f:
+        for record in setup_checkpoint["records"]:
+            append_checkpoint(f, record)
+    assert read_checkpoint(path) == (
+        setup_checkpoint["header"],
+        setup_checkpoint["records"],
+    )
+
+
+def test_read_checkpoint_drops_partial_record(setup_checkpoint, tmp_path):
+    path = str(tmp_path / "job.jsonl")
+    start_checkpoint(path, setup_checkpoint["header"])
+    with open(path, "a") as f:
+        append_checkpoint(f, setup_checkpoint["records"][0])
+        f.write(json.dumps(setup_checkpoint["records"][1])[:10])
+    assert read_checkpoint(path) == (
+        setup_checkpoint["header"],
+        setup_checkpoint["records"][:1],
+    )
+    # Records appended after the interruption follow the last complete record.
+    with open(path, "a") as f:
+        append_checkpoint(f, setup_checkpoint["records"][1])
+    assert read_checkpoint(path)[1] == setup_checkpoint["records"]
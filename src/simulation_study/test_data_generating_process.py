@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 import pytest
 from data_generating_process import data_generating_process
+from data_generating_process import data_generating_process_batch
+from data_generating_process import repetition_data
 
 
 @pytest.fixture
@@ -23,3 +26,63 @@ def setup_data_generating_process():
 def test_data_generating_process_return_val(setup_data_generating_process):
     data = data_generating_process(params=setup_data_generating_process["out"])
     assert isinstance(data, pd.DataFrame)
+
+
+def test_data_generating_process_batch_shape(setup_data_generating_process):
+    params = setup_data_generating_process["out"]
+    data_batch = data_generating_process_batch(params=params)
+    for var in ["r", "d", "y"]:
+        assert data_batch[var].shape == (params["M"], params["n"])
+    assert np.all(data_batch["d"] == (data_batch["r"] >= params["cutoff"]))
+
+
+def test_data_generating_process_batch_discrete(setup_data_generating_process):
+    params = {**setup_data_generating_process["out"], "discrete": True}
+    data_batch = data_generating_process_batch(params=params)
+    for m in range(params["M"]):
+        n_bins = data_batch["n_bins"][m]
+        assert np.all(~np.isnan(data_batch["y"][m, :n_bins]))
+        assert np.all(np.isnan(data_batch["y"][m, n_bins:]))
+        assert np.all(np.diff(data_batch["r"][m, :n_bins]) > 0)
+
+
+def test_data_generating_process_matches_batch(setup_data_generating_process):
+    for model in ["linear", "poly", "nonpolynomial"]:
+        for discrete in [False, True]:
+            params = {
+                **setup_data_generating_process["out"],
+                "model": model,
+                "discrete": discrete,
+                "M": 1,
+            }
+            data = data_generating_process(
+                params=params, rng=np.random.default_rng(123)
+            )
+            data_batch = data_generating_process_batch(
+                params=params, rng=np.random.default_rng(123)
+            )
+            for var in ["r", "d", "y"]:
+                assert np.allclose(data[var], data_batch[var][0, : data.shape[0]])
+
+
+def test_data_generating_process_batch_sources(setup_data_generating_process):
+    for discrete in [False, True]:
+        params = {**setup_data_generating_process["out"], "discrete": discrete, "M": 3}
+        seeds = np.random.SeedSequence(123).spawn(params["M"])
+        data_batch = data_generating_process_batch(params=params, rng=seeds)
+
+        np.random.seed(123)
+        data_batch_global = data_generating_process_batch(
+            params=params, rng=[None] * params["M"]
+        )
+        np.random.seed(123)
+        for m in range(params["M"]):
+            data = data_generating_process(
+                params=params, rng=np.random.default_rng(seeds[m])
+            )
+            data_global = data_generating_process(params=params)
+            for var in ["r", "d", "y"]:
+                assert np.array_equal(repetition_data(data_batch, m)[var], data[var])
+                assert np.array_equal(
+                    repetition_data(data_batch_global, m)[var], data_global[var]
+                )
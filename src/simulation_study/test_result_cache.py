@@ -0,0 +1,74 @@
+import os
+
+import pytest
+from result_cache import cache_key
+from result_cache import code_version
+from result_cache import evict_results
+from result_cache import load_result
+from result_cache import store_result
+
+
+@pytest.fixture
+def setup_result_cache():
+    out = {}
+    out["params"] = {"n": 500, "M": 250, "model": "linear", "discrete": False}
+    out["estimator"] = {"bandwidth": "cv"}
+    out["seed"] = 123
+    out["version"] = "abc"
+    out["result"] = {"tau_hat": 0.75, "bandwidths_numeric": [0.5, 0.6]}
+
+    return out
+
+
+def test_cache_key_changes_with_inputs(setup_result_cache):
+    key = cache_key(
+        params=setup_result_cache["params"],
+        estimator=setup_result_cache["estimator"],
+        seed=setup_result_cache["seed"],
+        version=setup_result_cache["version"],
+    )
+    assert key != cache_key(
+        params={**setup_result_cache["params"], "n": 1000},
+        estimator=setup_result_cache["estimator"],
+        seed=setup_result_cache["seed"],
+        version=setup_result_cache["version"],
+    )
+    assert key != cache_key(
+        params=setup_result_cache["params"],
+        estimator={"bandwidth": "rot"},
+        seed=setup_result_cache["seed"],
+        version=setup_result_cache["version"],
+    )
+    assert key != cache_key(
+        params=setup_result_cache["params"],
+        estimator=setup_result_cache["estimator"],
+        seed=setup_result_cache["seed"],
+        version="abd",
+    )
+
+
+def test_store_and_load_result(setup_result_cache, tmp_path):
+    store_result(str(tmp_path), "key", setup_result_cache["result"])
+    assert load_result(str(tmp_path), "key") == setup_result_cache["result"]
+    assert load_result(str(tmp_path), "missing_key") is None
+
+
+def test_evict_results_least_recently_used(setup_result_cache, tmp_path):
+    for index, key in enumerate(["old", "recent", "new"]):
+        store_result(str(tmp_path), key, setup_result_cache["result"])
+        os.utime(tmp_path / f"{key}.json", (index, index))
+    # Loading marks an entry as recently used.
+    load_result(str(tmp_path), "recent")
+    size = os.path.getsize(tmp_path / "old.json")
+
+    assert evict_results(str(tmp_path), max_size=2 * size) == 1
+    assert load_result(str(tmp_path), "old") is None
+    assert load_result(str(tmp_path), "recent") == setup_result_cache["result"]
+
+
+def test_code_version_changes_with_source(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("x = 1\n")
+    version = code_version([str(path)])
+    path.write_text("x = 2\n")
+    assert code_version([str(path)]) != version
@@ -1,5 +1,9 @@
+import numpy as np
 import pytest
+from sim_study import expected_job_cost
 from sim_study import fix_simulation_params
+from sim_study import run_job
+from sim_study import scenario_jobs
 
 
 @pytest.fixture
@@ -66,3 +70,57 @@ def test_fix_simulation_params_discrete(setup_fix_simulation_params):
             tau=setup_fix_simulation_params["tau"],
             noise_var=setup_fix_simulation_params["noise_var"],
         )
+
+
+def test_scenario_jobs_cover_simulation_study():
+    for common_random_numbers, num_jobs in [(False, 40), (True, 4)]:
+        jobs = scenario_jobs(common_random_numbers=common_random_numbers)
+        assert len(jobs) == num_jobs
+        assert sum(len(job["degrees"]) + len(job["bandwidths"]) for job in jobs) == 40
+        assert {(job["model"], job["discrete"]) for job in jobs} == {
+            ("linear", False),
+            ("poly", False),
+            ("nonpolynomial", False),
+            ("linear", True),
+        }
+
+
+def test_expected_job_cost_cv_first():
+    jobs = sorted(
+        scenario_jobs(common_random_numbers=False), key=expected_job_cost, reverse=True
+    )
+    assert jobs[0]["bandwidths"] == ["cv"]
+    assert len(jobs[-1]["degrees"]) == 1
+
+
+def test_run_job_cached_matches_uncached(tmp_path):
+    job = {"model": "linear", "discrete": False, "degrees": [0, 1], "bandwidths": []}
+    expected = run_job(job)
+    # Cache a single estimator first, such that only the other one is simulated.
+    run_job({**job, "degrees": [1]}, cache_dir=str(tmp_path), version="abc")
+    calc = run_job(job, cache_dir=str(tmp_path), version="abc")
+    for calc_measures, expected_measures in zip(
+        calc["parametric"], expected["parametric"]
+    ):
+        for key in ["tau_hat", "coverage_prob", "stdev_tau_hat", "mse_tau_hat"]:
+            assert np.isclose(calc_measures[key], expected_measures[key])
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_run_job_profile_covers_missing_estimators(tmp_path):
+    job = {"model": "linear", "discrete": False, "degrees": [0], "bandwidths": []}
+    calc = run_job(job, cache_dir=str(tmp_path), version="abc", profile=True)
+    assert calc["profile"]["count"]["replications"] == 250
+    assert "parametric_estimation" in calc["profile"]["time"]
+    # Estimators taken from the cache are not simulated again.
+    calc = run_job(job, cache_dir=str(tmp_path), version="abc", profile=True)
+    assert calc["profile"] == {}
+    assert "profile" not in run_job(job, cache_dir=str(tmp_path), version="abc")
+
+
+def test_run_job_checkpoint_removed(tmp_path):
+    job = {"model": "linear", "discrete": False, "degrees": [0], "bandwidths": []}
+    checkpoint_dir = tmp_path / "checkpoints"
+    calc = run_job(job, checkpoint_dir=str(checkpoint_dir))
+    assert calc == run_job(job)
+    assert list(checkpoint_dir.iterdir()) == []
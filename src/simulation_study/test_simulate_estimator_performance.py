@@ -1,8 +1,15 @@
+import numpy as np
 import pytest
 
+from src.simulation_study.simulate_estimator_performance import (
+    monte_carlo_standard_errors,
+)
 from src.simulation_study.simulate_estimator_performance import (
     simulate_estimator_performance,
 )
+from src.simulation_study.simulate_estimator_performance import (
+    simulate_estimators_common_data,
+)
 
 
 @pytest.fixture
@@ -48,3 +55,255 @@ def test_simulate_estimator_performance_arguments(setup_simulate_estimator_perfo
             parametric="Yes",
             bandwidth=setup_simulate_estimator_performance["bandwidth"],
         )
+
+
+def test_simulate_estimator_performance_executor(setup_simulate_estimator_performance):
+    with pytest.raises(ValueError):
+        simulate_estimator_performance(
+            params=setup_simulate_estimator_performance["params"],
+            degree=setup_simulate_estimator_performance["degree"],
+            parametric=setup_simulate_estimator_performance["parametric"],
+            bandwidth=setup_simulate_estimator_performance["bandwidth"],
+            executor="cluster",
+        )
+
+
+def test_simulate_estimator_performance_executor_reproducible(
+    setup_simulate_estimator_performance,
+):
+    params = setup_simulate_estimator_performance["params"].copy()
+    params["M"] = 8
+
+    performance_measures = []
+    for executor, n_workers in [("serial", None), ("thread", 3), ("process", 2)]:
+        performance_measures.append(
+            simulate_estimator_performance(
+                params=params,
+                degree=None,
+                parametric=False,
+                bandwidth=setup_simulate_estimator_performance["bandwidth"],
+                executor=executor,
+                n_workers=n_workers,
+                seed=123,
+            )
+        )
+
+    for performance_measure in performance_measures[1:]:
+        assert performance_measure == performance_measures[0]
+
+
+def test_simulate_estimators_common_data_matches_single_estimators(
+    setup_simulate_estimator_performance,
+):
+    params = setup_simulate_estimator_performance["params"].copy()
+    params["M"] = 5
+
+    np.random.seed(123)
+    calc_performance_measures = simulate_estimators_common_data(
+        params=params, degrees=[0, 2], bandwidths=["rot", "rot_over"]
+    )
+
+    for degree, calc_performance_measure in zip(
+        [0, 2], calc_performance_measures["parametric"]
+    ):
+        np.random.seed(123)
+        expected_performance_measure = simulate_estimator_performance(
+            params=params, degree=degree, parametric=True, bandwidth=None
+        )
+        for key, value in expected_performance_measure.items():
+            assert np.allclose(calc_performance_measure[key], value)
+
+    for bandwidth, calc_performance_measure in zip(
+        ["rot", "rot_over"], calc_performance_measures["nonparametric"]
+    ):
+        np.random.seed(123)
+        expected_performance_measure = simulate_estimator_performance(
+            params=params, degree=None, parametric=False, bandwidth=bandwidth
+        )
+        for key, value in expected_performance_measure.items():
+            assert np.allclose(calc_performance_measure[key], value)
+
+
+def test_simulate_estimator_performance_cv_search(setup_simulate_estimator_performance):
+    params = {**setup_simulate_estimator_performance["params"], "M": 5}
+    calc_performance_measure = simulate_estimator_performance(
+        params=params,
+        degree=setup_simulate_estimator_performance["degree"],
+        parametric=False,
+        bandwidth="cv_search",
+        seed=123,
+    )
+    assert len(calc_performance_measure["bandwidths_numeric"]) == 5
+    assert 0 <= calc_performance_measure["coverage_prob"] <= 1
+
+
+def test_simulate_estimators_common_data_profile(setup_simulate_estimator_performance):
+    params = {**setup_simulate_estimator_performance["params"], "M": 4}
+    expected_performance_measures = simulate_estimators_common_data(
+        params=params, degrees=[1], bandwidths=["rot", "cv"], seed=123
+    )
+
+    for executor in ["serial", "process"]:
+        profile = {}
+        calc_performance_measures = simulate_estimators_common_data(
+            params=params,
+            degrees=[1],
+            bandwidths=["rot", "cv"],
+            executor=executor,
+            n_workers=2,
+            seed=123,
+            profile=profile,
+        )
+        assert calc_performance_measures == expected_performance_measures
+        assert set(profile["time"].keys()) == {
+            "data_generating_process",
+            "parametric_estimation",
+            "data_index",
+            "rule_of_thumb",
+            "bandwidth_rot",
+            "bandwidth_cv",
+            "nonparametric_estimation",
+        }
+        assert profile["count"]["replications"] == 4
+        assert profile["count"]["cv_loo_fits"] > 0
+
+
+def test_monte_carlo_standard_errors():
+    estimates = [(1.0, 1, None), (0.5, 1, None), (0.0, 0, None), (1.5, 1, None)]
+    calc_mcse = monte_carlo_standard_errors(estimates, tau=0.75)
+    assert np.isclose(calc_mcse["bias"], np.std([1.0, 0.5, 0.0, 1.5], ddof=1) / 2)
+    assert np.isclose(
+        calc_mcse["mse"], np.std([0.0625, 0.0625, 0.5625, 0.5625], ddof=1) / 2
+    )
+    assert np.isclose(calc_mcse["coverage_prob"], np.sqrt(5 / 8 * 3 / 8 / 4))
+    assert monte_carlo_standard_errors(estimates[:1], tau=0.75)["bias"] == np.inf
+
+
+def test_simulate_estimator_performance_sequential(
+    setup_simulate_estimator_performance,
+):
+    params = {**setup_simulate_estimator_performance["params"], "M": 60}
+    calc_performance_measure = simulate_estimator_performance(
+        params=params,
+        degree=1,
+        parametric=True,
+        bandwidth=None,
+        seed=123,
+        tolerances={"bias": 0.1, "coverage_prob": 0.1},
+        batch_size=20,
+    )
+    n_replications = calc_performance_measure["n_replications"]
+    assert n_replications in [20, 40]
+
+    # The repetitions run are the first ones of the simulation without stopping.
+    expected_performance_measure = simulate_estimator_performance(
+        params={**params, "M": n_replications},
+        degree=1,
+        parametric=True,
+        bandwidth=None,
+        seed=123,
+    )
+    assert calc_performance_measure == expected_performance_measure
+
+
+def test_simulate_estimator_performance_sequential_cap(
+    setup_simulate_estimator_performance,
+):
+    params = {**setup_simulate_estimator_performance["params"], "M": 30}
+    for executor in ["serial", "process"]:
+        calc_performance_measure = simulate_estimator_performance(
+            params=params,
+            degree=None,
+            parametric=False,
+            bandwidth="rot",
+            executor=executor,
+            n_workers=2,
+            seed=123,
+            tolerances={"bias": 1e-6, "mse": 1e-6, "coverage_prob": 1e-6},
+            batch_size=20,
+        )
+        assert calc_performance_measure["n_replications"] == 30
+    with pytest.raises(ValueError):
+        simulate_estimator_performance(
+            params=params,
+            degree=1,
+            parametric=True,
+            bandwidth=None,
+            tolerances={"stdev": 0.1},
+        )
+    with pytest.raises(ValueError):
+        simulate_estimator_performance(
+            params=params,
+            degree=1,
+            parametric=True,
+            bandwidth=None,
+            tolerances={"bias": 0.1},
+            batch_size=0,
+        )
+
+
+def test_simulate_estimators_common_data_checkpoint_resume(
+    setup_simulate_estimator_performance, tmp_path
+):
+    params = {**setup_simulate_estimator_performance["params"], "M": 6}
+    for executor, seed in [("serial", None), ("process", 123)]:
+        np.random.seed(123)
+        expected = simulate_estimators_common_data(
+            params=params,
+            degrees=[1],
+            bandwidths=["rot"],
+            executor=executor,
+            n_workers=2,
+            seed=seed,
+        )
+        expected_state = np.random.get_state()[1]
+
+        # Interrupt the run while writing the first or the fourth repetition.
+        for num_completed in [0, 3]:
+            path = str(tmp_path / f"{executor}_{num_completed}.jsonl")
+            np.random.seed(123)
+            simulate_estimators_common_data(
+                params=params,
+                degrees=[1],
+                bandwidths=["rot"],
+                executor=executor,
+                n_workers=2,
+                seed=seed,
+                checkpoint=path,
+            )
+            with open(path) as f:
+                lines = f.readlines()
+            repetition_lines = [
+                index for index, line in enumerate(lines) if '"results"' in line
+            ]
+            cut = repetition_lines[num_completed]
+            with open(path, "w") as f:
+                f.writelines(lines[:cut] + [lines[cut][:20]])
+
+            np.random.seed(123)
+            calc = simulate_estimators_common_data(
+                params=params,
+                degrees=[1],
+                bandwidths=["rot"],
+                executor=executor,
+                n_workers=2,
+                seed=seed,
+                checkpoint=path,
+            )
+            assert calc == expected
+            if seed is None:
+                assert np.array_equal(np.random.get_state()[1], expected_state)
+            else:
+                pass
+            with open(path) as f:
+                lines = f.readlines()
+            assert sum('"results"' in line for line in lines) == 6
+            assert sum('"rng_state"' in line for line in lines) <= 2
+
+    with pytest.raises(ValueError):
+        simulate_estimators_common_data(
+            params={**params, "n": 1000},
+            degrees=[1],
+            bandwidths=["rot"],
+            checkpoint=str(tmp_path / "serial_3.jsonl"),
+        )